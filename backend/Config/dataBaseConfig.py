@@ -1,10 +1,11 @@
 from dataclasses import dataclass
-from typing import Optional
-from langchain_huggingface import HuggingFaceEmbeddings
+from typing import List, Optional
 import os
+import time
 import dotenv
-import google.generativeai as genai
 import numpy as np
+from Models.EmbeddingCache import get_embedding_cache
+from Models.EmbeddingFactory import factoryEmbedding
 
 # Cargar variables de entorno desde el archivo .env
 dotenv.load_dotenv(os.path.join(os.path.dirname(__file__), "..", "..", ".env"))
@@ -13,50 +14,113 @@ dotenv.load_dotenv(os.path.join(os.path.dirname(__file__), "..", "..", ".env"))
 class PineconeConfig:
     PINECONE_API_KEY: Optional[str] = os.getenv("PINECONE_API_KEY")
     PINECONE_ENV: Optional[str] = os.getenv("PINECONE_ENV")
+    # Backend vectorial: pinecone (remoto) o local (NumPy en memoria)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "pinecone")
+    # El índice debe tener la misma dimensión que el proveedor de embeddings
+    PINECONE_INDEX: str = os.getenv("PINECONE_INDEX", "smaccb-pruebas1024")
     API_KEY: Optional[str] = os.getenv("API_KEY")
     GEMINI_MODEL: Optional[str] = os.getenv("GEMINI_MODEL", "text-embedding-004")
+    # Proveedor de embeddings: gemini, local, onnx o fake
+    EMBEDDING_PROVEEDOR: str = os.getenv("EMBEDDING_PROVEEDOR", "gemini")
+    EMBEDDING_MODEL: Optional[str] = os.getenv("EMBEDDING_MODEL")
+    EMBEDDING_DIMENSION: Optional[str] = os.getenv("EMBEDDING_DIMENSION")
+    # Número de textos enviados por llamada al proveedor de embeddings
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
     
-    def __post_init__(self):
-        # Configurar Gemini para embeddings
-        if self.API_KEY:
-            genai.configure(api_key=self.API_KEY)
+    @property
+    def embedding_provider(self):
+        """Proveedor de embeddings configurado (compartido por el proceso)"""
+        model_name = self.EMBEDDING_MODEL
+        if not model_name and self.EMBEDDING_PROVEEDOR.lower() == "gemini":
+            model_name = self.GEMINI_MODEL
+        return factoryEmbedding().getEmbedding(
+            self.EMBEDDING_PROVEEDOR,
+            model_name,
+            self.EMBEDDING_DIMENSION,
+            self.API_KEY
+        )
     
-    # Modelo HuggingFace (mantenido para compatibilidad)
-    Modelo = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={
-            'normalize_embeddings': True
-        }
-    )
+    @property
+    def embedding_dimension(self) -> int:
+        return self.embedding_provider.dimension
+    
+    @property
+    def Modelo(self):
+        """Modelo HuggingFace local (mantenido para compatibilidad)"""
+        return factoryEmbedding().getEmbedding("local").model
+    
+    def generate_embedding(self, text: str) -> list:
+        """
+        Genera el embedding normalizado de un texto con el proveedor configurado
+        """
+        return self.generate_embeddings_batch([text])[0].tolist()
     
     def generate_gemini_embedding(self, text: str) -> list:
         """
-        Genera embedding usando Gemini (1024 dimensiones)
+        Alias de generate_embedding (mantenido para compatibilidad)
+        """
+        return self.generate_embedding(text)
+    
+    def generate_embeddings_batch(self, texts: List[str], batch_size: Optional[int] = None,
+                                  task_type: str = "retrieval_document") -> np.ndarray:
         """
+        Genera embeddings para varios textos enviando lotes al proveedor
+        
+        Los textos ya vectorizados se toman de la caché de embeddings y solo
+        los restantes se envían al proveedor.
+        
+        Args:
+            texts: Lista de textos a vectorizar
+            batch_size: Textos por llamada (por defecto EMBEDDING_BATCH_SIZE)
+            task_type: Tipo de tarea del proveedor (forma parte de la clave de caché)
+        
+        Returns:
+            Matriz (len(texts), dimensión del proveedor) con los vectores normalizados (L2)
+        """
+        batch_size = batch_size or self.EMBEDDING_BATCH_SIZE
+        provider = self.embedding_provider
+        if not texts:
+            return np.zeros((0, provider.dimension), dtype=np.float32)
+        
+        cache = get_embedding_cache()
+        model_key = f"{provider.name}:{provider.model_name}:{provider.dimension}"
+        keys = [cache.make_key(model_key, task_type, text) for text in texts]
+        cached = cache.get_many(keys)
+        
+        # Textos únicos que no están en caché
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        
         try:
-            result = genai.embed_content(
-                model=self.GEMINI_MODEL,
-                content=text,
-                task_type="retrieval_document"
-            )
-            embedding = result['embedding']
-            # Borrar si es necesario, aun no lo veo asi.
-            # Ajustar a 1024 dimensiones si es necesario
-            if len(embedding) < 1024:
-                # Rellenar con ceros si es menor
-                embedding.extend([0.0] * (1024 - len(embedding)))
-            elif len(embedding) > 1024:
-                # Truncar si es mayor
-                embedding = embedding[:1024]
-            
-            # Normalizar el vector (L2 normalization)
-            embedding_array = np.array(embedding)
-            normalized_embedding = embedding_array / np.linalg.norm(embedding_array)
+            if missing:
+                missing_keys = list(missing.keys())
+                missing_texts = list(missing.values())
+                embeddings = []
+                started = time.perf_counter()
+                for start in range(0, len(missing_texts), batch_size):
+                    batch = missing_texts[start:start + batch_size]
+                    embeddings.append(provider.embed(batch, task_type))
+                cache.record_api_call(time.perf_counter() - started, len(missing_texts))
+                
+                new_vectors = self._normalize_embeddings(np.vstack(embeddings))
+                generated = dict(zip(missing_keys, new_vectors))
+                cache.put_many(generated)
+                cached.update(generated)
             
-            return normalized_embedding.tolist()
+            return np.vstack([cached[key] for key in keys]).astype(np.float32, copy=False)
         except Exception as e:
-            raise Exception(f"Error generando embedding con Gemini: {str(e)}")
+            raise Exception(f"Error generando embedding con {provider.name}: {str(e)}")
+    
+    def _normalize_embeddings(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Normaliza (L2) todos los vectores de la matriz
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
     
     # Código comentado para OpenAI (uso futuro)
     # def generate_openai_embedding(self, text: str) -> list:
@@ -7,10 +7,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from Models.databaseVectorModel import databaseVectormodel
 
 class lmmController:
-    def __init__(self):
-        self.model = ModeLlm()
-        self.database = dataBaseVectorController()
-        self.db_model = databaseVectormodel()  # Acceso directo al modelo de base de datos vectorial
+    def __init__(self, model=None, database=None, db_model=None):
+        self.model = model or ModeLlm()
+        self.database = database or dataBaseVectorController(db_model)
+        self.db_model = db_model or self.database.model  # Acceso directo al modelo de base de datos vectorial
     
     def promptValidate(self, data: dict):
         try:
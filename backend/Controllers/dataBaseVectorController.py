@@ -1,13 +1,14 @@
 from Models.databaseVectorModel import databaseVectormodel
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 
 
 class dataBaseVectorController:
-    def __init__(self):
-        self.model = databaseVectormodel()
+    def __init__(self, model=None):
+        self.model = model or databaseVectormodel()
     
     def crearChunks(self, doc: str):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        from langchain_community.document_loaders import TextLoader
+        
         # Cargar documento con codificación UTF-8 (estándar universal)
         loader = TextLoader(doc, encoding='utf-8')  
         documents = loader.load()
@@ -32,4 +33,13 @@ class dataBaseVectorController:
         Returns:
             Diccionario con métricas del dashboard
         """
-        return self.model.get_dashboard_metrics()
\ No newline at end of file
+        return self.model.get_dashboard_metrics()
+    
+    def obtener_metricas_filtradas(self, filters=None):
+        """
+        Obtiene métricas del dashboard para un subconjunto filtrado
+        
+        Returns:
+            Diccionario con métricas del corte
+        """
+        return self.model.get_filtered_metrics(filters)
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Upsert por lotes según el tamaño serializado de cada registro
+Los lotes que fallan se dividen a la mitad y se reintentan con backoff exponencial con jitter
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class AdaptiveUpserter:
+    """
+    Agrupa registros {'id', 'values', 'metadata'} sin superar max_request_bytes
+    ni max_batch_items, y reporta la latencia de cada lote enviado
+    """
+
+    def __init__(self, upsert: Callable[[List[Dict[str, Any]]], Any], max_request_bytes: int = 1_500_000,
+                 max_batch_items: int = 1000, max_retries: int = 3, backoff_seconds: float = 0.5,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.upsert = upsert
+        self.max_request_bytes = max_request_bytes
+        self.max_batch_items = max_batch_items
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+
+    @staticmethod
+    def estimate_bytes(record: Dict[str, Any]) -> int:
+        """Tamaño aproximado del registro serializado en JSON (~12 bytes por float)"""
+        metadata = json.dumps(record.get('metadata', {}), ensure_ascii=False, default=str)
+        return len(record['id']) + 12 * len(record['values']) + len(metadata.encode('utf-8')) + 64
+
+    def batches(self, records: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch, batch_bytes = [], 0
+        for record in records:
+            size = self.estimate_bytes(record)
+            if batch and (batch_bytes + size > self.max_request_bytes or len(batch) >= self.max_batch_items):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(record)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _backoff(self, attempt: int):
+        self.sleep(self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def _send(self, batch: List[Dict[str, Any]], reports: List[Dict[str, Any]], attempt: int = 0):
+        started = time.perf_counter()
+        try:
+            self.upsert(batch)
+        except Exception as e:
+            if attempt >= self.max_retries:
+                raise Exception(f"Lote de {len(batch)} vectores rechazado tras {attempt + 1} intentos: {str(e)}")
+            self._backoff(attempt)
+            if len(batch) > 1:
+                # Un lote demasiado grande se reintenta como dos mitades
+                middle = len(batch) // 2
+                self._send(batch[:middle], reports, attempt + 1)
+                self._send(batch[middle:], reports, attempt + 1)
+            else:
+                self._send(batch, reports, attempt + 1)
+            return
+        reports.append({
+            "vectors": len(batch),
+            "bytes": sum(self.estimate_bytes(record) for record in batch),
+            "seconds": round(time.perf_counter() - started, 4),
+            "attempt": attempt + 1
+        })
+
+    def buffer(self) -> "UpsertBuffer":
+        """Acumulador de registros de varios bloques que envía lotes completos (ver UpsertBuffer)"""
+        return UpsertBuffer(self)
+
+    def upsert_all(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Envía todos los registros
+
+        Returns:
+            Reporte por lote enviado con éxito: vectores, bytes estimados, segundos e intento
+
+        Raises:
+            Exception si un lote sigue fallando tras max_retries
+        """
+        reports: List[Dict[str, Any]] = []
+        for batch in self.batches(records):
+            self._send(batch, reports)
+        return reports
+
+
+class UpsertBuffer:
+    """
+    Junta los registros que llegan en bloques pequeños (un bloque de embeddings)
+    y envía un lote en cuanto alcanza max_request_bytes o max_batch_items
+
+    Así el tamaño de los lotes no depende de cuántas filas se embeben por
+    llamada. Varios hilos pueden agregar a la vez: el lote completo se envía
+    fuera del lock. flush() envía lo que quede al terminar.
+    """
+
+    def __init__(self, upserter: AdaptiveUpserter):
+        self.upserter = upserter
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_bytes = 0
+
+    def _send_all(self, batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        reports: List[Dict[str, Any]] = []
+        for batch in batches:
+            self.upserter._send(batch, reports)
+        return reports
+
+    def add(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Returns:
+            Reportes de los lotes que se completaron y enviaron con estos registros
+        """
+        ready = []
+        with self._lock:
+            for record in records:
+                size = self.upserter.estimate_bytes(record)
+                if self._pending and (self._pending_bytes + size > self.upserter.max_request_bytes or
+                                      len(self._pending) >= self.upserter.max_batch_items):
+                    ready.append(self._pending)
+                    self._pending, self._pending_bytes = [], 0
+                self._pending.append(record)
+                self._pending_bytes += size
+        return self._send_all(ready)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Envía el lote incompleto que quede pendiente"""
+        with self._lock:
+            pending, self._pending, self._pending_bytes = self._pending, [], 0
+        return self._send_all([pending] if pending else [])
+
+
+def build_adaptive_upserter(upsert) -> AdaptiveUpserter:
+    """Upserter configurado (UPSERT_MAX_BYTES, UPSERT_MAX_ITEMS, UPSERT_MAX_RETRIES, UPSERT_BACKOFF_SECONDS)"""
+    return AdaptiveUpserter(
+        upsert,
+        max_request_bytes=int(os.getenv("UPSERT_MAX_BYTES", "1500000")),
+        max_batch_items=int(os.getenv("UPSERT_MAX_ITEMS", "1000")),
+        max_retries=int(os.getenv("UPSERT_MAX_RETRIES", "3")),
+        backoff_seconds=float(os.getenv("UPSERT_BACKOFF_SECONDS", "0.5"))
+    )
+
+
+def summarize_batches(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Resumen de latencias por lote (p50, p95, máximo) y reintentos"""
+    if not reports:
+        return {"batches": 0, "retried": 0, "p50_seconds": 0.0, "p95_seconds": 0.0, "max_seconds": 0.0}
+    latencies = sorted(report["seconds"] for report in reports)
+    return {
+        "batches": len(reports),
+        "retried": sum(1 for report in reports if report["attempt"] > 1),
+        "p50_seconds": latencies[len(latencies) // 2],
+        "p95_seconds": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max_seconds": latencies[-1]
+    }
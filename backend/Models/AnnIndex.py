@@ -0,0 +1,263 @@
+"""
+Índices de vecinos más cercanos aproximados (ANN) para el backend vectorial local
+IVF implementado en NumPy y HNSW con hnswlib (opcional)
+Los vectores se identifican por su número de fila en el store y deben estar normalizados (L2)
+"""
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Índice de archivo invertido: k-means sobre los vectores y búsqueda exacta
+    solo dentro de las nprobe listas más cercanas a la consulta
+
+    Se entrena con al menos 39 puntos por centroide y debe reentrenarse cuando
+    las filas crecen retrain_growth veces desde el último entrenamiento; si no,
+    las listas se desbalancean y el recall cae.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dimension: int, nlist: int = 256, nprobe: int = 8, train_iterations: int = 10,
+                 retrain_growth: float = 2.0):
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.retrain_growth = retrain_growth
+        self.trained_size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._lists = [set() for _ in range(nlist)]
+        self._row_list = np.full(0, -1, dtype=np.int32)
+        self._list_arrays = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def min_train_size(self) -> int:
+        return self.nlist * 39
+
+    def should_retrain(self, size: int) -> bool:
+        """True si las filas crecieron retrain_growth veces desde el último entrenamiento"""
+        return self.is_trained and size >= self.trained_size * self.retrain_growth
+
+    def train(self, vectors: np.ndarray, seed: int = 0, size: int = None):
+        """
+        K-means esférico (producto punto) sobre una muestra de vectores
+
+        Vacía las listas: las filas asignadas con los centroides anteriores deben
+        volver a agregarse. size es el número de filas que representa la muestra
+        (por defecto, len(vectors)).
+        """
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), self.nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=self.nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=self.nlist)
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        self.centroids = centroids
+        self.trained_size = len(vectors) if size is None else size
+        self._lists = [set() for _ in range(self.nlist)]
+        self._row_list = np.full(0, -1, dtype=np.int32)
+        self._list_arrays = {}
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Asigna (o reasigna) filas a su lista más cercana"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self.is_trained or len(rows) == 0:
+            return
+        self.remove(rows)
+        if rows.max() >= len(self._row_list):
+            grown = np.full(max(rows.max() + 1, len(self._row_list) * 2), -1, dtype=np.int32)
+            grown[:len(self._row_list)] = self._row_list
+            self._row_list = grown
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        for row, list_id in zip(rows.tolist(), assignment.tolist()):
+            self._lists[list_id].add(row)
+            self._list_arrays.pop(list_id, None)
+        self._row_list[rows] = assignment
+
+    def remove(self, rows: np.ndarray):
+        for row in np.asarray(rows, dtype=np.int64).tolist():
+            if row < len(self._row_list) and self._row_list[row] >= 0:
+                list_id = int(self._row_list[row])
+                self._lists[list_id].discard(row)
+                self._list_arrays.pop(list_id, None)
+                self._row_list[row] = -1
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_arrays.get(list_id)
+        if rows is None:
+            rows = np.fromiter(self._lists[list_id], dtype=np.int64, count=len(self._lists[list_id]))
+            self._list_arrays[list_id] = rows
+        return rows
+
+    def search(self, query: np.ndarray, k: int, vectors: np.ndarray,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (filas, scores) ordenados por similitud descendente
+
+        Con mask solo se consideran las filas marcadas; si las nprobe listas más
+        cercanas no reúnen k filas se siguen sondeando listas en orden de cercanía.
+        """
+        order = np.argsort(-(self.centroids @ query))
+        parts, found = [], 0
+        for position, list_id in enumerate(order):
+            if position >= self.nprobe and found >= k:
+                break
+            rows = self._list_rows(list_id)
+            if mask is not None and len(rows):
+                rows = rows[mask[rows]]
+            parts.append(rows)
+            found += len(rows)
+        candidates = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        if len(candidates) == 0:
+            return candidates, np.zeros(0, dtype=np.float32)
+        scores = vectors[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def save(self, path: str):
+        # Con un archivo abierto np.savez respeta el nombre (no agrega .npz)
+        with open(path, "wb") as handle:
+            np.savez(handle, centroids=self.centroids if self.is_trained else np.zeros((0, self.dimension)),
+                     row_list=self._row_list, nprobe=self.nprobe, trained_size=self.trained_size)
+
+    def load(self, path: str):
+        data = np.load(path)
+        self.centroids = data["centroids"].astype(np.float32) if len(data["centroids"]) else None
+        self.nprobe = int(data["nprobe"])
+        self.trained_size = int(data["trained_size"]) if "trained_size" in data else int((data["row_list"] >= 0).sum())
+        self._row_list = data["row_list"].astype(np.int32)
+        self._lists = [set() for _ in range(self.nlist)]
+        self._list_arrays = {}
+        for row in np.flatnonzero(self._row_list >= 0).tolist():
+            self._lists[int(self._row_list[row])].add(row)
+
+
+class HNSWIndex:
+    """Grafo HNSW (hnswlib) con inserción y borrado incremental"""
+
+    kind = "hnsw"
+
+    def __init__(self, dimension: int, M: int = 16, ef_construction: int = 200, ef: int = 64,
+                 initial_capacity: int = 1024):
+        import hnswlib
+        self.dimension = dimension
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._index = hnswlib.Index(space="ip", dim=dimension)
+        self._index.init_index(max_elements=initial_capacity, ef_construction=ef_construction, M=M,
+                               allow_replace_deleted=True)
+        self._index.set_ef(ef)
+        self._deleted = set()
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    def should_retrain(self, size: int) -> bool:
+        """El grafo se mantiene con cada inserción: nunca necesita reentrenarse"""
+        return False
+
+    def set_ef(self, ef: int):
+        self.ef = ef
+        self._index.set_ef(ef)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return
+        needed = self._index.get_current_count() + len(rows)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, self._index.get_max_elements() * 2))
+        for row in rows.tolist():
+            if row in self._deleted:
+                self._index.unmark_deleted(row)
+                self._deleted.discard(row)
+        self._index.add_items(vectors, rows)
+
+    def remove(self, rows: np.ndarray):
+        for row in np.asarray(rows, dtype=np.int64).tolist():
+            if row not in self._deleted:
+                try:
+                    self._index.mark_deleted(row)
+                    self._deleted.add(row)
+                except RuntimeError:
+                    continue
+
+    def search(self, query: np.ndarray, k: int, vectors: np.ndarray,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (filas, scores) ordenados por similitud descendente
+
+        Con mask el grafo descarta las filas no marcadas durante el recorrido
+        (filtro de hnswlib); si no alcanza k filas no retorna ninguna y el llamador
+        decide (LocalVectorStore cae a la búsqueda exacta).
+        """
+        available = self._index.get_current_count() - len(self._deleted)
+        if mask is not None:
+            available = min(available, int(mask.sum()))
+        k = min(k, available)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        self._index.set_ef(max(self.ef, k))
+        try:
+            if mask is None:
+                labels, distances = self._index.knn_query(query, k=k)
+            else:
+                size = len(mask)
+                labels, distances = self._index.knn_query(
+                    query, k=k, filter=lambda label: label < size and bool(mask[label]))
+        except RuntimeError:
+            # hnswlib no devuelve resultados parciales cuando el filtro deja menos de k
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def save(self, path: str):
+        self._index.save_index(path)
+        np.save(f"{path}.deleted.npy", np.fromiter(self._deleted, dtype=np.int64))
+
+    def load(self, path: str):
+        self._index.load_index(path, allow_replace_deleted=True)
+        self._index.set_ef(self.ef)
+        deleted_path = f"{path}.deleted.npy"
+        self._deleted = set(np.load(deleted_path).tolist()) if os.path.exists(deleted_path) else set()
+
+
+def build_ann_index(kind: Optional[str], dimension: int):
+    """Crea el índice ANN configurado (LOCAL_ANN_INDEX = none, ivf o hnsw)"""
+    kind = (kind or "none").lower()
+    if kind == "ivf":
+        return IVFIndex(
+            dimension,
+            nlist=int(os.getenv("IVF_NLIST", "256")),
+            nprobe=int(os.getenv("IVF_NPROBE", "8")),
+            retrain_growth=float(os.getenv("IVF_RETRAIN_GROWTH", "2"))
+        )
+    if kind == "hnsw":
+        return HNSWIndex(
+            dimension,
+            M=int(os.getenv("HNSW_M", "16")),
+            ef_construction=int(os.getenv("HNSW_EF_CONSTRUCTION", "200")),
+            ef=int(os.getenv("HNSW_EF", "64"))
+        )
+    if kind == "none":
+        return None
+    raise ValueError(f"Índice ANN no soportado: {kind}. Disponibles: none, ivf, hnsw")
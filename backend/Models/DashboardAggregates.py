@@ -0,0 +1,195 @@
+"""
+Agregados del dashboard mantenidos de forma incremental en la ingesta
+Cada fila aporta (estado, progreso, proyecto, asignado); los totales por archivo
+se guardan en el manifiesto del registro y se suman o restan al cambiar filas
+"""
+
+import copy
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+STATUSES = ("on_track", "at_risk", "delayed", "unknown")
+HISTOGRAM_BINS = 10
+PROGRESS_FIELDS = ['progreso', 'progress', 'avance', 'completado', 'porcentaje', '%']
+_NUMBER = re.compile(r'\d+\.?\d*')
+START_FIELDS = ('inicio', 'start')
+END_FIELDS = ('fin', 'end')
+
+
+@lru_cache(maxsize=256)
+def progress_candidates(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Columnas candidatas a progreso, en el orden en que se prueban
+
+    Depende solo de los nombres de columna, así que se resuelve una vez por
+    libro (todas sus filas comparten claves) y no por fila.
+    """
+    return tuple(key for field in PROGRESS_FIELDS for key in keys if field.lower() in key.lower())
+
+
+def extract_progress_value(metadata: Dict[str, Any]) -> Optional[float]:
+    """
+    Extrae el progreso (0-100) de la metadata de una fila
+
+    Recorre los nombres de campo habituales en orden y toma el primer valor
+    numérico de la primera columna cuyo nombre los contenga.
+    """
+    for key in progress_candidates(tuple(metadata)):
+        value = metadata[key]
+        try:
+            if isinstance(value, str):
+                numbers = _NUMBER.findall(value)
+                if numbers:
+                    return min(100, max(0, float(numbers[0])))
+            elif isinstance(value, (int, float)):
+                return min(100, max(0, float(value)))
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+@lru_cache(maxsize=256)
+def timeline_keys(keys: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Columnas candidatas a fecha de inicio y de fin"""
+    start = tuple(key for key in keys if any(word in key.lower() for word in START_FIELDS))
+    end = tuple(key for key in keys if key not in start and any(word in key.lower() for word in END_FIELDS))
+    return start, end
+
+
+def _parse_date(value: Any) -> Optional[str]:
+    text = str(value or '').strip()
+    for candidate, pattern in ((text[:10], "%Y-%m-%d"), (text[:10], "%d/%m/%Y")):
+        try:
+            return datetime.strptime(candidate, pattern).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def extract_timeline(metadata: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Fechas de inicio y fin (YYYY-MM-DD) de la fila; None si no hay una columna de fecha válida"""
+    start_keys, end_keys = timeline_keys(tuple(metadata))
+    start = next((date for date in map(_parse_date, (metadata[key] for key in start_keys)) if date), None)
+    end = next((date for date in map(_parse_date, (metadata[key] for key in end_keys)) if date), None)
+    return start, end
+
+
+def classify_status(progress: Optional[float]) -> str:
+    """Estado según el progreso: on_track (>= 80), at_risk (>= 50), delayed o unknown"""
+    if progress is None:
+        return "unknown"
+    if progress >= 80:
+        return "on_track"
+    if progress >= 50:
+        return "at_risk"
+    return "delayed"
+
+
+def row_contribution(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Aporte de una fila a los agregados"""
+    progress = extract_progress_value(metadata)
+    start, end = extract_timeline(metadata)
+    return {
+        "status": classify_status(progress),
+        "progress": progress,
+        "start": start,
+        "end": end,
+        "project_name": str(metadata.get("project_name") or ''),
+        "assignee": str(metadata.get("assignee") or '')
+    }
+
+
+def _empty_group() -> Dict[str, Any]:
+    return {"count": 0, "status": {status: 0 for status in STATUSES}, "progress_sum": 0.0, "progress_count": 0}
+
+
+def empty_aggregates() -> Dict[str, Any]:
+    return {**_empty_group(), "histogram": [0] * HISTOGRAM_BINS, "projects": {}, "assignees": {}}
+
+
+def _apply_group(group: Dict[str, Any], contribution: Dict[str, Any], sign: int):
+    group["count"] += sign
+    group["status"][contribution["status"]] += sign
+    if contribution["progress"] is not None:
+        group["progress_sum"] += sign * contribution["progress"]
+        group["progress_count"] += sign
+
+
+def apply_contribution(aggregates: Dict[str, Any], contribution: Dict[str, Any], sign: int = 1):
+    """Suma (sign=1) o resta (sign=-1) el aporte de una fila"""
+    _apply_group(aggregates, contribution, sign)
+    if contribution["progress"] is not None:
+        bucket = min(HISTOGRAM_BINS - 1, int(contribution["progress"] // (100 / HISTOGRAM_BINS)))
+        aggregates["histogram"][bucket] += sign
+    for field, groups in (("project_name", aggregates["projects"]), ("assignee", aggregates["assignees"])):
+        name = contribution.get(field)
+        if not name:
+            continue
+        group = groups.setdefault(name, _empty_group())
+        _apply_group(group, contribution, sign)
+        if group["count"] <= 0:
+            del groups[name]
+
+
+def merge_aggregates(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Suma agregados de varios archivos"""
+    merged = empty_aggregates()
+    for part in parts:
+        _merge_group(merged, part)
+        merged["histogram"] = [a + b for a, b in zip(merged["histogram"], part["histogram"])]
+        for key in ("projects", "assignees"):
+            for name, group in part[key].items():
+                _merge_group(merged[key].setdefault(name, _empty_group()), group)
+    return merged
+
+
+def _merge_group(target: Dict[str, Any], source: Dict[str, Any]):
+    target["count"] += source["count"]
+    target["progress_sum"] += source["progress_sum"]
+    target["progress_count"] += source["progress_count"]
+    for status in STATUSES:
+        target["status"][status] += source["status"].get(status, 0)
+
+
+def copy_aggregates(aggregates: Dict[str, Any]) -> Dict[str, Any]:
+    return copy.deepcopy(aggregates)
+
+
+def _group_metrics(group: Dict[str, Any]) -> Dict[str, Any]:
+    average = group["progress_sum"] / group["progress_count"] if group["progress_count"] else 0
+    return {
+        "activities": group["count"],
+        "on_track": group["status"]["on_track"],
+        "at_risk": group["status"]["at_risk"],
+        "delayed": group["status"]["delayed"],
+        "average_progress": round(average, 2)
+    }
+
+
+def to_metrics(aggregates: Dict[str, Any]) -> Dict[str, Any]:
+    """Métricas del dashboard (mismas claves que _calculate_project_metrics más histograma y desgloses)"""
+    total = aggregates["count"]
+    if not total:
+        return {
+            "total_projects": 0,
+            "projects_on_track": 0,
+            "projects_delayed": 0,
+            "average_progress": 0,
+            "risk_projects": 0,
+            "completion_rate": 0
+        }
+    average = aggregates["progress_sum"] / aggregates["progress_count"] if aggregates["progress_count"] else 0
+    return {
+        "total_projects": total,
+        "projects_on_track": aggregates["status"]["on_track"],
+        "projects_delayed": aggregates["status"]["delayed"],
+        "risk_projects": aggregates["status"]["at_risk"],
+        "average_progress": round(average, 2),
+        "completion_rate": round(aggregates["status"]["on_track"] / total * 100, 2),
+        "projects_analyzed": aggregates["progress_count"],
+        "progress_histogram": list(aggregates["histogram"]),
+        "by_project": {name: _group_metrics(group) for name, group in sorted(aggregates["projects"].items())},
+        "by_assignee": {name: _group_metrics(group) for name, group in sorted(aggregates["assignees"].items())}
+    }
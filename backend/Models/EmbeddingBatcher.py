@@ -0,0 +1,135 @@
+"""
+Micro-batching de embeddings de consultas
+Agrupa las consultas concurrentes que llegan en una ventana de pocos milisegundos
+en una sola llamada por lotes al proveedor (una por función de embeddings)
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class MicroBatchEmbedder:
+    """Cola de consultas atendida por un hilo que vectoriza en lotes"""
+
+    def __init__(self, embed_batch: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self.errors = 0
+        self._worker = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str, embed_batch: Optional[Callable[[List[str]], np.ndarray]] = None) -> Future:
+        """
+        Encola una consulta y retorna el Future con su vector
+
+        Args:
+            text: Consulta a vectorizar
+            embed_batch: Función de embeddings por lotes (por defecto la del constructor);
+                solo se agrupan las consultas con la misma función
+        """
+        embed_batch = embed_batch or self.embed_batch
+        if embed_batch is None:
+            raise ValueError("No hay función de embeddings para la consulta")
+        future = Future()
+        self._queue.put((text, embed_batch, future))
+        return future
+
+    def embed(self, text: str, embed_batch: Optional[Callable[[List[str]], np.ndarray]] = None,
+              timeout: Optional[float] = 30.0) -> list:
+        """Vectoriza una consulta esperando a que se procese su lote"""
+        return self.submit(text, embed_batch).result(timeout=timeout)
+
+    def stats(self):
+        """Tamaño promedio de los lotes atendidos"""
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "average_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "errors": self.errors,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000
+        }
+
+    def _collect(self):
+        """Espera la primera consulta y agrega las que lleguen antes del plazo"""
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                pending.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return pending
+
+    @staticmethod
+    def _resolve(future: Future, result=None, error: Exception = None):
+        """Entrega el resultado solo si el Future sigue pendiente (pudo cancelarse)"""
+        if future.done():
+            return
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _embed_group(self, embed_batch, group):
+        texts = [text for text, _, _ in group]
+        try:
+            embeddings = embed_batch(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Se esperaban {len(texts)} embeddings y se recibieron {len(embeddings)}")
+            results = [np.asarray(embedding).tolist() for embedding in embeddings]
+        except Exception as e:
+            self.errors += 1
+            for _, _, future in group:
+                self._resolve(future, error=e)
+            return
+        for (_, _, future), result in zip(group, results):
+            self._resolve(future, result)
+
+    def _run(self):
+        # El hilo no debe terminar nunca: las consultas siguientes esperarían hasta el timeout
+        while True:
+            pending = []
+            try:
+                pending = self._collect()
+                groups = {}
+                for item in pending:
+                    groups.setdefault(item[1], []).append(item)
+                for embed_batch, group in groups.items():
+                    self._embed_group(embed_batch, group)
+                self.batches += 1
+                self.texts += len(pending)
+            except Exception as e:
+                for _, _, future in pending:
+                    self._resolve(future, error=e)
+
+
+_shared_batcher = None
+_shared_batcher_lock = threading.Lock()
+
+
+def get_query_batcher() -> MicroBatchEmbedder:
+    """Batcher compartido por todas las instancias del proceso (cada consulta indica su función)"""
+    global _shared_batcher
+    with _shared_batcher_lock:
+        if _shared_batcher is None:
+            _shared_batcher = MicroBatchEmbedder(
+                max_batch_size=int(os.getenv("QUERY_BATCH_MAX_SIZE", "32")),
+                max_wait_ms=float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+            )
+        return _shared_batcher
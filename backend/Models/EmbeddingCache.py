@@ -0,0 +1,234 @@
+"""
+Caché de embeddings direccionada por contenido
+Nivel LRU en memoria del proceso + nivel persistente en SQLite
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Caché de vectores indexada por hash(modelo, tipo de tarea, texto)"""
+
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+        # Contadores expuestos por stats()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.api_seconds = 0.0
+        self.api_texts = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._connection = sqlite3.connect(db_path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def make_key(model: str, task_type: str, text: str) -> str:
+        """Genera la clave de contenido para un texto"""
+        payload = f"{model}\x00{task_type}\x00{text}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Busca varias claves, primero en memoria y luego en disco
+
+        Returns:
+            Diccionario clave -> vector solo con las claves encontradas
+        """
+        found = {}
+        with self._lock:
+            pending = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.hits += 1
+                else:
+                    pending.append(key)
+
+            if pending and self._connection is not None:
+                unique_pending = list(dict.fromkeys(pending))
+                for start in range(0, len(unique_pending), 500):
+                    chunk = unique_pending[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                pending_found = [key for key in pending if key in found]
+                self.disk_hits += len(pending_found)
+                self.hits += len(pending_found)
+                self.misses += len(pending) - len(pending_found)
+            else:
+                self.misses += len(pending)
+
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Guarda vectores en memoria y en disco"""
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+            if self._connection is not None:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+                )
+                self._connection.commit()
+
+    def record_api_call(self, seconds: float, texts_count: int):
+        """Registra el tiempo gastado en llamadas al proveedor"""
+        with self._lock:
+            self.api_seconds += seconds
+            self.api_texts += texts_count
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de aciertos, fallos y desalojos"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            seconds_per_text = self.api_seconds / self.api_texts if self.api_texts else 0.0
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "persistent": self._connection is not None,
+                "api_seconds": round(self.api_seconds, 3),
+                "estimated_seconds_saved": round(self.hits * seconds_per_text, 3)
+            }
+
+    def clear(self):
+        """Vacía ambos niveles de la caché"""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM embeddings")
+                self._connection.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Inserta en el nivel LRU y desaloja las entradas más antiguas"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+
+class QueryEmbeddingCache:
+    """LRU con expiración (TTL) para embeddings de consultas de búsqueda"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, query_text: str) -> Optional[np.ndarray]:
+        """Retorna el vector de la consulta si está vigente"""
+        with self._lock:
+            vector = self._pinned.get(query_text)
+            if vector is not None:
+                self.hits += 1
+                return vector
+
+            entry = self._entries.get(query_text)
+            if entry is not None:
+                vector, stored_at = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(query_text)
+                    self.hits += 1
+                    return vector
+                del self._entries[query_text]
+                self.expired += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, query_text: str, vector: np.ndarray, pinned: bool = False):
+        """
+        Guarda el vector de una consulta
+
+        Las consultas fijas (pinned) no expiran ni se desalojan.
+        """
+        with self._lock:
+            if pinned:
+                self._pinned[query_text] = vector
+                return
+            self._entries[query_text] = (vector, time.monotonic())
+            self._entries.move_to_end(query_text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de aciertos, fallos y expiraciones"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+_shared_cache = None
+_shared_query_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Caché compartida por todas las instancias del proceso"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            default_path = os.path.join(os.path.dirname(__file__), "..", "cache", "embeddings.sqlite")
+            db_path = os.getenv("EMBEDDING_CACHE_PATH", default_path)
+            _shared_cache = EmbeddingCache(
+                max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+                db_path=db_path or None
+            )
+        return _shared_cache
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Caché de consultas compartida por todas las instancias del proceso"""
+    global _shared_query_cache
+    with _shared_cache_lock:
+        if _shared_query_cache is None:
+            _shared_query_cache = QueryEmbeddingCache(
+                max_entries=int(os.getenv("QUERY_CACHE_SIZE", "1000")),
+                ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", "3600"))
+            )
+        return _shared_query_cache
@@ -0,0 +1,48 @@
+import threading
+
+from Models.EmbeddingProviders import (
+    FakeEmbeddingProvider,
+    GeminiEmbeddingProvider,
+    LocalEmbeddingProvider
+)
+from Models.OnnxEmbeddingEngine import OnnxEmbeddingProvider
+
+
+class factoryEmbedding:
+    # Proveedores registrados: nombre -> (clase, modelo por defecto, dimensión por defecto)
+    providers = {
+        # 1024 como el índice por defecto (PINECONE_INDEX=smaccb-pruebas1024)
+        "gemini": (GeminiEmbeddingProvider, "text-embedding-004", 1024),
+        "local": (LocalEmbeddingProvider, "sentence-transformers/all-MiniLM-L6-v2", 384),
+        "onnx": (OnnxEmbeddingProvider, "sentence-transformers/all-MiniLM-L6-v2", 384),
+        "fake": (FakeEmbeddingProvider, "hash-tokens", 384),
+    }
+
+    # Instancias compartidas por proceso (los modelos locales son costosos de cargar)
+    _instances = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, name, provider_class, default_model, default_dimension):
+        cls.providers[name] = (provider_class, default_model, default_dimension)
+
+    def getEmbedding(self, EMBEDDING_PROVEEDOR, EMBEDDING_MODEL=None, EMBEDDING_DIMENSION=None, API_KEY=None):
+        provider_name = (EMBEDDING_PROVEEDOR or "gemini").lower()
+        if provider_name not in self.providers:
+            raise ValueError(
+                f"Proveedor de embeddings no soportado: {EMBEDDING_PROVEEDOR}. "
+                f"Disponibles: {', '.join(sorted(self.providers))}"
+            )
+
+        provider_class, default_model, default_dimension = self.providers[provider_name]
+        model_name = EMBEDDING_MODEL or default_model
+        dimension = int(EMBEDDING_DIMENSION or default_dimension)
+
+        key = (provider_name, model_name, dimension)
+        with self._lock:
+            if key not in self._instances:
+                if provider_name == "gemini":
+                    self._instances[key] = provider_class(model_name, dimension, api_key=API_KEY)
+                else:
+                    self._instances[key] = provider_class(model_name, dimension)
+            return self._instances[key]
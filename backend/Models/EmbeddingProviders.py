@@ -0,0 +1,98 @@
+"""
+Proveedores de embeddings
+Cada proveedor declara su dimensión y vectoriza listas de textos en lote
+"""
+
+import hashlib
+import re
+from typing import List, Optional
+
+import numpy as np
+
+
+class EmbeddingProvider:
+    """Interfaz común de los proveedores de embeddings"""
+
+    name = "base"
+
+    def __init__(self, model_name: str, dimension: int):
+        self.model_name = model_name
+        self.dimension = dimension
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        """Retorna una matriz (len(texts), dimension) sin normalizar"""
+        raise NotImplementedError
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Embeddings remotos con la API de Gemini"""
+
+    name = "gemini"
+    # text-embedding-004 devuelve como máximo 768 valores; por encima se rellena con ceros
+    MAX_OUTPUT_DIMENSION = 768
+
+    def __init__(self, model_name: str, dimension: int, api_key: Optional[str] = None):
+        super().__init__(model_name, dimension)
+        import google.generativeai as genai
+        self._genai = genai
+        if api_key:
+            genai.configure(api_key=api_key)
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        options = {}
+        if self.dimension < self.MAX_OUTPUT_DIMENSION:
+            options['output_dimensionality'] = self.dimension
+        result = self._genai.embed_content(
+            model=self.model_name,
+            content=list(texts),
+            task_type=task_type,
+            **options
+        )
+        matrix = np.asarray(result['embedding'], dtype=np.float32)
+        # Ajustar a la dimensión configurada: rellenar con ceros o truncar
+        if matrix.shape[1] < self.dimension:
+            matrix = np.pad(matrix, ((0, 0), (0, self.dimension - matrix.shape[1])))
+        return matrix[:, :self.dimension]
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Embeddings locales en CPU con sentence-transformers (HuggingFace)"""
+
+    name = "local"
+
+    def __init__(self, model_name: str, dimension: int, device: str = "cpu"):
+        super().__init__(model_name, dimension)
+        from langchain_huggingface import HuggingFaceEmbeddings
+        self.model = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={'device': device},
+            encode_kwargs={
+                'normalize_embeddings': True
+            }
+        )
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        return np.asarray(self.model.embed_documents(list(texts)), dtype=np.float32)
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings deterministas basados en hash de tokens (sin red ni modelo)
+
+    Textos con palabras en común quedan cerca, útil para pruebas y benchmarks.
+    """
+
+    name = "fake"
+    _token_pattern = re.compile(r"\w+", re.UNICODE)
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self._token_pattern.findall(str(text).lower()):
+                digest = hashlib.md5(token.encode("utf-8")).digest()
+                position = int.from_bytes(digest[:4], "little") % self.dimension
+                sign = 1.0 if digest[4] & 1 else -1.0
+                matrix[row, position] += sign
+            if not matrix[row].any():
+                matrix[row, 0] = 1.0
+        return matrix
@@ -0,0 +1,125 @@
+"""
+Pipeline de ingesta concurrente: embeddings y upsert solapados
+Un pool acotado de workers genera embeddings por bloques y varios workers de
+escritura los envían a la base vectorial a medida que están listos
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+_DONE = object()
+
+
+class IngestionPipeline:
+    """
+    Etapas embedding → cola → escritura
+
+    Como mucho max_in_flight bloques están en memoria a la vez (embebiéndose,
+    en la cola o escribiéndose), así que la memoria no depende del tamaño del
+    libro, y el tiempo total queda acotado por la etapa más lenta.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], np.ndarray],
+                 write_batch: Callable[[List[Dict[str, Any]], np.ndarray], Any],
+                 chunk_size: int = 100, embed_workers: int = 2, write_workers: int = 4,
+                 max_in_flight: int = 8):
+        self.embed_batch = embed_batch
+        self.write_batch = write_batch
+        self.chunk_size = chunk_size
+        self.embed_workers = embed_workers
+        self.write_workers = write_workers
+        self.max_in_flight = max(max_in_flight, embed_workers)
+
+    def run(self, items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Procesa items con 'text' (y lo que necesite write_batch)
+
+        Returns:
+            Estadísticas: vectores, bloques, resultados de escritura y tiempos por etapa
+
+        Raises:
+            El primer error de cualquiera de las etapas
+        """
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        ready = queue.Queue()
+        errors: List[BaseException] = []
+        results: List[Any] = []
+        stats = {"vectors_count": 0, "chunks": 0, "embed_seconds": 0.0, "write_seconds": 0.0}
+        stats_lock = threading.Lock()
+
+        def embed(chunk):
+            try:
+                if not errors:
+                    started = time.perf_counter()
+                    embeddings = self.embed_batch([item['text'] for item in chunk])
+                    with stats_lock:
+                        stats["embed_seconds"] += time.perf_counter() - started
+                    ready.put((chunk, embeddings))
+                    return
+            except BaseException as e:
+                errors.append(e)
+            slots.release()
+
+        def write():
+            while True:
+                entry = ready.get()
+                if entry is _DONE:
+                    return
+                chunk, embeddings = entry
+                try:
+                    if not errors:
+                        started = time.perf_counter()
+                        result = self.write_batch(chunk, embeddings)
+                        with stats_lock:
+                            stats["write_seconds"] += time.perf_counter() - started
+                            stats["vectors_count"] += len(chunk)
+                            stats["chunks"] += 1
+                            results.append(result)
+                except BaseException as e:
+                    errors.append(e)
+                finally:
+                    slots.release()
+
+        started = time.perf_counter()
+        writers = [threading.Thread(target=write, daemon=True) for _ in range(self.write_workers)]
+        for writer in writers:
+            writer.start()
+
+        iterator = iter(items)
+        with ThreadPoolExecutor(max_workers=self.embed_workers) as embedders:
+            while not errors:
+                chunk = list(islice(iterator, self.chunk_size))
+                if not chunk:
+                    break
+                slots.acquire()
+                embedders.submit(embed, chunk)
+
+        for _ in writers:
+            ready.put(_DONE)
+        for writer in writers:
+            writer.join()
+
+        if errors:
+            raise errors[0]
+        stats["results"] = results
+        stats["wall_seconds"] = time.perf_counter() - started
+        return stats
+
+
+def build_ingestion_pipeline(embed_batch, write_batch, chunk_size: int) -> IngestionPipeline:
+    """Pipeline con la concurrencia configurada (INGEST_EMBED_WORKERS, INGEST_UPSERT_WORKERS, INGEST_MAX_IN_FLIGHT)"""
+    return IngestionPipeline(
+        embed_batch,
+        write_batch,
+        chunk_size=chunk_size,
+        embed_workers=int(os.getenv("INGEST_EMBED_WORKERS", "2")),
+        write_workers=int(os.getenv("INGEST_UPSERT_WORKERS", "4")),
+        max_in_flight=int(os.getenv("INGEST_MAX_IN_FLIGHT", "8"))
+    )
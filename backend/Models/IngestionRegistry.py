@@ -0,0 +1,394 @@
+"""
+Registro de ingesta por archivo (file_source)
+Guarda la huella de contenido de cada fila ya indexada para que una nueva
+carga del mismo libro solo vectorice las filas que cambiaron, y la generación
+visible de cada archivo
+
+Cada carga crea una generación g. Los vectores nuevos o modificados se escriben
+con valid_from = g y las versiones que reemplazan reciben valid_to = g; ninguna
+de las dos cosas cambia lo que ven las consultas hasta que el manifiesto se
+reemplaza (os.replace) con la generación g. Las versiones reemplazadas quedan en
+'pending_gc' hasta que se eliminan en segundo plano. Si una carga se interrumpe,
+los vectores que alcanzó a escribir quedan en 'abandoned' y la siguiente carga del
+archivo los da por reemplazados.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from Models.DashboardAggregates import (
+    apply_contribution, copy_aggregates, empty_aggregates, merge_aggregates, row_contribution
+)
+from Models.MetricsEngine import ColumnarMetrics
+
+# Campos con índice exacto campo -> valor -> IDs de vectores visibles
+ENTITY_FIELDS = ("project_name", "assignee")
+
+# valid_to de las versiones vigentes (Pinecone no permite filtrar por campos ausentes)
+OPEN_GENERATION = 2 ** 31 - 1
+
+
+class IngestionRegistry:
+    """
+    Un manifiesto JSON por file_source con generación, filas
+    {row_id: {hash, vector_id, project_name, assignee, status, progress, start, end}},
+    agregados, pending_gc y abandoned
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._source_locks: Dict[str, threading.Lock] = {}
+        self._generations_cache: Dict[str, Any] = {}
+        self._generations_snapshot = (None, 0, {})
+        self._entity_cache = (None, {})
+        self._aggregates_cache = (None, None)
+        self._metrics_cache = (None, None)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, file_source: str) -> str:
+        digest = hashlib.sha1(file_source.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    @contextmanager
+    def lock(self, file_source: str):
+        """
+        Serializa las cargas de un mismo archivo entre hilos y entre procesos
+
+        Los workers de gunicorn comparten el directorio del registro: el lock de
+        archivo ({digest}.lock) es el que los excluye; el de hilo evita que dos
+        hilos del mismo proceso compitan por él.
+        """
+        with self._lock:
+            source_lock = self._source_locks.setdefault(file_source, threading.Lock())
+        with source_lock:
+            with open(f"{self._path(file_source)[:-len('.json')]}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, file_source: str) -> Dict[str, Any]:
+        path = self._path(file_source)
+        if not os.path.exists(path):
+            return {"file_source": file_source, "generation": 0, "rows": {}, "pending_gc": [], "abandoned": []}
+        with open(path, "r", encoding="utf-8") as handle:
+            state = json.load(handle)
+        state.setdefault("generation", 0)
+        state.setdefault("pending_gc", [])
+        state.setdefault("abandoned", [])
+        return state
+
+    def save(self, file_source: str, state: Dict[str, Any]):
+        """Escritura atómica (archivo temporal + os.replace)"""
+        path = self._path(file_source)
+        with self._lock:
+            temporary = f"{path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump(state, handle, ensure_ascii=False)
+            os.replace(temporary, path)
+
+    def generations(self) -> Dict[str, int]:
+        """
+        Generación visible de cada archivo registrado
+
+        Cada guardado (os.replace) cambia el mtime del directorio, así que el
+        directorio se recorre solo si cambió. Como dos cambios dentro del mismo
+        tick del reloj del sistema de archivos dejan el mismo mtime, la copia solo
+        se reutiliza si el directorio no cambió en el último segundo antes de leerla.
+        """
+        stat = os.stat(self.directory)
+        token = (stat.st_ino, stat.st_mtime_ns)
+        cached_token, scanned_at, cached = self._generations_snapshot
+        if cached_token == token and scanned_at - stat.st_mtime_ns > 1_000_000_000:
+            return cached
+
+        scanned_at = time.time_ns()
+        generations, cache = {}, {}
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            # os.replace crea un inodo nuevo en cada guardado
+            version = (entry.inode(), entry.stat().st_mtime_ns)
+            cached = self._generations_cache.get(entry.path)
+            if cached is None or cached[0] != version:
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as handle:
+                        state = json.load(handle)
+                except (OSError, ValueError):
+                    continue
+                cached = (version, state["file_source"], state.get("generation", 0))
+            cache[entry.path] = cached
+            if cached[2]:
+                generations[cached[1]] = cached[2]
+        self._generations_cache = cache
+        self._generations_snapshot = (token, scanned_at, generations)
+        return generations
+
+    def _manifest_versions(self) -> tuple:
+        return tuple(sorted((entry.name, entry.inode(), entry.stat().st_mtime_ns)
+                            for entry in os.scandir(self.directory) if entry.name.endswith(".json")))
+
+    def _states(self, versions: tuple):
+        """Manifiestos legibles de una lista de versiones"""
+        for name, _, _ in versions:
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as handle:
+                    yield json.load(handle)
+            except (OSError, ValueError):
+                continue
+
+    def version(self) -> str:
+        """Token que cambia cada vez que se guarda o elimina un manifiesto (también en otros procesos)"""
+        return hashlib.sha1(repr(self._manifest_versions()).encode('utf-8')).hexdigest()
+
+    def entity_index(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Índice {campo: {valor: [IDs de vectores]}} de las generaciones confirmadas
+
+        Se reconstruye solo cuando cambia algún manifiesto; las consultas son
+        búsquedas en diccionario, sin embeddings.
+        """
+        versions = self._manifest_versions()
+        cached_versions, index = self._entity_cache
+        if cached_versions == versions:
+            return index
+        index = {field: {} for field in ENTITY_FIELDS}
+        for state in self._states(versions):
+            for row in state.get("rows", {}).values():
+                if not isinstance(row, dict):
+                    continue
+                for field in ENTITY_FIELDS:
+                    if row.get(field):
+                        index[field].setdefault(row[field], []).append(row["vector_id"])
+        self._entity_cache = (versions, index)
+        return index
+
+    def lookup(self, field: str, value: str, offset: int = 0, limit: int = None) -> Dict[str, Any]:
+        """
+        IDs de los vectores con un valor exacto del campo, paginados
+
+        Returns:
+            Diccionario con 'ids' (página) y 'total'
+        """
+        ids = self.entity_index().get(field, {}).get(value, [])
+        end = None if limit is None else offset + limit
+        return {"ids": ids[offset:end], "total": len(ids)}
+
+    def values(self, field: str, contains: str = '') -> List[str]:
+        """Valores registrados del campo; con contains, los que lo incluyen (sin distinguir mayúsculas)"""
+        values = self.entity_index().get(field, {})
+        needle = contains.lower()
+        return [value for value in values if needle in value.lower()]
+
+    def plan(self, file_source: str, vectors_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compara las filas nuevas con las indexadas y prepara la siguiente generación
+
+        Returns:
+            Diccionario con 'generation', 'upsert' (filas nuevas o modificadas con su
+            ID versionado), 'superseded' (IDs de vectores que dejan de ser visibles),
+            'rows' (estado a guardar), 'aggregates' (agregados del dashboard del
+            archivo, actualizados solo con las filas que cambian) y 'counts'
+        """
+        planner = self.planner(file_source)
+        upsert = planner.add(vectors_data)
+        return {**planner.finish(), "upsert": upsert}
+
+    def planner(self, file_source: str) -> "IngestionPlanner":
+        """Plan de la siguiente generación por bloques de filas (cargas por streaming)"""
+        return IngestionPlanner(self, file_source)
+
+    @staticmethod
+    def _entry_fields(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        contribution = row_contribution(metadata)
+        return {field: contribution[field] for field in ("status", "progress", "start", "end")}
+
+    @staticmethod
+    def _contribution(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: entry.get(field) for field in ("status", "progress", "project_name", "assignee")}
+
+    def dashboard_aggregates(self) -> Dict[str, Any]:
+        """Agregados de todas las generaciones confirmadas (se suman solo si cambió algún manifiesto)"""
+        versions = self._manifest_versions()
+        cached_versions, aggregates = self._aggregates_cache
+        if cached_versions == versions:
+            return aggregates
+        parts = [state["aggregates"] for state in self._states(versions)
+                 if state.get("aggregates") and state.get("generation")]
+        aggregates = merge_aggregates(parts)
+        self._aggregates_cache = (versions, aggregates)
+        return aggregates
+
+    def metrics_engine(self) -> ColumnarMetrics:
+        """Columnas de métricas de las generaciones confirmadas (se reconstruyen solo si cambió algún manifiesto)"""
+        versions = self._manifest_versions()
+        cached_versions, engine = self._metrics_cache
+        if cached_versions == versions:
+            return engine
+        entries = []
+        for state in self._states(versions):
+            if not state.get("generation"):
+                continue
+            for row in state.get("rows", {}).values():
+                if isinstance(row, dict):
+                    entries.append({**row, "file_source": state["file_source"]})
+        engine = ColumnarMetrics.from_entries(entries)
+        self._metrics_cache = (versions, engine)
+        return engine
+
+    def commit(self, file_source: str, plan: Dict[str, Any]):
+        """Hace visible la generación del plan; sus versiones reemplazadas pasan a pending_gc"""
+        state = self.load(file_source)
+        self.save(file_source, {
+            "file_source": file_source,
+            "generation": plan["generation"],
+            "rows": plan["rows"],
+            "aggregates": plan["aggregates"],
+            "pending_gc": state["pending_gc"] + plan["superseded"]
+        })
+
+    def abandon(self, file_source: str, vector_ids: List[str]):
+        """
+        Anota los vectores de una generación que no llegó a confirmarse (requiere self.lock)
+
+        Siguen ocultos (valid_from es mayor que la generación visible); la siguiente
+        carga del archivo reescribe los que vuelve a necesitar y pasa el resto a pending_gc.
+        """
+        state = self.load(file_source)
+        abandoned = set(state["abandoned"])
+        state["abandoned"] = state["abandoned"] + [vector_id for vector_id in vector_ids if vector_id not in abandoned]
+        self.save(file_source, state)
+
+    def clear(self):
+        """Olvida todos los archivos registrados (tras vaciar el índice)"""
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+            self._generations_cache = {}
+            self._generations_snapshot = (None, 0, {})
+
+    def pending_gc(self, file_source: str) -> List[str]:
+        return list(self.load(file_source)["pending_gc"])
+
+    def release(self, file_source: str, vector_ids: List[str]):
+        """Quita de pending_gc los vectores ya eliminados del índice"""
+        with self.lock(file_source):
+            state = self.load(file_source)
+            released = set(vector_ids)
+            state["pending_gc"] = [vector_id for vector_id in state["pending_gc"] if vector_id not in released]
+            self.save(file_source, state)
+
+
+class IngestionPlanner:
+    """
+    Prepara la siguiente generación de un archivo a medida que llegan sus filas
+
+    add(vectors_data) compara un bloque con las filas indexadas y devuelve los
+    vectores a escribir; finish() cierra el plan con las filas que desaparecieron.
+    Solo se guarda el estado por fila (huella e ID), no los vectores del bloque.
+    """
+
+    def __init__(self, registry: IngestionRegistry, file_source: str):
+        self.registry = registry
+        state = registry.load(file_source)
+        self.previous = state["rows"]
+        self.generation = state["generation"] + 1
+        self.rows, self.superseded = {}, []
+        # Vectores de una carga interrumpida de esta misma generación
+        self.abandoned = set(state["abandoned"])
+        self.counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        # Manifiestos sin agregados o sin aporte por fila se recalculan completos al final
+        self.incremental = "aggregates" in state and all(
+            isinstance(old, dict) and "status" in old for old in self.previous.values()
+        )
+        self.aggregates = copy_aggregates(state["aggregates"]) if self.incremental else None
+
+    def add(self, vectors_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Registra un bloque de filas y devuelve las nuevas o modificadas con su ID versionado"""
+        registry, generation, upsert = self.registry, self.generation, []
+        for data in vectors_data:
+            row_id = data['id']
+            fingerprint = data['metadata']['content_hash']
+            old = self.previous.get(row_id)
+            is_validation = data['metadata'].get('analysis_type') == 'file_validation'
+            entities = {field: str(data['metadata'].get(field) or '') for field in ENTITY_FIELDS}
+            if isinstance(old, dict) and old["hash"] == fingerprint:
+                self.rows[row_id] = {**old, **entities}
+                if "start" not in old:
+                    self.rows[row_id].update(registry._entry_fields(data['metadata']))
+                if not is_validation:
+                    self.counts["unchanged"] += 1
+                continue
+
+            vector_id = f"{row_id}@{generation}"
+            self.abandoned.discard(vector_id)
+            self.rows[row_id] = {"hash": fingerprint, "vector_id": vector_id, **entities,
+                                 **registry._entry_fields(data['metadata'])}
+            if self.incremental:
+                if old is not None:
+                    apply_contribution(self.aggregates, registry._contribution(old), -1)
+                apply_contribution(self.aggregates, registry._contribution(self.rows[row_id]), 1)
+            upsert.append({
+                **data,
+                'id': vector_id,
+                'metadata': {**data['metadata'], 'generation': generation,
+                             'valid_from': generation, 'valid_to': OPEN_GENERATION}
+            })
+            if old is not None:
+                # Manifiestos anteriores a las generaciones guardaban solo la huella
+                self.superseded.append(old["vector_id"] if isinstance(old, dict) else row_id)
+            if not is_validation:
+                self.counts["changed" if old is not None else "added"] += 1
+        return upsert
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Diccionario con 'generation', 'superseded', 'rows', 'aggregates' y 'counts'
+            (lo que necesita IngestionRegistry.commit)
+        """
+        registry = self.registry
+        for row_id, old in self.previous.items():
+            if row_id not in self.rows:
+                self.superseded.append(old["vector_id"] if isinstance(old, dict) else row_id)
+                if self.incremental:
+                    apply_contribution(self.aggregates, registry._contribution(old), -1)
+                if not row_id.startswith("validation_"):
+                    self.counts["removed"] += 1
+        # Los que esta carga no reescribió se ocultan y eliminan como cualquier versión reemplazada
+        self.superseded.extend(sorted(self.abandoned))
+
+        aggregates = self.aggregates
+        if not self.incremental:
+            aggregates = empty_aggregates()
+            for entry in self.rows.values():
+                apply_contribution(aggregates, registry._contribution(entry), 1)
+
+        return {"generation": self.generation, "superseded": self.superseded,
+                "rows": self.rows, "aggregates": aggregates, "counts": self.counts}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_ingestion_registry() -> IngestionRegistry:
+    """Registro compartido del proceso (INGEST_STATE_DIR, por defecto backend/cache/ingest_state)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                directory = os.getenv("INGEST_STATE_DIR") or os.path.join(
+                    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "ingest_state"
+                )
+                _registry = IngestionRegistry(directory)
+    return _registry
@@ -1,25 +1,39 @@
 # from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.chains.combine_documents import create_stuff_documents_chain
 from Config.LlmConfig import SettingsLlm
 from Models.ModelFactory import factoryLlm
 
 class ModeLlm(SettingsLlm):
     def __init__(self):
         self.factory = factoryLlm()
-        self.model = self.factory.getLlm(
-            self.LLM_PROVEEDOR,
-            self.LLM_MODEL,
-            self.API_KEY,
-            self.temperature,
-            self.max_tokens
-        )
-        # Memoria de conversación usando la nueva API
-        self.chat_history = InMemoryChatMessageHistory()
+        # El cliente del LLM y la memoria se crean en el primer uso
+        self._model = None
+        self._chat_history = None
         self.max_messages = 6  # Limitar a 6 mensajes (3 intercambios)
 
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self.factory.getLlm(
+                self.LLM_PROVEEDOR,
+                self.LLM_MODEL,
+                self.API_KEY,
+                self.temperature,
+                self.max_tokens
+            )
+        return self._model
+
+    @property
+    def chat_history(self):
+        # Memoria de conversación usando la nueva API
+        if self._chat_history is None:
+            from langchain_core.chat_history import InMemoryChatMessageHistory
+            self._chat_history = InMemoryChatMessageHistory()
+        return self._chat_history
+
     def sendPrompt(self, prompt: str, context: str):
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+        
         # Obtener historial de conversación
         # messages_history = self.chat_history.messages
         
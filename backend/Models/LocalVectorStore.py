@@ -0,0 +1,540 @@
+"""
+Base de datos vectorial local (NumPy)
+Misma interfaz que databaseVectormodel, sin red ni cuenta de Pinecone
+"""
+
+import glob
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, List
+
+import numpy as np
+
+from Models.databaseVectorModel import databaseVectormodel
+from Models.AnnIndex import build_ann_index
+from Models.SharedVectorIndex import get_shared_publisher
+from Models.MetadataFilter import InvertedIndex, normalize_filters
+from Models.VectorStorage import InMemoryStorage, SegmentedStorage
+
+
+class LocalVectorStore(databaseVectormodel):
+    """
+    Embeddings en una matriz float32 y metadata en columnas
+
+    La búsqueda es un producto matriz-vector más argpartition para el top-k,
+    o un índice ANN (IVF/HNSW) si se configura LOCAL_ANN_INDEX. Con
+    LOCAL_VECTOR_DIR los vectores se guardan en segmentos mapeados en memoria
+    que comparten todos los procesos que abren el mismo directorio; el índice
+    ANN se guarda junto a ellos en cada checkpoint() (tras una carga confirmada
+    o una compactación) y se reutiliza al arrancar si corresponde a la misma
+    versión del manifiesto.
+    """
+
+    # Con menos filas visibles que esta fracción de las vivas se usa la búsqueda exacta
+    ANN_MIN_VISIBLE_FRACTION = float(os.getenv("ANN_MIN_VISIBLE_FRACTION", "0.5"))
+
+    def __init__(self, initial_capacity: int = 1024, ann_index: str = None, directory: str = None,
+                 registry=None):
+        super().__init__(registry=registry)
+        self.record = "local"
+        self._lock = threading.RLock()
+        self._initial_capacity = initial_capacity
+        self._ann_kind = ann_index or os.getenv("LOCAL_ANN_INDEX", "none")
+        self._directory = directory or os.getenv("LOCAL_VECTOR_DIR") or None
+        if self._directory:
+            self._storage = SegmentedStorage(
+                self._directory,
+                self.embedding_dimension,
+                segment_rows=int(os.getenv("LOCAL_SEGMENT_ROWS", "65536")),
+                compaction_threshold=float(os.getenv("LOCAL_COMPACTION_THRESHOLD", "0.3"))
+            )
+        else:
+            self._storage = InMemoryStorage(self.embedding_dimension, initial_capacity)
+        self._ann = build_ann_index(self._ann_kind, self.embedding_dimension)
+        self._filter_index = InvertedIndex()
+        self._reset_visibility()
+        self._storage.refresh()
+        self._persisted_version = None
+        ann_loaded = self._load_persisted_ann()
+        self._index_rows(np.flatnonzero(self._storage.alive).tolist(), ann=not ann_loaded)
+        if isinstance(self._storage, SegmentedStorage):
+            # Compacta en segundo plano cuando el almacenamiento acumula borrados
+            self._compactor = threading.Thread(target=self._compaction_loop, name="segment-compactor", daemon=True)
+            self._compactor.start()
+
+    def get_index(self):
+        """No hay índice remoto: el propio store actúa como índice"""
+        return self
+
+    @property
+    def storage(self):
+        return self._storage
+
+    @property
+    def total_vectors(self) -> int:
+        return int(self._storage.alive.sum())
+
+    @property
+    def ann_index(self):
+        return self._ann
+
+    def _index_rows(self, rows: List[int], ann: bool = True):
+        """Mantiene los índices al día; IVF se entrena al alcanzar el tamaño mínimo"""
+        if len(rows) == 0:
+            return
+        metadatas = [self._storage.metadata(row) for row in rows]
+        self._filter_index.add(rows, metadatas)
+        self._track_visibility(rows, metadatas)
+        if self._ann is None or not ann:
+            return
+        if self._ann.is_trained:
+            rows = np.asarray(rows, dtype=np.int64)
+            self._ann.add(rows, self._storage.vectors[rows])
+        alive = int(self._storage.alive.sum())
+        if (not self._ann.is_trained and alive >= self._ann.min_train_size) or self._ann.should_retrain(alive):
+            self._train_ann()
+
+    def _train_ann(self, block_rows: int = 65536):
+        """
+        Entrena (o reentrena) IVF con una muestra de las filas vivas y reasigna todas
+
+        Se llama al alcanzar el tamaño mínimo y cada vez que las filas crecen
+        IVF_RETRAIN_GROWTH veces, así que el costo total se amortiza en las
+        inserciones. Los vectores se leen por bloques para no copiar la matriz.
+        """
+        alive_rows = np.flatnonzero(self._storage.alive)
+        sample_size = min(len(alive_rows), self._ann.nlist * 64)
+        sample = np.sort(np.random.default_rng(0).choice(alive_rows, size=sample_size, replace=False))
+        self._ann.train(self._storage.vectors[sample], size=len(alive_rows))
+        for start in range(0, len(alive_rows), block_rows):
+            rows = alive_rows[start:start + block_rows]
+            self._ann.add(rows, self._storage.vectors[rows])
+
+    def _unindex_rows(self, rows: List[int]):
+        """Quita filas eliminadas o reemplazadas de todos los índices"""
+        if len(rows) == 0:
+            return
+        self._filter_index.remove(rows)
+        if self._ann is not None:
+            self._ann.remove(rows)
+        rows = np.asarray(rows, dtype=np.int64)
+        self._visible[rows[rows < len(self._visible)]] = False
+
+    def _sync(self):
+        """Aplica a los índices los cambios hechos en el almacenamiento por otros procesos"""
+        added, removed = self._storage.refresh()
+        self._unindex_rows(removed)
+        self._index_rows(added)
+
+    # ----- visibilidad por generación -----
+
+    def _reset_visibility(self):
+        self._sources: Dict[str, int] = {}
+        self._source_codes = np.full(0, -1, dtype=np.int32)
+        self._valid_from = np.full(0, np.inf, dtype=np.float64)
+        self._valid_to = np.full(0, -np.inf, dtype=np.float64)
+        self._visible = np.zeros(0, dtype=bool)
+        self._generations: Dict[str, int] = {}
+        self._source_generations = np.zeros(0, dtype=np.float64)
+
+    def _grow_visibility(self, size: int):
+        if size <= len(self._visible):
+            return
+        size = max(size, len(self._visible) * 2)
+        for name, fill in (("_source_codes", -1), ("_valid_from", np.inf), ("_valid_to", -np.inf),
+                           ("_visible", False)):
+            current = getattr(self, name)
+            grown = np.full(size, fill, dtype=current.dtype)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+
+    def _rows_visible(self, rows) -> np.ndarray:
+        """Filas vivas cuyo archivo no está registrado o cuya vigencia incluye la generación confirmada"""
+        codes = self._source_codes[rows]
+        generation = np.where(codes >= 0, self._source_generations[np.maximum(codes, 0)], 0.0) \
+            if len(self._source_generations) else np.zeros(len(codes))
+        current = (self._valid_from[rows] <= generation) & (self._valid_to[rows] > generation)
+        return self._storage.alive[rows] & ((generation == 0) | current)
+
+    def _track_visibility(self, rows: List[int], metadatas: List[Dict[str, Any]]):
+        """Guarda archivo y vigencia de las filas indexadas y calcula su visibilidad"""
+        rows = np.asarray(rows, dtype=np.int64)
+        self._grow_visibility(max(int(rows.max()) + 1, len(self._storage.alive)))
+        for row, metadata in zip(rows.tolist(), metadatas):
+            file_source = metadata.get('file_source')
+            self._source_codes[row] = -1 if file_source is None else \
+                self._sources.setdefault(file_source, len(self._sources))
+            valid_from, valid_to = metadata.get('valid_from'), metadata.get('valid_to')
+            self._valid_from[row] = np.inf if valid_from is None else valid_from
+            self._valid_to[row] = -np.inf if valid_to is None else valid_to
+        if len(self._sources) > len(self._source_generations):
+            self._apply_generations(self._generations, rows=rows)
+        else:
+            self._visible[rows] = self._rows_visible(rows)
+
+    def _apply_generations(self, generations: Dict[str, int], rows=None):
+        """Recalcula la visibilidad (de todas las filas o de rows) con las generaciones confirmadas"""
+        self._generations = generations
+        self._source_generations = np.zeros(len(self._sources), dtype=np.float64)
+        for file_source, code in self._sources.items():
+            self._source_generations[code] = generations.get(file_source, 0)
+        if rows is None:
+            rows = np.arange(min(len(self._visible), len(self._storage.alive)))
+        self._visible[rows] = self._rows_visible(rows)
+
+    def _visible_mask(self) -> np.ndarray:
+        """
+        Filas vivas y visibles según la generación confirmada de cada archivo (ver IngestionRegistry)
+
+        La máscara se mantiene al indexar y quitar filas; solo se recalcula completa
+        (vectorizada) cuando cambia la generación confirmada de algún archivo.
+        """
+        generations = self.registry.generations()
+        if generations != self._generations:
+            self._apply_generations(generations)
+        self._grow_visibility(len(self._storage.alive))
+        return self._visible[:len(self._storage.alive)]
+
+    def _write(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
+        """Escribe filas y mantiene el índice ANN (requiere self._lock)"""
+        self._sync()
+        rows, replaced = self._storage.write(ids, embeddings, metadatas)
+        self._unindex_rows(replaced)
+        self._index_rows(rows)
+
+    def save_ann(self, path: str):
+        """Persiste el índice ANN"""
+        if self._ann is not None:
+            with self._lock:
+                self._ann.save(path)
+
+    def load_ann(self, path: str):
+        """Carga un índice ANN persistido (debe corresponder a las filas actuales)"""
+        if self._ann is not None and os.path.exists(path):
+            with self._lock:
+                self._ann.load(path)
+
+    def _ann_manifest_path(self):
+        """Descriptor del índice ANN guardado junto a los segmentos (None si no aplica)"""
+        if self._ann is None or not isinstance(self._storage, SegmentedStorage):
+            return None
+        return os.path.join(self._directory, f"ann_{self._ann.kind}.json")
+
+    def _load_persisted_ann(self) -> bool:
+        """Carga el índice ANN guardado si corresponde a la versión actual de los segmentos"""
+        manifest_path = self._ann_manifest_path()
+        if manifest_path is None or not os.path.exists(manifest_path):
+            return False
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as handle:
+                saved = json.load(handle)
+            if saved["manifest_version"] != self._storage.version:
+                return False
+            self._ann.load(os.path.join(self._directory, saved["file"]))
+            self._persisted_version = saved["manifest_version"]
+            return True
+        except Exception as e:
+            print(f"Índice ANN guardado no utilizable, se reconstruye: {str(e)}")
+            self._ann = build_ann_index(self._ann_kind, self.embedding_dimension)
+            return False
+
+    def _persist_ann(self):
+        """
+        Guarda el índice ANN con la versión de los segmentos que refleja (requiere self._lock)
+
+        Cada proceso escribe su propio archivo y luego reemplaza el descriptor, así
+        que un arranque concurrente nunca lee un índice a medio escribir.
+        """
+        manifest_path = self._ann_manifest_path()
+        if manifest_path is None or not self._ann.is_trained:
+            return
+        try:
+            self._sync()
+            version = self._storage.version
+            if version == self._persisted_version:
+                return
+            prefix = f"ann_{self._ann.kind}_"
+            name = f"{prefix}{version}_{os.getpid()}.bin"
+            self._ann.save(os.path.join(self._directory, name))
+            temporary = f"{manifest_path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump({"manifest_version": version, "file": name}, handle)
+            os.replace(temporary, manifest_path)
+            self._persisted_version = version
+            # Solo se borran versiones anteriores: las de otros procesos pueden estar en uso
+            for path in glob.glob(os.path.join(self._directory, f"{prefix}*")):
+                saved_version = os.path.basename(path)[len(prefix):].split("_", 1)[0]
+                if saved_version.isdigit() and int(saved_version) < version:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        except Exception as e:
+            print(f"Error guardando el índice ANN: {str(e)}")
+
+    def checkpoint(self):
+        """
+        Guarda el índice ANN si los segmentos cambiaron desde el último guardado
+
+        Lo llama quien cierra una unidad de trabajo (una carga confirmada, una
+        pasada de GC); las escrituras individuales no lo guardan, porque
+        serializar el índice completo en cada bloque haría la ingesta cuadrática.
+        """
+        with self._lock:
+            self._persist_ann()
+
+    def compact(self) -> int:
+        """
+        Compacta los segmentos con muchos borrados (solo con LOCAL_VECTOR_DIR)
+
+        Se hace con el lock del store: las filas movidas salen de los índices en su
+        posición anterior y se indexan en la nueva antes de la siguiente búsqueda.
+
+        Returns:
+            Número de filas movidas
+        """
+        if not isinstance(self._storage, SegmentedStorage):
+            return 0
+        with self._lock:
+            self._sync()
+            moved = self._storage.compact()
+            self._sync()
+            if moved:
+                self._persist_ann()
+            return len(moved)
+
+    def _compaction_loop(self):
+        while True:
+            self._storage.compaction_requested.wait()
+            try:
+                self.compact()
+            except Exception as e:
+                self._storage.compaction_requested.clear()
+                print(f"Error compactando segmentos: {str(e)}")
+
+    def publish_shared_index(self) -> int:
+        """
+        Publica las filas vivas como una nueva generación en memoria compartida
+
+        Los workers con el mismo SHARED_VECTOR_INDEX cambian a ella en su
+        siguiente búsqueda.
+
+        Returns:
+            Generación publicada (0 si SHARED_VECTOR_INDEX no está configurado)
+        """
+        namespace = os.getenv("SHARED_VECTOR_INDEX")
+        if not namespace:
+            return 0
+        with self._lock:
+            self._sync()
+            rows = np.flatnonzero(self._visible_mask())
+            ids = [self._storage.id_at(row) for row in rows]
+            metadatas = [self._storage.metadata(row) for row in rows]
+            vectors = self._storage.vectors[rows] if len(rows) else np.zeros((0, self.embedding_dimension), dtype=np.float32)
+        columns = {key: [metadata.get(key) for metadata in metadatas]
+                   for key in {key for metadata in metadatas for key in metadata}}
+        return get_shared_publisher(namespace).publish(ids, vectors, columns)
+
+    def upsert_vectors(self, vectors_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Inserta o actualiza vectores en el almacenamiento local
+
+        Args:
+            vectors_data: Lista de diccionarios con 'text', 'metadata' y 'id' (opcional)
+
+        Returns:
+            Diccionario con resultado de la operación
+        """
+        try:
+            def write_batch(chunk, embeddings):
+                ids, metadatas = [], []
+                for data in chunk:
+                    metadata = data.get('metadata', {})
+                    metadata['text'] = data['text']
+                    ids.append(data.get('id', str(uuid.uuid4())))
+                    metadatas.append(metadata)
+
+                with self._lock:
+                    self._write(ids, embeddings, metadatas)
+
+            stats = self._run_ingestion(vectors_data, write_batch, chunk_size=self.EMBEDDING_BATCH_SIZE)
+            stats.pop('results')
+
+            return {
+                "success": True,
+                "message": f"Se procesaron {stats['vectors_count']} vectores exitosamente",
+                "vectors_count": stats['vectors_count'],
+                "results": [],
+                "pipeline": stats
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error en upsert de vectores: {str(e)}",
+                "error": str(e)
+            }
+
+    def update_metadata(self, ids: List[str], fields: Dict[str, Any]) -> int:
+        """Actualiza campos de metadata reescribiendo las filas con el mismo vector"""
+        with self._lock:
+            self._sync()
+            rows = [self._storage.id_to_row[vector_id] for vector_id in ids if vector_id in self._storage.id_to_row]
+            if not rows:
+                return 0
+            vectors = self._storage.vectors[np.asarray(rows, dtype=np.int64)]
+            metadatas = [{**self._storage.metadata(row), **fields} for row in rows]
+            self._write([self._storage.id_at(row) for row in rows], vectors, metadatas)
+            return len(rows)
+
+    def search_similar_vectors(self, query_text: str, top_k: int = 10,
+                               filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Busca vectores similares usando texto de consulta
+
+        Args:
+            query_text: Texto de consulta para búsqueda semántica
+            top_k: Número de resultados a retornar
+            filters: Filtros de metadata (ver Models.MetadataFilter); se resuelven con el
+                índice invertido antes de calcular similitudes
+
+        Returns:
+            Diccionario con resultados de búsqueda
+        """
+        try:
+            filters = normalize_filters(filters)
+            shared_results = self._search_shared(query_text, top_k, filters)
+            if shared_results is not None:
+                return shared_results
+
+            query_embedding = np.asarray(self.embed_query(query_text), dtype=np.float32)
+
+            with self._lock:
+                self._sync()
+                visible = self._visible_mask()
+                if filters:
+                    # Solo se puntúan las filas que cumplen los filtros
+                    candidates = np.flatnonzero(visible & self._filter_index.mask(filters, len(visible)))
+                    top_rows, top_scores = self._candidate_search(query_embedding, top_k, candidates)
+                else:
+                    top_rows, top_scores = self._ann_search(query_embedding, top_k, visible)
+
+                formatted_results = [{
+                    'id': self._storage.id_at(row),
+                    'score': float(score),
+                    'metadata': self._storage.metadata(row)
+                } for row, score in zip(top_rows, top_scores)]
+
+            return {
+                "success": True,
+                "query": query_text,
+                "results": formatted_results,
+                "total_found": len(formatted_results)
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error en búsqueda semántica: {str(e)}",
+                "error": str(e)
+            }
+
+    def _ann_search(self, query_embedding: np.ndarray, top_k: int, visible: np.ndarray):
+        """
+        Búsqueda con el índice ANN filtrando las filas ocultas dentro del propio índice
+
+        Si la mayor parte de las filas está oculta (una carga grande sin confirmar)
+        o el índice no alcanza top_k filas visibles, la búsqueda exacta es más
+        rápida y completa.
+        """
+        alive = int(self._storage.alive.sum())
+        shown = int(visible.sum())
+        if self._ann is None or not self._ann.is_trained or shown < alive * self.ANN_MIN_VISIBLE_FRACTION:
+            return self._exact_search(query_embedding, top_k, visible)
+        mask = visible if shown < alive else None
+        top_rows, top_scores = self._ann.search(query_embedding, top_k, self._storage.vectors, mask=mask)
+        if len(top_rows) < min(top_k, shown):
+            return self._exact_search(query_embedding, top_k, visible)
+        return top_rows, top_scores
+
+    def _exact_search(self, query_embedding: np.ndarray, top_k: int, visible: np.ndarray):
+        """Búsqueda exacta (fuerza bruta) sobre las filas visibles"""
+        scores = self._storage.scores(query_embedding)
+        scores[~visible] = -np.inf
+
+        k = min(top_k, int(visible.sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        top_rows = candidates[np.argsort(-scores[candidates])]
+        return top_rows, scores[top_rows]
+
+    def _candidate_search(self, query_embedding: np.ndarray, top_k: int, candidates: np.ndarray):
+        """Búsqueda exacta restringida a un conjunto de filas"""
+        k = min(top_k, len(candidates))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        scores = self._storage.vectors[candidates] @ query_embedding
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def fetch_records(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Metadata de vectores por ID, en el orden de ids (se omiten los que no existen)"""
+        with self._lock:
+            self._sync()
+            rows = self._storage.id_to_row
+            return [{'id': vector_id, 'metadata': self._storage.metadata(rows[vector_id])}
+                    for vector_id in ids if vector_id in rows and self._storage.alive[rows[vector_id]]]
+
+    def delete_ids(self, ids: List[str]) -> int:
+        """Marca como eliminados los vectores indicados; retorna cuántos existían"""
+        with self._lock:
+            self._sync()
+            rows = [self._storage.id_to_row[vector_id] for vector_id in ids if vector_id in self._storage.id_to_row]
+            deleted = self._storage.delete(rows)
+            self._unindex_rows(rows)
+        return deleted
+
+    def eliminarRecords(self):
+        with self._lock:
+            self._storage.clear()
+            self._ann = build_ann_index(self._ann_kind, self.embedding_dimension)
+            self._filter_index.clear()
+            self._reset_visibility()
+        self.registry.clear()
+        # Una generación vacía: los workers adjuntos al índice compartido dejan de ver los vectores
+        self.publish_shared_index()
+
+    def get_dashboard_metrics(self) -> Dict[str, Any]:
+        """
+        Obtiene métricas consolidadas para el dashboard sobre todas las filas
+
+        Returns:
+            Diccionario con métricas del dashboard
+        """
+        try:
+            aggregated = self._aggregated_dashboard()
+            if aggregated is not None:
+                return aggregated
+
+            with self._lock:
+                self._sync()
+                rows = np.flatnonzero(self._visible_mask())
+                projects_data = [self._storage.metadata(row) for row in rows]
+
+            return {
+                "success": True,
+                "total_vectors": len(projects_data),
+                "sample_analyzed": len(projects_data),
+                "metrics": self._calculate_project_metrics(projects_data)
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error obteniendo métricas del dashboard: {str(e)}",
+                "error": str(e)
+            }
@@ -0,0 +1,201 @@
+"""
+Filtros estructurados sobre la metadata de las filas
+El mismo diccionario de filtros se traduce a un filtro de Pinecone o se evalúa
+sobre el índice invertido del backend local
+
+Filtros soportados (valor exacto o lista de valores):
+    project, assignee, status, is_delayed, file_source
+y rangos de progreso: progress_min, progress_max (porcentaje 0-100)
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Filtro de la API -> campo de metadata
+FILTER_FIELDS = {
+    "project": "project_name",
+    "assignee": "assignee",
+    "status": "status",
+    "is_delayed": "is_delayed",
+    "file_source": "file_source",
+}
+RANGE_FIELD = "progress_percentage"
+RANGE_FILTERS = {"progress_min": "$gte", "progress_max": "$lte"}
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "si", "sí", "yes")
+    return bool(value)
+
+
+def range_value(name: str, value) -> float:
+    """
+    Valor numérico de un filtro de rango
+
+    Raises:
+        ValueError ("Filtros no válidos") si no es un número finito
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = float("nan")
+    if isinstance(value, bool) or not np.isfinite(number):
+        raise ValueError(f"Filtros no válidos: {name} debe ser un número (recibido: {value!r})")
+    return number
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Valida y normaliza los filtros recibidos por la API
+
+    Returns:
+        Diccionario {campo de metadata: lista de valores} más los rangos presentes
+
+    Raises:
+        ValueError si hay filtros desconocidos o valores inválidos
+    """
+    if not filters:
+        return {}
+    unknown = set(filters) - set(FILTER_FIELDS) - set(RANGE_FILTERS)
+    if unknown:
+        raise ValueError(f"Filtros no soportados: {', '.join(sorted(unknown))}. "
+                         f"Disponibles: {', '.join(list(FILTER_FIELDS) + list(RANGE_FILTERS))}")
+    normalized = {}
+    for name, field in FILTER_FIELDS.items():
+        value = filters.get(name)
+        if value is None or value == '' or value == []:
+            continue
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if field == "is_delayed":
+            values = [_as_bool(item) for item in values]
+        else:
+            values = [str(item) for item in values]
+        normalized[field] = values
+    for name in RANGE_FILTERS:
+        if filters.get(name) is not None and filters.get(name) != '':
+            normalized[name] = range_value(name, filters[name])
+    return normalized
+
+
+def to_pinecone_filter(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Traduce filtros normalizados a la sintaxis de filtros de metadata de Pinecone"""
+    clauses = []
+    for field, values in filters.items():
+        if field in RANGE_FILTERS:
+            continue
+        clauses.append({field: {"$eq": values[0]}} if len(values) == 1 else {field: {"$in": values}})
+    progress = {operator: filters[name] for name, operator in RANGE_FILTERS.items() if name in filters}
+    if progress:
+        clauses.append({RANGE_FIELD: progress})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def combine_filters(*filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Une filtros de Pinecone con $and ignorando los vacíos"""
+    present = [item for item in filters if item]
+    if not present:
+        return None
+    return present[0] if len(present) == 1 else {"$and": present}
+
+
+def _progress_values(column: np.ndarray) -> np.ndarray:
+    return np.array([value if isinstance(value, (int, float)) else np.nan for value in column], dtype=np.float64)
+
+
+def column_mask(get_column: Callable[[str], np.ndarray], filters: Dict[str, Any], size: int) -> np.ndarray:
+    """Evalúa filtros normalizados sobre columnas completas (get_column(campo) -> array de objetos)"""
+    mask = np.ones(size, dtype=bool)
+    for field, values in filters.items():
+        if field in RANGE_FILTERS:
+            continue
+        mask &= np.isin(get_column(field), np.array(values, dtype=object))
+    if any(name in filters for name in RANGE_FILTERS):
+        progress = _progress_values(get_column(RANGE_FIELD))
+        if "progress_min" in filters:
+            mask &= progress >= filters["progress_min"]
+        if "progress_max" in filters:
+            mask &= progress <= filters["progress_max"]
+    return mask
+
+
+class InvertedIndex:
+    """
+    Índice invertido campo -> valor -> filas para el backend local
+
+    Se mantiene al escribir y borrar filas, así que un filtro se resuelve sin
+    recorrer la metadata de todas las filas.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._postings: Dict[str, Dict[Any, set]] = {field: {} for field in FILTER_FIELDS.values()}
+        self._row_values: Dict[str, Dict[int, Any]] = {field: {} for field in FILTER_FIELDS.values()}
+        self._progress = np.full(0, np.nan, dtype=np.float64)
+
+    def remove(self, rows: Iterable[int]):
+        for row in rows:
+            row = int(row)
+            for field, row_values in self._row_values.items():
+                if row in row_values:
+                    value = row_values.pop(row)
+                    posting = self._postings[field].get(value)
+                    if posting is not None:
+                        posting.discard(row)
+                        if not posting:
+                            del self._postings[field][value]
+            if row < len(self._progress):
+                self._progress[row] = np.nan
+
+    def add(self, rows: Iterable[int], metadatas: Iterable[Dict[str, Any]]):
+        rows = [int(row) for row in rows]
+        self.remove(rows)
+        if rows and max(rows) >= len(self._progress):
+            grown = np.full(max(max(rows) + 1, len(self._progress) * 2), np.nan, dtype=np.float64)
+            grown[:len(self._progress)] = self._progress
+            self._progress = grown
+        for row, metadata in zip(rows, metadatas):
+            for field in self._postings:
+                value = metadata.get(field)
+                if value is None or value == '':
+                    continue
+                self._postings[field].setdefault(value, set()).add(row)
+                self._row_values[field][row] = value
+            progress = metadata.get(RANGE_FIELD)
+            if isinstance(progress, (int, float)):
+                self._progress[row] = progress
+
+    def rows(self, field: str, value: Any) -> set:
+        """Filas con un valor exacto en el campo"""
+        return self._postings.get(field, {}).get(value, set())
+
+    def values(self, field: str) -> List[Any]:
+        """Valores distintos presentes en el campo"""
+        return list(self._postings.get(field, {}))
+
+    def mask(self, filters: Dict[str, Any], size: int) -> np.ndarray:
+        """Máscara booleana de las filas que cumplen todos los filtros"""
+        mask = np.ones(size, dtype=bool)
+        for field, values in filters.items():
+            if field in RANGE_FILTERS:
+                continue
+            selected = np.zeros(size, dtype=bool)
+            for value in values:
+                rows = self.rows(field, value)
+                if rows:
+                    selected[np.fromiter(rows, dtype=np.int64, count=len(rows))] = True
+            mask &= selected
+        if any(name in filters for name in RANGE_FILTERS):
+            progress = np.full(size, np.nan, dtype=np.float64)
+            available = min(size, len(self._progress))
+            progress[:available] = self._progress[:available]
+            if "progress_min" in filters:
+                mask &= progress >= filters["progress_min"]
+            if "progress_max" in filters:
+                mask &= progress <= filters["progress_max"]
+        return mask
@@ -0,0 +1,230 @@
+"""
+Motor columnar de métricas del dashboard
+Guarda progreso, estado, proyecto, asignado, archivo y fechas de todas las
+filas como arrays de NumPy; cualquier corte filtrado se resuelve con máscaras
+booleanas y np.bincount, sin recorrer diccionarios fila a fila
+
+Filtros soportados (valor exacto o lista de valores):
+    project, assignee, file_source, status
+ventana de fechas: date_from, date_to (YYYY-MM-DD; filas cuyo intervalo inicio-fin
+la toca) y rangos de progreso: progress_min, progress_max (0-100)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Models.DashboardAggregates import HISTOGRAM_BINS, STATUSES, row_contribution, to_metrics
+from Models.MetadataFilter import range_value
+
+CATEGORY_FILTERS = {
+    "project": "project_name",
+    "assignee": "assignee",
+    "file_source": "file_source",
+}
+DATE_FILTERS = ("date_from", "date_to")
+PROGRESS_FILTERS = ("progress_min", "progress_max")
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_NO_DATE = np.datetime64("NaT", "D")
+
+
+def normalize_metric_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Valida los filtros de métricas recibidos por la API
+
+    Raises:
+        ValueError si hay filtros desconocidos o valores inválidos
+    """
+    if not filters:
+        return {}
+    supported = list(CATEGORY_FILTERS) + ["status"] + list(DATE_FILTERS) + list(PROGRESS_FILTERS)
+    unknown = set(filters) - set(supported)
+    if unknown:
+        raise ValueError(f"Filtros no soportados: {', '.join(sorted(unknown))}. "
+                         f"Disponibles: {', '.join(supported)}")
+    normalized = {}
+    for name in list(CATEGORY_FILTERS) + ["status"]:
+        value = filters.get(name)
+        if value is None or value == '' or value == []:
+            continue
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        normalized[name] = [str(item) for item in values]
+    for name in normalized.get("status", []):
+        if name not in _STATUS_CODES:
+            raise ValueError(f"Estado no válido: {name}. Disponibles: {', '.join(STATUSES)}")
+    for name in DATE_FILTERS:
+        if filters.get(name):
+            try:
+                normalized[name] = str(np.datetime64(str(filters[name])[:10], "D"))
+            except ValueError:
+                raise ValueError(f"Fecha no válida en {name}: {filters[name]} (formato YYYY-MM-DD)")
+    for name in PROGRESS_FILTERS:
+        if filters.get(name) is not None and filters.get(name) != '':
+            normalized[name] = range_value(name, filters[name])
+    return normalized
+
+
+def _encode(values: List[str]):
+    """Códigos enteros por valor (-1 para vacío) y la lista de valores distintos"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).replace('', None))
+    return codes.astype(np.int64), list(uniques)
+
+
+class _Category:
+    """Columna categórica: códigos por fila y filas de cada valor (ordenadas por código)"""
+
+    def __init__(self, codes: np.ndarray, names: List[str]):
+        self.names = names
+        self.lookup = {name: code for code, name in enumerate(names)}
+        # Las filas sin valor usan un código extra al final, que se descarta al agrupar
+        self.codes = np.where(codes < 0, len(names), codes)
+        self.order = np.argsort(self.codes, kind="stable")
+        self.offsets = np.searchsorted(self.codes[self.order], np.arange(len(names) + 2))
+
+    def wanted(self, values: List[str]) -> List[int]:
+        return [self.lookup[value] for value in values if value in self.lookup]
+
+    def rows(self, values: List[str]) -> np.ndarray:
+        """Filas con alguno de los valores, sin recorrer la columna"""
+        parts = [self.order[self.offsets[code]:self.offsets[code + 1]] for code in self.wanted(values)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+class ColumnarMetrics:
+    """
+    Columnas inmutables de métricas; compute(filters) devuelve la misma forma
+    que to_metrics (y que el dashboard) para el subconjunto filtrado
+    """
+
+    def __init__(self, progress: np.ndarray, status: np.ndarray, start: np.ndarray, end: np.ndarray,
+                 categories: Dict[str, tuple]):
+        self.progress = progress
+        self.status = status
+        # Sin fecha de fin se usa la de inicio y viceversa
+        self.start = np.where(np.isnat(start), end, start)
+        self.end = np.where(np.isnat(end), start, end)
+        self.categories = {field: _Category(codes, names) for field, (codes, names) in categories.items()}
+        # Filtro de la API -> columna categórica (el estado también, para partir de sus filas)
+        self._filterable = {name: self.categories[field] for name, field in CATEGORY_FILTERS.items()}
+        self._filterable["status"] = _Category(status, list(STATUSES))
+        self._progress_filled = np.nan_to_num(progress, nan=0.0)
+        self._has_progress = (~np.isnan(progress)).astype(np.float64)
+        self._buckets = np.minimum((self._progress_filled // (100 / HISTOGRAM_BINS)).astype(np.int64),
+                                   HISTOGRAM_BINS - 1)
+        self._all = None
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> "ColumnarMetrics":
+        """Construye las columnas desde filas {status, progress, project_name, assignee, file_source, start, end}"""
+        entries = list(entries)
+        progress = np.array([np.nan if entry.get("progress") is None else entry["progress"] for entry in entries],
+                            dtype=np.float64)
+        status = np.array([_STATUS_CODES.get(entry.get("status"), _STATUS_CODES["unknown"]) for entry in entries],
+                          dtype=np.int64)
+        start = np.array([entry.get("start") or _NO_DATE for entry in entries], dtype="datetime64[D]")
+        end = np.array([entry.get("end") or _NO_DATE for entry in entries], dtype="datetime64[D]")
+        categories = {field: _encode([str(entry.get(field) or '') for entry in entries])
+                      for field in CATEGORY_FILTERS.values()}
+        return cls(progress, status, start, end, categories)
+
+    @classmethod
+    def from_metadata(cls, metadatas: Iterable[Dict[str, Any]]) -> "ColumnarMetrics":
+        """Construye las columnas desde la metadata cruda de las filas (muestras sin registro)"""
+        entries = []
+        for metadata in metadatas:
+            entry = row_contribution(metadata)
+            entry["file_source"] = metadata.get("file_source")
+            entries.append(entry)
+        return cls.from_entries(entries)
+
+    def select(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Filas que cumplen filtros ya normalizados (None si no hay filtros)
+
+        Con filtros de categoría parte de las filas del valor más selectivo y
+        evalúa el resto de condiciones solo sobre ellas; si no, usa máscaras
+        sobre las columnas completas.
+        """
+        if not filters:
+            return None
+        candidates = None
+        for name, category in self._filterable.items():
+            if name in filters:
+                rows = category.rows(filters[name])
+                if candidates is None or len(rows) < len(candidates):
+                    candidates = rows
+
+        def take(column: np.ndarray) -> np.ndarray:
+            return column if candidates is None else column[candidates]
+
+        keep = np.ones(len(self) if candidates is None else len(candidates), dtype=bool)
+        for name, category in self._filterable.items():
+            if name in filters:
+                keep &= np.isin(take(category.codes), category.wanted(filters[name]))
+        # Las filas sin fechas no entran en ninguna ventana (NaT compara siempre False)
+        if "date_from" in filters:
+            keep &= take(self.end) >= np.datetime64(filters["date_from"], "D")
+        if "date_to" in filters:
+            keep &= take(self.start) <= np.datetime64(filters["date_to"], "D")
+        if "progress_min" in filters:
+            keep &= take(self.progress) >= filters["progress_min"]
+        if "progress_max" in filters:
+            keep &= take(self.progress) <= filters["progress_max"]
+        return np.flatnonzero(keep) if candidates is None else candidates[keep]
+
+    def _groups(self, field: str, take, status: np.ndarray, progress: np.ndarray,
+                has_progress: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        category = self.categories[field]
+        codes = take(category.codes)
+        size = len(category.names) + 1
+        by_status = np.bincount(codes * len(STATUSES) + status, minlength=size * len(STATUSES))
+        by_status = by_status.reshape(size, len(STATUSES))[:-1]
+        progress_sum = np.bincount(codes, weights=progress, minlength=size)
+        progress_count = np.bincount(codes, weights=has_progress, minlength=size)
+        counts = by_status.sum(axis=1)
+        return {
+            category.names[code]: {
+                "count": int(counts[code]),
+                "status": dict(zip(STATUSES, by_status[code].tolist())),
+                "progress_sum": float(progress_sum[code]),
+                "progress_count": int(progress_count[code])
+            }
+            for code in np.flatnonzero(counts)
+        }
+
+    def _aggregate(self, rows: Optional[np.ndarray]) -> Dict[str, Any]:
+        def take(column: np.ndarray) -> np.ndarray:
+            return column if rows is None else column[rows]
+
+        status = take(self.status)
+        progress = take(self._progress_filled)
+        has_progress = take(self._has_progress)
+        histogram = np.bincount(take(self._buckets), weights=has_progress, minlength=HISTOGRAM_BINS)
+        result = {
+            "count": int(len(status)),
+            "status": dict(zip(STATUSES, np.bincount(status, minlength=len(STATUSES)).tolist())),
+            "progress_sum": float(progress.sum()),
+            "progress_count": int(has_progress.sum()),
+            "histogram": histogram.astype(np.int64).tolist(),
+        }
+        for key, field in (("projects", "project_name"), ("assignees", "assignee")):
+            result[key] = self._groups(field, take, status, progress, has_progress)
+        return result
+
+    def aggregates(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Agregados (formato de DashboardAggregates) del subconjunto filtrado"""
+        filters = normalize_metric_filters(filters)
+        if filters:
+            return self._aggregate(self.select(filters))
+        # Las columnas no cambian: el total sin filtros se calcula una vez
+        if self._all is None:
+            self._all = self._aggregate(None)
+        return self._all
+
+    def compute(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Métricas del subconjunto filtrado, con las mismas claves que el dashboard"""
+        return to_metrics(self.aggregates(filters))
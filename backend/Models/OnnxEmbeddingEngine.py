@@ -0,0 +1,114 @@
+"""
+Motor de embeddings ONNX cuantizado (int8) para CPU
+Ejecuta el modelo MiniLM exportado a ONNX con inferencia por lotes en varios hilos
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+from Models.EmbeddingProviders import EmbeddingProvider
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(__file__), "..", "cache", "onnx")
+
+
+def export_quantized_model(model_name: str, output_dir: str) -> str:
+    """
+    Exporta el modelo HuggingFace a ONNX y lo cuantiza a int8 (cuantización dinámica)
+
+    Returns:
+        Ruta del modelo ONNX cuantizado
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["texto de ejemplo para exportar"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17
+        )
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    return int8_path
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """Embeddings locales con MiniLM int8 en onnxruntime"""
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, dimension: int):
+        super().__init__(model_name, dimension)
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = os.getenv("ONNX_MODEL_DIR") or os.path.join(DEFAULT_ONNX_DIR, model_name.split("/")[-1])
+        model_path = os.path.join(model_dir, "model_int8.onnx")
+        if not os.path.exists(model_path):
+            model_path = export_quantized_model(model_name, model_dir)
+
+        self.max_length = int(os.getenv("ONNX_MAX_LENGTH", "256"))
+        self.batch_size = int(os.getenv("ONNX_BATCH_SIZE", "64"))
+        self.workers = max(1, int(os.getenv("ONNX_WORKERS", "2")))
+        threads = int(os.getenv("ONNX_THREADS", "0")) or max(1, (os.cpu_count() or 1) // self.workers)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="onnx-embed")
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Agrupar por longitud reduce el relleno (padding) dentro de cada lote
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        batches = [sorted_texts[start:start + self.batch_size]
+                   for start in range(0, len(sorted_texts), self.batch_size)]
+
+        results = list(self._executor.map(self._embed_batch, batches))
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        embeddings[order] = np.vstack(results)
+        return embeddings
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Tokeniza y ejecuta un lote, con mean pooling sobre la máscara de atención"""
+        encoded = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
@@ -0,0 +1,385 @@
+"""
+Índice vectorial en memoria compartida entre procesos (multiprocessing.shared_memory)
+Un proceso publica la matriz de embeddings y la metadata columnar como una
+generación nueva; los workers se adjuntan en solo lectura y cambian de
+generación de forma atómica
+
+La metadata también se lee a través de vistas sobre el bloque compartido: los
+campos con pocos valores distintos (proyecto, responsable, estado, archivo...)
+como códigos int32 más su lista de categorías, y el resto (texto) como bytes
+con desplazamientos por fila. Cada worker solo decodifica las filas que
+retorna una búsqueda.
+"""
+
+import fcntl
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Bloque de control: secuencia (seqlock), generación, filas, dimensión, bytes de metadata
+_CONTROL_FORMAT = "<qqqqq"
+_CONTROL_SIZE = struct.calcsize(_CONTROL_FORMAT)
+
+# Bloque de metadata: posición y tamaño del encabezado (al final), luego los arrays alineados a 8 bytes
+_META_HEADER_FORMAT = "<qq"
+_META_HEADER_SIZE = struct.calcsize(_META_HEADER_FORMAT)
+
+# Campos que se filtran (ver Models.MetadataFilter): siempre como códigos
+CATEGORY_FIELDS = ("project_name", "assignee", "status", "is_delayed", "file_source", "progress_percentage")
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """Evita que el resource_tracker elimine el bloque cuando este proceso termina"""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _open(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    _untrack(shm)
+    return shm
+
+
+def _unlink(name: str):
+    """Elimina un bloque; los procesos que ya lo mapearon lo conservan hasta cerrarlo"""
+    try:
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # unlink() lo quita del resource_tracker, así que aquí se deja registrar
+            shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class _MetadataLayout:
+    """Arma el contenido del bloque de metadata: arrays contiguos y un encabezado con su ubicación"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = _META_HEADER_SIZE
+
+    def add(self, array: np.ndarray) -> Tuple[int, str, Tuple[int, ...]]:
+        padding = -self.size % 8
+        if padding:
+            self.parts.append(b"\0" * padding)
+            self.size += padding
+        array = np.ascontiguousarray(array)
+        position = self.size
+        self.parts.append(array.tobytes())
+        self.size += array.nbytes
+        return position, array.dtype.str, array.shape
+
+    def add_bytes(self, values: List[bytes]) -> Dict[str, Any]:
+        """Valores de longitud variable: desplazamientos (filas + 1) y bytes concatenados"""
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.fromiter((len(value) for value in values), dtype=np.int64, count=len(values)))
+        return {"offsets": self.add(offsets), "data": self.add(np.frombuffer(b"".join(values), dtype=np.uint8))}
+
+    def add_column(self, key: str, values: List[Any]) -> Dict[str, Any]:
+        """Códigos de categoría si el campo se filtra o repite valores; si no, un valor serializado por fila"""
+        categories, codes = {}, np.full(len(values), -1, dtype=np.int32)
+        try:
+            for row, value in enumerate(values):
+                if value is not None:
+                    # El tipo es parte de la clave: True, 1 y 1.0 son categorías distintas
+                    codes[row] = categories.setdefault((type(value), value), len(categories))
+        except TypeError:
+            categories = None
+        if categories is not None and (key in CATEGORY_FIELDS or len(categories) * 2 <= len(values)):
+            return {"kind": "codes", "categories": [value for _, value in categories], "codes": self.add(codes)}
+        encoded = [b"" if value is None else pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                   for value in values]
+        return {"kind": "bytes", **self.add_bytes(encoded)}
+
+    def build(self, ids: List[str], columns: Dict[str, List[Any]]) -> bytes:
+        header = {"ids": self.add_bytes([vector_id.encode("utf-8") for vector_id in ids]),
+                  "columns": {key: self.add_column(key, values) for key, values in columns.items()}}
+        encoded = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+        position = self.size
+        return struct.pack(_META_HEADER_FORMAT, position, len(encoded)) + b"".join(self.parts) + encoded
+
+
+class SharedIndexPublisher:
+    """
+    Publica generaciones del índice en memoria compartida
+
+    Cualquier worker puede publicar (tras una carga): un lock de archivo
+    (SHARED_VECTOR_LOCK_DIR, por defecto el directorio temporal) serializa las
+    publicaciones de todos los procesos del mismo namespace.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        lock_dir = os.getenv("SHARED_VECTOR_LOCK_DIR") or tempfile.gettempdir()
+        self._lock_path = os.path.join(lock_dir, f"{namespace}.publish.lock")
+        with self._process_lock():
+            try:
+                self._control = _open(f"{namespace}_ctl")
+            except FileNotFoundError:
+                self._control = _open(f"{namespace}_ctl", create=True, size=_CONTROL_SIZE)
+                struct.pack_into(_CONTROL_FORMAT, self._control.buf, 0, 0, 0, 0, 0, 0)
+
+    @contextmanager
+    def _process_lock(self):
+        """Exclusión entre hilos y entre procesos que publican en el mismo namespace"""
+        with self._lock:
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @property
+    def generation(self) -> int:
+        return struct.unpack_from(_CONTROL_FORMAT, self._control.buf, 0)[1]
+
+    def publish(self, ids: List[str], vectors: np.ndarray, columns: Dict[str, List[Any]]) -> int:
+        """
+        Copia vectores y metadata a bloques nuevos y los hace visibles de una sola vez
+
+        Returns:
+            Número de la generación publicada
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        rows, dimension = vectors.shape
+        metadata = _MetadataLayout().build(list(ids), columns)
+
+        with self._process_lock():
+            sequence, previous, _, _, _ = struct.unpack_from(_CONTROL_FORMAT, self._control.buf, 0)
+            generation = previous + 1
+            # Restos de una publicación interrumpida con el mismo número
+            _unlink(f"{self.namespace}_vec_{generation}")
+            _unlink(f"{self.namespace}_meta_{generation}")
+
+            vector_block = _open(f"{self.namespace}_vec_{generation}", create=True, size=max(1, vectors.nbytes))
+            np.ndarray(vectors.shape, dtype=np.float32, buffer=vector_block.buf)[:] = vectors
+            meta_block = _open(f"{self.namespace}_meta_{generation}", create=True, size=max(1, len(metadata)))
+            meta_block.buf[:len(metadata)] = metadata
+
+            # Seqlock: secuencia impar mientras se actualiza el bloque de control
+            struct.pack_into(_CONTROL_FORMAT, self._control.buf, 0, sequence + 1, previous, 0, 0, 0)
+            struct.pack_into(_CONTROL_FORMAT, self._control.buf, 0,
+                             sequence + 2, generation, rows, dimension, len(metadata))
+            vector_block.close()
+            meta_block.close()
+
+            if previous:
+                _unlink(f"{self.namespace}_vec_{previous}")
+                _unlink(f"{self.namespace}_meta_{previous}")
+            return generation
+
+
+class SharedIndexReader:
+    """Vista de solo lectura de la generación vigente (vectores y metadata sin copiar)"""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.generation = 0
+        self.vectors: Optional[np.ndarray] = None
+        self._ids: Tuple[np.ndarray, np.ndarray] = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint8))
+        self._columns: Dict[str, Dict[str, Any]] = {}
+        self._blocks: Tuple = ()
+        self._retired: List[shared_memory.SharedMemory] = []
+        self._control = None
+        self._lock = threading.Lock()
+
+    def _read_control(self):
+        if self._control is None:
+            self._control = _open(f"{self.namespace}_ctl")
+        while True:
+            first = struct.unpack_from(_CONTROL_FORMAT, self._control.buf, 0)
+            second = struct.unpack_from(_CONTROL_FORMAT, self._control.buf, 0)
+            if first == second and first[0] % 2 == 0:
+                return first[1:]
+
+    @staticmethod
+    def _view(buffer, location) -> np.ndarray:
+        position, dtype, shape = location
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=position)
+        view.flags.writeable = False
+        return view
+
+    def _attach_metadata(self, buffer) -> Tuple[Tuple[np.ndarray, np.ndarray], Dict[str, Dict[str, Any]]]:
+        """Vistas sobre el bloque de metadata; solo el encabezado (ubicaciones y categorías) se deserializa"""
+        position, length = struct.unpack_from(_META_HEADER_FORMAT, buffer, 0)
+        header = pickle.loads(bytes(buffer[position:position + length]))
+        ids = (self._view(buffer, header["ids"]["offsets"]), self._view(buffer, header["ids"]["data"]))
+        columns = {}
+        for key, column in header["columns"].items():
+            if column["kind"] == "codes":
+                categories = np.empty(len(column["categories"]), dtype=object)
+                for code, value in enumerate(column["categories"]):
+                    categories[code] = value
+                columns[key] = {"kind": "codes", "categories": categories,
+                                "codes": self._view(buffer, column["codes"])}
+            else:
+                columns[key] = {"kind": "bytes", "offsets": self._view(buffer, column["offsets"]),
+                                "data": self._view(buffer, column["data"])}
+        return ids, columns
+
+    def refresh(self) -> bool:
+        """
+        Se adjunta a la generación vigente si cambió
+
+        Returns:
+            True si hay una generación disponible
+        """
+        with self._lock:
+            try:
+                generation, rows, dimension, metadata_size = self._read_control()
+            except FileNotFoundError:
+                return False
+            if generation == 0:
+                return False
+            if generation == self.generation:
+                return True
+            try:
+                vector_block = _open(f"{self.namespace}_vec_{generation}")
+                meta_block = _open(f"{self.namespace}_meta_{generation}")
+            except FileNotFoundError:
+                # Se publicó otra generación entretanto; se reintenta en la próxima búsqueda
+                return self.generation > 0
+
+            vectors = np.ndarray((rows, dimension), dtype=np.float32, buffer=vector_block.buf)
+            vectors.flags.writeable = False
+            ids, columns = self._attach_metadata(meta_block.buf)
+
+            # Cambio atómico: la búsqueda siguiente ya usa la generación nueva
+            self.vectors, self._ids, self._columns = vectors, ids, columns
+            self.generation = generation
+            self._retired.extend(self._blocks)
+            self._blocks = (vector_block, meta_block)
+            self._close_retired()
+            return True
+
+    def _close_retired(self):
+        """Cierra los mapeos de generaciones anteriores que ya nadie usa (requiere self._lock)"""
+        still_used = []
+        for block in self._retired:
+            try:
+                block.close()
+            except BufferError:
+                # Una búsqueda en curso aún tiene una vista sobre el bloque
+                still_used.append(block)
+        self._retired = still_used
+
+    @property
+    def rows(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+
+    @staticmethod
+    def _id_at(ids, row: int) -> str:
+        offsets, data = ids
+        return data[offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+
+    @staticmethod
+    def _value(column: Dict[str, Any], row: int):
+        if column["kind"] == "codes":
+            code = column["codes"][row]
+            return None if code < 0 else column["categories"][code]
+        start, end = column["offsets"][row], column["offsets"][row + 1]
+        return pickle.loads(column["data"][start:end].tobytes()) if end > start else None
+
+    def id_at(self, row: int) -> str:
+        return self._id_at(self._ids, row)
+
+    @classmethod
+    def _metadata(cls, columns: Dict[str, Dict[str, Any]], row: int) -> Dict[str, Any]:
+        metadata = {}
+        for key, column in columns.items():
+            value = cls._value(column, row)
+            if value is not None:
+                metadata[key] = value
+        return metadata
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return self._metadata(self._columns, row)
+
+    def column(self, key: str) -> np.ndarray:
+        """
+        Columna de metadata como array de objetos (None donde falta)
+
+        Se arma en cada llamada a partir de los códigos compartidos (no queda una
+        copia por worker); las columnas de texto se decodifican fila por fila.
+        """
+        with self._lock:
+            rows, column = self.rows, self._columns.get(key)
+        if column is None:
+            return np.full(rows, None, dtype=object)
+        if column["kind"] == "codes":
+            codes = column["codes"]
+            values = column["categories"][np.maximum(codes, 0)] if len(column["categories"]) \
+                else np.full(rows, None, dtype=object)
+            values[codes < 0] = None
+            return values
+        values = np.empty(rows, dtype=object)
+        values[:] = [self._value(column, row) for row in range(rows)]
+        return values
+
+    def search(self, query: np.ndarray, top_k: int, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Top-k por producto punto sobre la vista compartida (solo filas de mask, si se indica)"""
+        with self._lock:
+            vectors, ids, columns = self.vectors, self._ids, self._columns
+        if vectors is None or len(vectors) == 0:
+            return []
+        scores = vectors @ query
+        if mask is not None:
+            scores[~mask] = -np.inf
+            top_k = min(top_k, int(mask.sum()))
+            if top_k <= 0:
+                return []
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{
+            'id': self._id_at(ids, row),
+            'score': float(scores[row]),
+            'metadata': self._metadata(columns, row)
+        } for row in top]
+
+
+_readers: Dict[str, SharedIndexReader] = {}
+_publishers: Dict[str, SharedIndexPublisher] = {}
+_registry_lock = threading.Lock()
+
+
+def get_shared_reader(namespace: str) -> SharedIndexReader:
+    with _registry_lock:
+        if namespace not in _readers:
+            _readers[namespace] = SharedIndexReader(namespace)
+        return _readers[namespace]
+
+
+def get_shared_publisher(namespace: str) -> SharedIndexPublisher:
+    with _registry_lock:
+        if namespace not in _publishers:
+            _publishers[namespace] = SharedIndexPublisher(namespace)
+        return _publishers[namespace]
+
+
+if __name__ == "__main__":
+    # Proceso cargador: publica el contenido de LOCAL_VECTOR_DIR (python -m Models.SharedVectorIndex)
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from Models.LocalVectorStore import LocalVectorStore
+
+    store = LocalVectorStore()
+    generation = store.publish_shared_index()
+    print(f"Generación publicada: {generation} ({store.total_vectors} vectores)")
@@ -0,0 +1,569 @@
+"""
+Almacenamiento de vectores para el backend local
+- InMemoryStorage: una matriz float32 contigua en RAM
+- SegmentedStorage: segmentos append-only en disco mapeados en memoria (np.memmap),
+  metadata en un log por segmento (también mapeado) y compactación de segmentos con borrados
+"""
+
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+class InMemoryStorage:
+    """Filas en una matriz contigua que se duplica al llenarse; las actualizaciones son in-place"""
+
+    def __init__(self, dimension: int, initial_capacity: int = 1024):
+        self.dimension = dimension
+        self._initial_capacity = initial_capacity
+        self.clear()
+
+    def clear(self):
+        self._vectors = np.zeros((self._initial_capacity, self.dimension), dtype=np.float32)
+        self._alive = np.zeros(self._initial_capacity, dtype=bool)
+        self.count = 0
+        self._ids: List[str] = []
+        self.id_to_row: Dict[str, int] = {}
+        self._columns: Dict[str, List[Any]] = {}
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self._alive[:self.count]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.count]
+
+    def id_at(self, row: int) -> str:
+        return self._ids[row]
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        vectors = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        vectors[:self.count] = self._vectors[:self.count]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self.count] = self._alive[:self.count]
+        self._vectors, self._alive = vectors, alive
+
+    def _set_metadata(self, row: int, metadata: Dict[str, Any]):
+        for key in set(self._columns) | set(metadata):
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = [None] * self.count
+            value = metadata.get(key)
+            if row < len(column):
+                column[row] = value
+            else:
+                column.append(value)
+
+    def write(self, ids: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+        """Inserta o actualiza filas; retorna (filas escritas, filas reemplazadas)"""
+        rows = []
+        for vector_id, vector, metadata in zip(ids, vectors, metadatas):
+            row = self.id_to_row.get(vector_id)
+            if row is None:
+                self._ensure_capacity(self.count + 1)
+                row = self.count
+                self._ids.append(vector_id)
+                self.id_to_row[vector_id] = row
+                self._set_metadata(row, metadata)
+                self.count += 1
+            else:
+                self._set_metadata(row, metadata)
+            self._vectors[row] = vector
+            self._alive[row] = True
+            rows.append(row)
+        return rows, []
+
+    def delete(self, rows: List[int]) -> int:
+        deleted = 0
+        for row in rows:
+            if row < self.count and self._alive[row]:
+                self._alive[row] = False
+                deleted += 1
+        return deleted
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        return self._vectors[:self.count] @ query
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return {key: column[row] for key, column in self._columns.items() if column[row] is not None}
+
+    def column(self, key: str) -> np.ndarray:
+        """Valores de un campo de metadata para todas las filas (None donde falta)"""
+        values = np.empty(self.count, dtype=object)
+        column = self._columns.get(key)
+        if column is not None:
+            values[:] = column[:self.count]
+        return values
+
+    def refresh(self) -> Tuple[List[int], List[int]]:
+        """Nada que sincronizar: el estado vive solo en este proceso"""
+        return [], []
+
+    def compact(self) -> Dict[int, int]:
+        """Las filas no se mueven: no hay nada que compactar"""
+        return {}
+
+
+class _SegmentRows:
+    """Vista indexable por fila global sobre varios segmentos mapeados (sin copiar la matriz)"""
+
+    def __init__(self, storage: "SegmentedStorage"):
+        self._storage = storage
+
+    def __getitem__(self, rows) -> np.ndarray:
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        result = np.empty((len(rows), self._storage.dimension), dtype=np.float32)
+        segment_ids = rows // self._storage.segment_rows
+        offsets = rows % self._storage.segment_rows
+        for segment_id in np.unique(segment_ids):
+            selected = segment_ids == segment_id
+            result[selected] = self._storage._maps[int(segment_id)][offsets[selected]]
+        return result
+
+
+class SegmentedStorage:
+    """
+    Segmentos append-only de tamaño fijo en disco
+
+    Cada segmento guarda los vectores en 'segment_XXXXXX.f32' (float32 crudo), la
+    metadata de cada fila (id + JSON) en el log 'segment_XXXXXX.meta' y los
+    desplazamientos de cada fila en 'segment_XXXXXX.idx' (int64 [fin del id, fin
+    del registro]). Los tres archivos solo crecen y se mapean en memoria, así que
+    varios procesos comparten las mismas páginas sin copiar la metadata.
+    'manifest.json' registra los segmentos, su número de filas y cuántas entradas
+    de 'tombstones.bin' (filas eliminadas, int64) son válidas. La fila global es
+    segment_id * segment_rows + offset. Una actualización agrega una fila nueva y
+    marca la anterior como eliminada; la compactación reescribe las filas vivas de
+    los segmentos con muchos borrados y elimina sus archivos.
+
+    Una escritura solo agrega bytes a los logs y reescribe el manifiesto; alive e
+    id_to_row se actualizan con las filas escritas o eliminadas. Los cambios de
+    otros procesos se aplican igual (filas y tombstones nuevos desde el último
+    manifiesto leído); solo una compactación o un vaciado ajenos (cambio de epoch)
+    obligan a releer todo.
+
+    refresh() devuelve todas las filas que aparecieron o dejaron de estar vivas
+    desde la llamada anterior y que el llamador no escribió con write()/delete():
+    cambios de otros procesos (una compactación ajena obliga a reindexar todo) y
+    filas movidas por compact(). La compactación no corre sola: la dispara quien
+    usa el almacenamiento cuando compaction_requested está activo.
+    """
+
+    FORMAT = 2
+
+    def __init__(self, directory: str, dimension: int, segment_rows: int = 65536,
+                 compaction_threshold: float = 0.3):
+        self.directory = directory
+        self.dimension = dimension
+        self.segment_rows = segment_rows
+        self.compaction_threshold = compaction_threshold
+        os.makedirs(directory, exist_ok=True)
+
+        self._thread_lock = threading.RLock()
+        self._manifest_version = -1
+        self._segments: Dict[int, int] = {}
+        self._maps: Dict[int, np.ndarray] = {}
+        self._offsets: Dict[int, np.ndarray] = {}
+        self._records: Dict[int, np.ndarray] = {}
+        self._tombstone_count = 0
+        self.count = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.id_to_row: Dict[str, int] = {}
+        self.vectors = _SegmentRows(self)
+
+        self._epoch = None
+        # Filas pendientes de informar en refresh() (ver docstring de la clase)
+        self._pending_added = set()
+        self._pending_removed = set()
+        self.compaction_requested = threading.Event()
+
+        with self._file_lock():
+            if not os.path.exists(self._path("manifest.json")):
+                open(self._path("tombstones.bin"), "wb").close()
+                self._write_json("manifest.json", {"format": self.FORMAT, "dimension": dimension,
+                                                   "segment_rows": segment_rows, "version": 0, "epoch": 0,
+                                                   "segments": {}, "tombstones": 0})
+            elif "format" not in self._read_json(self._path("manifest.json")):
+                self._migrate_sidecars()
+            self._load()
+
+    # ----- archivos -----
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _segment_file(self, segment_id: int, suffix: str) -> str:
+        return self._path(f"segment_{segment_id:06d}.{suffix}")
+
+    def _write_json(self, name: str, data):
+        path = name if os.path.isabs(name) else self._path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusión entre hilos y entre procesos que comparten el directorio"""
+        with self._thread_lock:
+            with open(self._path("write.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _migrate_sidecars(self):
+        """Convierte el formato anterior (meta.json y tombstones.json reescritos en cada escritura) a logs"""
+        manifest = self._read_json(self._path("manifest.json"))
+        for segment_id, rows in manifest["segments"].items():
+            sidecar_path = self._segment_file(int(segment_id), "meta.json")
+            sidecar = self._read_json(sidecar_path)
+            columns = sidecar["columns"]
+            metadatas = [{key: column[offset] for key, column in columns.items()
+                          if offset < len(column) and column[offset] is not None} for offset in range(rows)]
+            self._append_records(int(segment_id), 0, sidecar["ids"][:rows], metadatas)
+            os.remove(sidecar_path)
+        tombstones = np.asarray(self._read_json(self._path("tombstones.json")), dtype=np.int64)
+        with open(self._path("tombstones.bin"), "wb") as f:
+            f.write(tombstones.tobytes())
+        manifest.update({"format": self.FORMAT, "version": manifest["version"] + 1,
+                         "epoch": manifest.get("epoch", 0) + 1, "tombstones": len(tombstones)})
+        self._write_json("manifest.json", manifest)
+        os.remove(self._path("tombstones.json"))
+
+    # ----- carga y sincronización -----
+
+    def _map_segment(self, segment_id: int, rows: int):
+        """Mapea los archivos de un segmento hasta su fila rows (solo lo confirmado en el manifiesto)"""
+        if not rows:
+            self._maps[segment_id] = np.zeros((0, self.dimension), dtype=np.float32)
+            self._offsets[segment_id] = np.zeros((0, 2), dtype=np.int64)
+            self._records[segment_id] = np.zeros(0, dtype=np.uint8)
+            return
+        self._maps[segment_id] = np.memmap(self._segment_file(segment_id, "f32"), dtype=np.float32,
+                                           mode="r", shape=(rows, self.dimension))
+        offsets = np.memmap(self._segment_file(segment_id, "idx"), dtype=np.int64, mode="r", shape=(rows, 2))
+        self._offsets[segment_id] = offsets
+        size = int(offsets[rows - 1, 1])
+        self._records[segment_id] = np.memmap(self._segment_file(segment_id, "meta"), dtype=np.uint8,
+                                              mode="r", shape=(size,)) if size else np.zeros(0, dtype=np.uint8)
+
+    def _unmap_segment(self, segment_id: int):
+        for maps in (self._maps, self._offsets, self._records):
+            maps.pop(segment_id, None)
+
+    def _grow(self, segment_id: int):
+        """Amplía alive hasta cubrir el segmento (las filas nuevas nacen eliminadas)"""
+        count = (segment_id + 1) * self.segment_rows
+        if count > self.count:
+            alive = np.zeros(count, dtype=bool)
+            alive[:self.count] = self.alive
+            self.alive, self.count = alive, count
+
+    def _mark_appended(self, segment_id: int, start: int, end: int) -> List[int]:
+        """Marca vivas las filas [start, end) del segmento y las asocia a su id"""
+        self._grow(segment_id)
+        base = segment_id * self.segment_rows
+        self.alive[base + start:base + end] = True
+        for offset in range(start, end):
+            self.id_to_row[self.id_at(base + offset)] = base + offset
+        return list(range(base + start, base + end))
+
+    def _mark_dead(self, rows) -> List[int]:
+        """Marca filas como eliminadas; retorna las que estaban vivas"""
+        removed = []
+        for row in rows:
+            row = int(row)
+            if row < self.count and self.alive[row]:
+                self.alive[row] = False
+                vector_id = self.id_at(row)
+                if self.id_to_row.get(vector_id) == row:
+                    del self.id_to_row[vector_id]
+                removed.append(row)
+        return removed
+
+    def _read_tombstones(self, start: int, end: int) -> np.ndarray:
+        if end <= start:
+            return np.zeros(0, dtype=np.int64)
+        return np.fromfile(self._path("tombstones.bin"), dtype=np.int64, count=end - start, offset=start * 8)
+
+    def _load(self):
+        """Relee el manifiesto si cambió y anota las filas nuevas y las que dejaron de estar vivas"""
+        manifest = self._read_json(self._path("manifest.json"))
+        if manifest["version"] == self._manifest_version:
+            return
+        if manifest["dimension"] != self.dimension:
+            raise ValueError(
+                f"El directorio {self.directory} tiene vectores de {manifest['dimension']} dimensiones, "
+                f"el proveedor actual usa {self.dimension}"
+            )
+        segments = {int(segment_id): rows for segment_id, rows in manifest["segments"].items()}
+        epoch = manifest.get("epoch", 0)
+
+        if epoch != self._epoch:
+            # Primera carga, compactación o vaciado de otro proceso: las filas cambiaron de posición
+            if self._epoch is not None:
+                self._pending_removed.update(np.flatnonzero(self.alive).tolist())
+            self.segment_rows = manifest["segment_rows"]
+            self._segments, self._maps, self._offsets, self._records = {}, {}, {}, {}
+            self._tombstone_count = 0
+            self.count, self.alive, self.id_to_row = 0, np.zeros(0, dtype=bool), {}
+            self._epoch = epoch
+
+        # Filas agregadas desde el último manifiesto leído (los segmentos solo crecen dentro de un epoch)
+        added = []
+        for segment_id, rows in sorted(segments.items()):
+            used = self._segments.get(segment_id, 0)
+            if rows != used or segment_id not in self._maps:
+                self._map_segment(segment_id, rows)
+                added.extend(self._mark_appended(segment_id, used, rows))
+        self._segments = segments
+        tombstones = self._read_tombstones(self._tombstone_count, manifest.get("tombstones", 0))
+        removed = self._mark_dead(tombstones)
+        self._tombstone_count = manifest.get("tombstones", 0)
+        self._manifest_version = manifest["version"]
+
+        self._pending_removed.update(removed)
+        self._pending_added.update(added)
+
+    @property
+    def version(self) -> int:
+        """Versión del manifiesto cargado (cambia con cada escritura, borrado o compactación)"""
+        return self._manifest_version
+
+    def refresh(self) -> Tuple[List[int], List[int]]:
+        """
+        Sincroniza con los cambios hechos por otros procesos
+
+        Returns:
+            (filas a indexar, filas a quitar de los índices), ordenadas
+        """
+        with self._thread_lock:
+            self._load()
+            added = sorted(row for row in self._pending_added if row < self.count and self.alive[row])
+            removed = sorted(self._pending_removed)
+            self._pending_added, self._pending_removed = set(), set()
+            return added, removed
+
+    def _commit(self, relocated: bool = False):
+        """Publica el estado con un manifiesto nuevo (los logs ya tienen los datos que referencia)"""
+        manifest = {"format": self.FORMAT, "dimension": self.dimension, "segment_rows": self.segment_rows,
+                    "version": self._manifest_version + 1,
+                    "epoch": (self._epoch or 0) + (1 if relocated else 0),
+                    "segments": {str(segment_id): rows for segment_id, rows in self._segments.items()},
+                    "tombstones": self._tombstone_count}
+        self._write_json("manifest.json", manifest)
+        self._manifest_version = manifest["version"]
+        self._epoch = manifest["epoch"]
+
+    # ----- escritura -----
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        """Descarta lo que una escritura interrumpida dejó tras lo confirmado en el manifiesto"""
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _append_records(self, segment_id: int, used: int, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Agrega id y metadata de las filas al log del segmento y sus desplazamientos al índice"""
+        offsets = self._offsets.get(segment_id)
+        position = int(offsets[used - 1, 1]) if used and offsets is not None and len(offsets) >= used else 0
+        self._truncate(self._segment_file(segment_id, "meta"), position)
+        self._truncate(self._segment_file(segment_id, "idx"), used * 16)
+        chunks, bounds = [], np.empty((len(ids), 2), dtype=np.int64)
+        for index, (vector_id, metadata) in enumerate(zip(ids, metadatas)):
+            encoded_id = vector_id.encode("utf-8")
+            encoded = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+            bounds[index] = (position + len(encoded_id), position + len(encoded_id) + len(encoded))
+            position = int(bounds[index, 1])
+            chunks.append(encoded_id)
+            chunks.append(encoded)
+        with open(self._segment_file(segment_id, "meta"), "ab") as f:
+            f.write(b"".join(chunks))
+        with open(self._segment_file(segment_id, "idx"), "ab") as f:
+            f.write(bounds.tobytes())
+
+    def _append(self, ids: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]],
+                skip=frozenset()) -> List[int]:
+        """Agrega filas al segmento activo (creando segmentos nuevos al llenarse, salvo los de skip)"""
+        rows = []
+        position = 0
+        while position < len(ids):
+            active = max(self._segments) if self._segments else 0
+            while self._segments.get(active, 0) >= self.segment_rows or active in skip:
+                active += 1
+            used = self._segments.get(active, 0)
+            take = min(self.segment_rows - used, len(ids) - position)
+            chunk = slice(position, position + take)
+
+            vector_file = self._segment_file(active, "f32")
+            self._truncate(vector_file, used * self.dimension * 4)
+            with open(vector_file, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[chunk], dtype=np.float32).tobytes())
+            self._append_records(active, used, ids[chunk], metadatas[chunk])
+
+            self._segments[active] = used + take
+            self._map_segment(active, used + take)
+            rows.extend(self._mark_appended(active, used, used + take))
+            position += take
+        return rows
+
+    def _append_tombstones(self, rows: List[int]):
+        path = self._path("tombstones.bin")
+        self._truncate(path, self._tombstone_count * 8)
+        with open(path, "ab") as f:
+            f.write(np.asarray(rows, dtype=np.int64).tobytes())
+        self._tombstone_count += len(rows)
+
+    def write(self, ids: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+        """Agrega filas; las versiones anteriores de los mismos ids quedan como tombstones"""
+        with self._file_lock():
+            self._load()
+            replaced = [self.id_to_row[vector_id] for vector_id in ids if vector_id in self.id_to_row]
+            rows = self._append(list(ids), vectors, list(metadatas))
+            self._append_tombstones(replaced)
+            self._mark_dead(replaced)
+            self._commit()
+        if replaced:
+            self.compaction_requested.set()
+        return rows, replaced
+
+    def delete(self, rows: List[int]) -> int:
+        with self._file_lock():
+            self._load()
+            live = [row for row in rows if row < self.count and self.alive[row]]
+            self._append_tombstones(live)
+            self._mark_dead(live)
+            self._commit()
+        if live:
+            self.compaction_requested.set()
+        return len(live)
+
+    def clear(self):
+        with self._file_lock():
+            for segment_id in list(self._segments):
+                self._remove_segment_files(segment_id)
+            self._segments, self._maps, self._offsets, self._records = {}, {}, {}, {}
+            self.count, self.alive, self.id_to_row = 0, np.zeros(0, dtype=bool), {}
+            open(self._path("tombstones.bin"), "wb").close()
+            self._tombstone_count = 0
+            self._pending_added, self._pending_removed = set(), set()
+            self._commit(relocated=True)
+
+    def _remove_segment_files(self, segment_id: int):
+        for suffix in ("f32", "idx", "meta"):
+            path = self._segment_file(segment_id, suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _rewrite_tombstones(self):
+        """Reescribe el log con las filas eliminadas de los segmentos que quedan (solo al compactar)"""
+        rows = [segment_id * self.segment_rows + np.flatnonzero(~self.alive[segment_id * self.segment_rows:
+                                                                         segment_id * self.segment_rows + used])
+                for segment_id, used in sorted(self._segments.items())]
+        tombstones = np.concatenate(rows).astype(np.int64) if rows else np.zeros(0, dtype=np.int64)
+        temporary = self._path("tombstones.bin.tmp")
+        with open(temporary, "wb") as f:
+            f.write(tombstones.tobytes())
+        os.replace(temporary, self._path("tombstones.bin"))
+        self._tombstone_count = len(tombstones)
+
+    # ----- compactación -----
+
+    def compact(self) -> Dict[int, int]:
+        """
+        Reescribe las filas vivas de segmentos con muchos borrados y elimina esos segmentos
+
+        Las filas movidas también se informan en el siguiente refresh() (se quitan
+        de su posición anterior y se indexan en la nueva).
+
+        Returns:
+            Filas movidas {fila anterior: fila nueva}
+        """
+        with self._file_lock():
+            self._load()
+            self.compaction_requested.clear()
+            active = max(self._segments) if self._segments else None
+            candidates = []
+            for segment_id, rows in self._segments.items():
+                base = segment_id * self.segment_rows
+                dead = int((~self.alive[base:base + rows]).sum())
+                sealed = segment_id != active or rows >= self.segment_rows
+                if rows and (dead == rows or (sealed and dead / rows >= self.compaction_threshold)):
+                    candidates.append(segment_id)
+
+            moved = {}
+            for segment_id in candidates:
+                base = segment_id * self.segment_rows
+                rows = self._segments[segment_id]
+                live_offsets = np.flatnonzero(self.alive[base:base + rows])
+                vectors = np.array(self._maps[segment_id][live_offsets])
+                ids = [self.id_at(base + offset) for offset in live_offsets]
+                metadatas = [self.metadata(base + offset) for offset in live_offsets]
+
+                del self._segments[segment_id]
+                self._unmap_segment(segment_id)
+                self.alive[base:base + self.segment_rows] = False
+                # Las filas van a segmentos que no se compactan: ninguna posición se reutiliza
+                new_rows = self._append(ids, vectors, metadatas, skip=set(candidates)) if ids else []
+                self._rewrite_tombstones()
+                self._commit(relocated=True)
+                self._remove_segment_files(segment_id)
+
+                for offset, new_row in zip(live_offsets.tolist(), new_rows):
+                    moved[base + offset] = new_row
+                    # Una fila aún no informada se informa directamente en su nueva posición
+                    self._pending_added.discard(base + offset)
+                    self._pending_added.add(new_row)
+                # Todas las filas del segmento eliminado salen de los índices
+                self._pending_removed.update(range(base, base + rows))
+
+            return moved
+
+    # ----- lectura -----
+
+    def _record(self, row: int) -> Tuple[int, int, int, np.ndarray]:
+        segment_id, offset = divmod(row, self.segment_rows)
+        offsets = self._offsets[segment_id]
+        start = int(offsets[offset - 1, 1]) if offset else 0
+        return start, int(offsets[offset, 0]), int(offsets[offset, 1]), self._records[segment_id]
+
+    def id_at(self, row: int) -> str:
+        start, id_end, _, records = self._record(row)
+        return records[start:id_end].tobytes().decode("utf-8")
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        scores = np.full(self.count, -np.inf, dtype=np.float32)
+        for segment_id, rows in self._segments.items():
+            base = segment_id * self.segment_rows
+            if rows:
+                scores[base:base + rows] = self._maps[segment_id] @ query
+        return scores
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        _, id_end, end, records = self._record(row)
+        return json.loads(records[id_end:end].tobytes().decode("utf-8"))
+
+    def column(self, key: str) -> np.ndarray:
+        """Valores de un campo de metadata para todas las filas globales (None donde falta; recorre el log)"""
+        values = np.empty(self.count, dtype=object)
+        for segment_id, rows in self._segments.items():
+            base = segment_id * self.segment_rows
+            for row in range(base, base + rows):
+                values[row] = self.metadata(row).get(key)
+        return values
@@ -1,22 +1,95 @@
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore 
 from Config.dataBaseConfig import PineconeConfig
+from Models.EmbeddingCache import get_query_cache
+from Models.EmbeddingBatcher import get_query_batcher
+from Models.SharedVectorIndex import get_shared_reader
+from Models.IngestionPipeline import build_ingestion_pipeline
+from Models.AdaptiveUpsert import build_adaptive_upserter, summarize_batches
+from Models.IngestionRegistry import get_ingestion_registry
+from Models.DashboardAggregates import to_metrics, extract_progress_value, classify_status
+from Models.MetricsEngine import ColumnarMetrics
+from Models.MetadataFilter import normalize_filters, to_pinecone_filter, combine_filters, column_mask
+import numpy as np
+import os
+import threading
 import uuid
 from typing import List, Dict, Any
-import warnings
-
-# Suprimir advertencias de pydantic durante la transición
-warnings.filterwarnings("ignore", category=UserWarning, module="langchain_pinecone")
 
 class databaseVectormodel (PineconeConfig):
-    def __init__(self):
-        super().__init__()  # Configurar Gemini API
-        # Inicializar Pinecone con la nueva API
-        self.pinecone = Pinecone(api_key=self.PINECONE_API_KEY)
-        self.record = "smaccb-pruebas1024"
+    def __init__(self, pinecone_client=None, pinecone_factory=None, registry=None):
+        super().__init__()
+        # El cliente (o la función que lo crea) puede venir del contenedor de dependencias
+        self._pinecone = pinecone_client
+        self._pinecone_factory = pinecone_factory
+        self._index = None
+        self._index_lock = threading.Lock()
+        self.record = self.PINECONE_INDEX
+        self._registry = registry
+    
+    @property
+    def pinecone(self):
+        """Cliente de Pinecone, creado en el primer uso"""
+        if self._pinecone is None:
+            if self._pinecone_factory is not None:
+                self._pinecone = self._pinecone_factory()
+            else:
+                from pinecone import Pinecone
+                self._pinecone = Pinecone(api_key=self.PINECONE_API_KEY)
+        return self._pinecone
+    
+    @property
+    def registry(self):
+        """Registro de ingesta con la generación visible de cada archivo"""
+        if self._registry is None:
+            self._registry = get_ingestion_registry()
+        return self._registry
+    
+    def _visibility_filter(self):
+        """
+        Filtro de Pinecone que oculta las generaciones no confirmadas y las reemplazadas
+        
+        Los archivos que no pasaron por el registro (cargas antiguas) siguen visibles.
+        """
+        generations = self.registry.generations()
+        if not generations:
+            return None
+        return {"$or": [{"file_source": {"$nin": list(generations)}}] + [
+            {"$and": [
+                {"file_source": {"$eq": file_source}},
+                {"valid_from": {"$lte": generation}},
+                {"valid_to": {"$gt": generation}}
+            ]}
+            for file_source, generation in generations.items()
+        ]}
+    
+    def get_index(self):
+        """Handle del índice, creado una sola vez y reutilizado entre peticiones"""
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    pool_threads = int(os.getenv("PINECONE_POOL_THREADS", "8"))
+                    index = self.pinecone.Index(self.record, pool_threads=pool_threads)
+                    self._check_index_dimension(index)
+                    self._index = index
+        return self._index
+    
+    def _check_index_dimension(self, index):
+        """
+        Verifica que el índice tenga la dimensión del proveedor de embeddings
+        
+        Raises:
+            ValueError si no coinciden (todas las escrituras y consultas fallarían)
+        """
+        stats = index.describe_index_stats()
+        dimension = stats.get('dimension') if hasattr(stats, 'get') else getattr(stats, 'dimension', None)
+        if dimension and int(dimension) != self.embedding_dimension:
+            raise ValueError(
+                f"El índice {self.record} tiene dimensión {dimension} pero el proveedor de embeddings "
+                f"{self.EMBEDDING_PROVEEDOR} genera vectores de {self.embedding_dimension}. "
+                f"Ajustar EMBEDDING_DIMENSION o PINECONE_INDEX"
+            )
 
     def agregarRecords(self, chunks: str):
-        # Convertir chunks a formato de vectores para usar Gemini
+        # Convertir chunks a formato de vectores
         vectors_data = []
         for i, chunk in enumerate(chunks):
             vectors_data.append({
@@ -25,15 +98,17 @@ class databaseVectormodel (PineconeConfig):
                 'metadata': chunk.metadata
             })
         
-        # Usar el método que ya maneja Gemini correctamente
+        # Usar el método que ya genera los embeddings en lote
         return self.upsert_vectors(vectors_data)
     
     def eliminarRecords(self):
-        index = self.pinecone.Index(self.record)
+        index = self.get_index()
         index.delete(delete_all=True)
+        # Sin vectores, las huellas y generaciones registradas ya no son válidas
+        self.registry.clear()
     
     def consultarRecords(self, pregunta: str):
-        # Usar búsqueda semántica con Gemini
+        # Usar búsqueda semántica
         search_result = self.search_similar_vectors(pregunta, 20)
         if search_result["success"]:
             # Convertir formato para compatibilidad
@@ -49,7 +124,7 @@ class databaseVectormodel (PineconeConfig):
     
     def upsert_vectors(self, vectors_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Inserta o actualiza vectores en Pinecone usando embeddings de Gemini
+        Inserta o actualiza vectores en Pinecone usando el proveedor de embeddings configurado
         
         Args:
             vectors_data: Lista de diccionarios con 'text', 'metadata' y 'id' (opcional)
@@ -58,42 +133,35 @@ class databaseVectormodel (PineconeConfig):
             Diccionario con resultado de la operación
         """
         try:
-            index = self.pinecone.Index(self.record)
-            
-            # Preparar vectores para upsert
-            vectors_to_upsert = []
-            
-            for i, data in enumerate(vectors_data):
-                # Generar ID único si no se proporciona
-                vector_id = data.get('id', str(uuid.uuid4()))
-                
-                # Generar embedding usando Gemini
-                embedding = self.generate_gemini_embedding(data['text'])
-                
-                # Preparar metadata
-                metadata = data.get('metadata', {})
-                metadata['text'] = data['text']  # Incluir texto original en metadata
-                
-                vectors_to_upsert.append({
-                    'id': vector_id,
-                    'values': embedding,
-                    'metadata': metadata
-                })
+            index = self.get_index()
+            # Los bloques de embeddings (EMBEDDING_BATCH_SIZE filas) se juntan hasta llenar un lote por bytes
+            upserts = build_adaptive_upserter(lambda batch: index.upsert(vectors=batch)).buffer()
             
-            # Realizar upsert en lotes para mejor rendimiento
-            batch_size = 100
-            results = []
+            def write_batch(chunk, embeddings):
+                vectors_to_upsert = []
+                for data, embedding in zip(chunk, embeddings):
+                    # Preparar metadata
+                    metadata = data.get('metadata', {})
+                    metadata['text'] = data['text']  # Incluir texto original en metadata
+                    
+                    vectors_to_upsert.append({
+                        'id': data.get('id', str(uuid.uuid4())),
+                        'values': embedding.tolist(),
+                        'metadata': metadata
+                    })
+                # Lotes por tamaño serializado, divididos y reintentados si Pinecone los rechaza
+                return upserts.add(vectors_to_upsert)
             
-            for i in range(0, len(vectors_to_upsert), batch_size):
-                batch = vectors_to_upsert[i:i + batch_size]
-                result = index.upsert(vectors=batch)
-                results.append(result)
+            stats = self._run_ingestion(vectors_data, write_batch, chunk_size=self.EMBEDDING_BATCH_SIZE)
+            batch_reports = [report for reports in stats.pop('results') for report in reports] + upserts.flush()
             
             return {
                 "success": True,
-                "message": f"Se procesaron {len(vectors_to_upsert)} vectores exitosamente",
-                "vectors_count": len(vectors_to_upsert),
-                "results": results
+                "message": f"Se procesaron {stats['vectors_count']} vectores exitosamente",
+                "vectors_count": stats['vectors_count'],
+                "results": batch_reports,
+                "batches": summarize_batches(batch_reports),
+                "pipeline": stats
             }
             
         except Exception as e:
@@ -103,28 +171,100 @@ class databaseVectormodel (PineconeConfig):
                 "error": str(e)
             }
     
-    def search_similar_vectors(self, query_text: str, top_k: int = 10) -> Dict[str, Any]:
+    def fetch_records(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Obtiene la metadata de vectores por ID (sin embeddings ni búsqueda por similitud)
+        
+        Returns:
+            Lista de {'id', 'metadata'} en el orden de ids (se omiten los que no existen)
+        """
+        index = self.get_index()
+        found = {}
+        for start in range(0, len(ids), 1000):
+            response = index.fetch(ids=ids[start:start + 1000])
+            vectors = response.vectors if hasattr(response, 'vectors') else response['vectors']
+            for vector_id, vector in vectors.items():
+                metadata = vector.metadata if hasattr(vector, 'metadata') else vector.get('metadata')
+                found[vector_id] = metadata or {}
+        return [{'id': vector_id, 'metadata': found[vector_id]} for vector_id in ids if vector_id in found]
+    
+    def delete_ids(self, ids: List[str]) -> int:
+        """Elimina vectores por ID en lotes de 1000 (máximo por petición en Pinecone)"""
+        index = self.get_index()
+        for start in range(0, len(ids), 1000):
+            index.delete(ids=ids[start:start + 1000])
+        return len(ids)
+    
+    def update_metadata(self, ids: List[str], fields: Dict[str, Any]) -> int:
+        """
+        Actualiza campos de metadata por lotes: un fetch y un upsert por cada 1000 IDs
+        
+        Pinecone solo actualiza metadata de un ID por petición; reescribir los vectores
+        con sus mismos valores evita una petición por versión reemplazada.
+        
+        Returns:
+            Número de vectores actualizados (se omiten los que no existen)
+        """
+        if not ids:
+            return 0
+        index = self.get_index()
+        upserter = build_adaptive_upserter(lambda batch: index.upsert(vectors=batch))
+        updated = 0
+        for start in range(0, len(ids), 1000):
+            response = index.fetch(ids=ids[start:start + 1000])
+            vectors = response.vectors if hasattr(response, 'vectors') else response['vectors']
+            batch = []
+            for vector_id, vector in vectors.items():
+                if isinstance(vector, dict):
+                    values, metadata = vector.get('values'), vector.get('metadata')
+                else:
+                    values, metadata = vector.values, vector.metadata
+                batch.append({'id': vector_id, 'values': list(values), 'metadata': {**(metadata or {}), **fields}})
+            if batch:
+                upserter.upsert_all(batch)
+                updated += len(batch)
+        return updated
+    
+    def _run_ingestion(self, vectors_data, write_batch, chunk_size: int) -> Dict[str, Any]:
+        """
+        Ejecuta el pipeline de ingesta: embeddings por bloques solapados con write_batch(chunk, embeddings)
+        
+        Returns:
+            Estadísticas del pipeline (vectores, bloques, tiempos por etapa)
+        """
+        pipeline = build_ingestion_pipeline(self.generate_embeddings_batch, write_batch, chunk_size)
+        return pipeline.run(vectors_data)
+    
+    def search_similar_vectors(self, query_text: str, top_k: int = 10,
+                               filters: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Busca vectores similares usando texto de consulta
         
         Args:
             query_text: Texto de consulta para búsqueda semántica
             top_k: Número de resultados a retornar
+            filters: Filtros de metadata (ver Models.MetadataFilter) aplicados dentro de la consulta
         
         Returns:
             Diccionario con resultados de búsqueda
         """
         try:
-            index = self.pinecone.Index(self.record)
+            filters = normalize_filters(filters)
+            shared_results = self._search_shared(query_text, top_k, filters)
+            if shared_results is not None:
+                return shared_results
             
-            # Generar embedding de la consulta
-            query_embedding = self.generate_gemini_embedding(query_text)
+            index = self.get_index()
+            
+            # Generar embedding de la consulta (o tomarlo de la caché de consultas)
+            query_embedding = self.embed_query(query_text)
             
             # Realizar búsqueda
             search_results = index.query(
                 vector=query_embedding,
                 top_k=top_k,
-                include_metadata=True
+                include_metadata=True,
+                filter=combine_filters(self._visibility_filter(), to_pinecone_filter(filters))
             )
             
             # Formatear resultados
@@ -150,15 +290,113 @@ class databaseVectormodel (PineconeConfig):
                 "error": str(e)
             }
     
+    def _shared_reader(self):
+        """Vista del índice en memoria compartida (SHARED_VECTOR_INDEX), si hay una generación publicada"""
+        namespace = os.getenv("SHARED_VECTOR_INDEX")
+        if not namespace:
+            return None
+        reader = get_shared_reader(namespace)
+        if not reader.refresh() or reader.vectors.shape[1] != self.embedding_dimension:
+            return None
+        return reader
+    
+    def _search_shared(self, query_text: str, top_k: int, filters: Dict[str, Any] = None):
+        """Busca en la generación compartida; None si no hay vista disponible"""
+        reader = self._shared_reader()
+        if reader is None:
+            return None
+        query_embedding = np.asarray(self.embed_query(query_text), dtype=np.float32)
+        mask = column_mask(reader.column, filters, reader.rows) if filters else None
+        formatted_results = reader.search(query_embedding, top_k, mask)
+        return {
+            "success": True,
+            "query": query_text,
+            "results": formatted_results,
+            "total_found": len(formatted_results)
+        }
+    
+    def publish_shared_index(self) -> int:
+        """
+        Publica el índice completo en memoria compartida
+        
+        Pinecone no expone todos los vectores de forma eficiente, así que solo
+        el backend local puede actuar como cargador; aquí no se publica nada.
+        
+        Returns:
+            Generación publicada (0 si no se publicó)
+        """
+        return 0
+    
+    def checkpoint(self):
+        """
+        Guarda el estado derivado del índice tras una carga confirmada
+        
+        Pinecone persiste cada escritura por su cuenta: aquí no hay nada que guardar.
+        """
+        return None
+    
+    def embed_query(self, query_text: str) -> list:
+        """
+        Retorna el embedding de una consulta usando la caché LRU con TTL
+        
+        Las consultas que no están en caché pasan por el micro-batcher, que
+        agrupa las peticiones concurrentes en una sola llamada al proveedor.
+        """
+        query_cache = get_query_cache()
+        embedding = query_cache.get(query_text)
+        if embedding is None:
+            embedding = get_query_batcher().embed(query_text, self.generate_embeddings_batch)
+            query_cache.put(query_text, embedding)
+        return embedding
+    
+    def precompute_query_embeddings(self, queries: List[str]) -> int:
+        """
+        Vectoriza consultas fijas una sola vez y las deja en caché sin expiración
+        
+        Returns:
+            Número de consultas precalculadas
+        """
+        if not queries:
+            return 0
+        query_cache = get_query_cache()
+        embeddings = self.generate_embeddings_batch(queries)
+        for query_text, embedding in zip(queries, embeddings):
+            query_cache.put(query_text, embedding.tolist(), pinned=True)
+        return len(queries)
+    
+    def _aggregated_dashboard(self):
+        """
+        Métricas exactas desde los agregados que mantiene la ingesta
+        
+        Returns:
+            Respuesta del dashboard o None si ninguna carga pasó por el registro
+        """
+        aggregates = self.registry.dashboard_aggregates()
+        if not aggregates["count"]:
+            return None
+        return {
+            "success": True,
+            "total_vectors": aggregates["count"],
+            "sample_analyzed": aggregates["count"],
+            "metrics": to_metrics(aggregates)
+        }
+    
     def get_dashboard_metrics(self) -> Dict[str, Any]:
         """
         Obtiene métricas consolidadas para el dashboard
         
+        Usa los agregados calculados en la ingesta; solo si no existen (cargas
+        anteriores al registro) analiza una muestra del índice.
+        
         Returns:
             Diccionario con métricas del dashboard
         """
         try:
-            index = self.pinecone.Index(self.record)
+            aggregated = self._aggregated_dashboard()
+            if aggregated is not None:
+                return aggregated
+            
+            index = self.get_index()
             
             # Obtener estadísticas del índice
             stats = index.describe_index_stats()
@@ -170,9 +408,10 @@ class databaseVectormodel (PineconeConfig):
             # Solo hacer query si hay vectores
             if sample_size > 0:
                 sample_results = index.query(
-                    vector=[0.0] * 1024,  # Vector dummy para obtener muestra (Gemini usa 1024 dimensiones)
+                    vector=[0.0] * self.embedding_dimension,  # Vector dummy para obtener muestra
                     top_k=sample_size,
-                    include_metadata=True
+                    include_metadata=True,
+                    filter=self._visibility_filter()
                 )
             else:
                 sample_results = {'matches': []}
@@ -201,60 +440,43 @@ class databaseVectormodel (PineconeConfig):
                 "error": str(e)
             }
     
-    def _calculate_project_metrics(self, projects_data: List[Dict]) -> Dict[str, Any]:
+    def get_filtered_metrics(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Calcula métricas específicas de proyectos
+        Métricas del dashboard para un corte filtrado de las filas confirmadas
         
         Args:
-            projects_data: Lista de metadata de proyectos
+            filters: project, assignee, file_source, status, date_from, date_to,
+                progress_min, progress_max (ver Models.MetricsEngine)
         
         Returns:
-            Diccionario con métricas calculadas
+            Diccionario con total de filas del corte y métricas (mismas claves que el dashboard)
         """
-        if not projects_data:
+        try:
+            aggregates = self.registry.metrics_engine().aggregates(filters)
+            return {
+                "success": True,
+                "total_vectors": aggregates["count"],
+                "sample_analyzed": aggregates["count"],
+                "metrics": to_metrics(aggregates)
+            }
+        except Exception as e:
             return {
-                "total_projects": 0,
-                "projects_on_track": 0,
-                "projects_delayed": 0,
-                "average_progress": 0,
-                "risk_projects": 0,
-                "completion_rate": 0
+                "success": False,
+                "message": f"Error obteniendo métricas filtradas: {str(e)}",
+                "error": str(e)
             }
+    
+    def _calculate_project_metrics(self, projects_data: List[Dict]) -> Dict[str, Any]:
+        """
+        Calcula métricas específicas de proyectos
         
-        total_projects = len(projects_data)
-        projects_on_track = 0
-        projects_delayed = 0
-        risk_projects = 0
-        progress_values = []
-        
-        for project in projects_data:
-            # Analizar progreso (buscar campos comunes de progreso)
-            progress = self._extract_progress_value(project)
-            if progress is not None:
-                progress_values.append(progress)
-            
-            # Clasificar estado del proyecto
-            status = self._classify_project_status(project)
-            if status == "on_track":
-                projects_on_track += 1
-            elif status == "delayed":
-                projects_delayed += 1
-            elif status == "at_risk":
-                risk_projects += 1
-        
-        # Calcular métricas
-        average_progress = sum(progress_values) / len(progress_values) if progress_values else 0
-        completion_rate = (projects_on_track / total_projects) * 100 if total_projects > 0 else 0
+        Args:
+            projects_data: Lista de metadata de proyectos
         
-        return {
-            "total_projects": total_projects,
-            "projects_on_track": projects_on_track,
-            "projects_delayed": projects_delayed,
-            "risk_projects": risk_projects,
-            "average_progress": round(average_progress, 2),
-            "completion_rate": round(completion_rate, 2),
-            "projects_analyzed": len(progress_values)
-        }
+        Returns:
+            Diccionario con métricas calculadas (mismas claves que el dashboard agregado)
+        """
+        return ColumnarMetrics.from_metadata(projects_data).compute()
     
     def _extract_progress_value(self, project_metadata: Dict) -> float:
         """
@@ -266,27 +488,7 @@ class databaseVectormodel (PineconeConfig):
         Returns:
             Valor de progreso (0-100) o None si no se encuentra
         """
-        # Buscar campos comunes de progreso
-        progress_fields = ['progreso', 'progress', 'avance', 'completado', 'porcentaje', '%']
-        
-        for field in progress_fields:
-            for key, value in project_metadata.items():
-                if field.lower() in key.lower():
-                    try:
-                        # Extraer número del valor
-                        if isinstance(value, str):
-                            # Buscar números en el string
-                            import re
-                            numbers = re.findall(r'\d+\.?\d*', value)
-                            if numbers:
-                                progress = float(numbers[0])
-                                return min(100, max(0, progress))  # Limitar entre 0-100
-                        elif isinstance(value, (int, float)):
-                            return min(100, max(0, float(value)))
-                    except (ValueError, TypeError):
-                        continue
-        
-        return None
+        return extract_progress_value(project_metadata)
     
     def _classify_project_status(self, project_metadata: Dict) -> str:
         """
@@ -296,17 +498,6 @@ class databaseVectormodel (PineconeConfig):
             project_metadata: Metadatos del proyecto
         
         Returns:
-            Estado del proyecto: 'on_track', 'delayed', 'at_risk'
+            Estado del proyecto: 'on_track', 'delayed', 'at_risk' o 'unknown'
         """
-        progress = self._extract_progress_value(project_metadata)
-        
-        if progress is None:
-            return "unknown"
-        
-        # Clasificar basado en progreso
-        if progress >= 80:
-            return "on_track"
-        elif progress >= 50:
-            return "at_risk"
-        else:
-            return "delayed"
\ No newline at end of file
+        return classify_status(self._extract_progress_value(project_metadata))
@@ -0,0 +1,116 @@
+"""
+Contenedor de dependencias del proceso
+Entrega una única instancia (thread-safe) de los clientes de Pinecone, LLM,
+modelo vectorial y servicios, para que las peticiones reutilicen conexiones
+"""
+
+import os
+import threading
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ServiceContainer:
+    """Registro perezoso de clientes y servicios compartidos"""
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    def pinecone_client(self):
+        """Cliente de Pinecone con pool de conexiones keep-alive"""
+        def build():
+            from pinecone import Pinecone
+            from Config.dataBaseConfig import PineconeConfig
+            return Pinecone(
+                api_key=PineconeConfig.PINECONE_API_KEY,
+                pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "8"))
+            )
+        return self._get("pinecone_client", build)
+
+    def vector_model(self):
+        """Modelo de base de datos vectorial compartido (cachea el handle del índice)"""
+        def build():
+            from Config.dataBaseConfig import PineconeConfig
+            if PineconeConfig.VECTOR_BACKEND.lower() == "local":
+                from Models.LocalVectorStore import LocalVectorStore
+                return LocalVectorStore()
+            from Models.databaseVectorModel import databaseVectormodel
+            return databaseVectormodel(pinecone_factory=self.pinecone_client)
+        return self._get("vector_model", build)
+
+    def index(self):
+        """Handle del índice vectorial, reutilizado entre peticiones"""
+        return self.vector_model().get_index()
+
+    def llm(self):
+        """Cliente del LLM compartido"""
+        def build():
+            from Models.LlmModel import ModeLlm
+            return ModeLlm()
+        return self._get("llm", build)
+
+    def db_controller(self):
+        def build():
+            from Controllers.dataBaseVectorController import dataBaseVectorController
+            return dataBaseVectorController(self.vector_model())
+        return self._get("db_controller", build)
+
+    def llm_controller(self):
+        def build():
+            from Controllers.LmmController import lmmController
+            return lmmController(
+                model=self.llm(),
+                database=self.db_controller(),
+                db_model=self.vector_model()
+            )
+        return self._get("llm_controller", build)
+
+    def excel_service(self):
+        def build():
+            from app.services.excel_processing_service import ExcelProcessingService
+            return ExcelProcessingService()
+        return self._get("excel_service", build)
+
+    def project_service(self):
+        def build():
+            from app.services.project_analysis_service import ProjectAnalysisService
+            return ProjectAnalysisService(self.llm_controller(), self.vector_model(), self.ingestion_registry())
+        return self._get("project_service", build)
+
+    def search_service(self):
+        def build():
+            from app.services.search_service import SearchService
+            return SearchService(self.llm_controller(), self.vector_model())
+        return self._get("search_service", build)
+
+    def ingestion_registry(self):
+        def build():
+            from Models.IngestionRegistry import get_ingestion_registry
+            return get_ingestion_registry()
+        return self._get("ingestion_registry", build)
+
+    def upload_service(self):
+        def build():
+            from app.services.file_upload_service import FileUploadService
+            return FileUploadService(self.vector_model(), self.excel_service(), self.ingestion_registry())
+        return self._get("upload_service", build)
+
+    def dashboard_service(self):
+        def build():
+            from app.services.dashboard_service import DashboardService
+            return DashboardService(self.db_controller(), self.ingestion_registry())
+        return self._get("dashboard_service", build)
+
+
+container = ServiceContainer()
@@ -1,30 +1,45 @@
 from flask import Blueprint, jsonify, request
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-# Importar servicios
-from app.services.excel_processing_service import ExcelProcessingService
-from app.services.project_analysis_service import ProjectAnalysisService
-from app.services.search_service import SearchService
-from app.services.file_upload_service import FileUploadService
+# Servicios y clientes compartidos (se crean en el primer uso)
+from app.container import container
 
 # Inicializar Blueprint
 api = Blueprint('api', __name__)
 
-# Inicializar servicios
-excel_service = ExcelProcessingService()
-project_service = ProjectAnalysisService()
-search_service = SearchService()
-upload_service = FileUploadService()
+def warmup_services() -> dict:
+    """Crea los servicios, carga modelos/clientes y precalcula las consultas fijas"""
+    timings = {}
+    for name in ("excel", "project", "search", "upload"):
+        started = time.perf_counter()
+        getattr(container, f"{name}_service")()
+        timings[f"service_{name}"] = round(time.perf_counter() - started, 3)
+    
+    timings.update(container.search_service().warmup())
+    
+    started = time.perf_counter()
+    canned = container.project_service().precompute_canned_queries()
+    timings["canned_queries"] = round(time.perf_counter() - started, 3)
+    return {"success": True, "canned_queries": canned, "timings_seconds": timings}
 
 # Endpoints de la API
+@api.route("/warmup", methods=["GET", "POST"])
+def warmup():
+    """Carga anticipada de modelos y clientes (para readiness checks)"""
+    try:
+        return jsonify(warmup_services())
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
 @api.route("/response", methods=["POST"])
 def index():
     """Endpoint principal para consultas al LLM"""
     try:
         prompt = request.get_json()
-        response = search_service.llm_query(prompt)
+        response = container.search_service().llm_query(prompt)
         return jsonify({"LLM": response})
     except Exception as e:
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
@@ -53,7 +68,7 @@ def sma_agent_chat():
         prompt_data = {"prompt": user_text.strip()}
         
         # Procesar consulta con acceso a datos vectorizados
-        response = search_service.llm_query(prompt_data)
+        response = container.search_service().llm_query(prompt_data)
         
         print(f"Respuesta generada exitosamente")
         
@@ -81,7 +96,8 @@ def sma_agent_chat():
 def eliminar():
     """Elimina todos los registros de la base de datos vectorial"""
     try:
-        result = search_service.clear_database()
+        result = container.search_service().clear_database()
+        container.dashboard_service().invalidate()
         return jsonify(result)
     except Exception as e:
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
@@ -103,7 +119,8 @@ def upload_excel():
         
         # DEBUG: Verificar que el servicio se inicializa
         print("Llamando a upload_service...")
-        result = upload_service.upload_excel_file(request)
+        result = container.upload_service().upload_excel_file(request)
+        container.dashboard_service().invalidate()
         print("Servicio ejecutado correctamente")
         
         return jsonify(result)
@@ -132,16 +149,28 @@ def search():
         query_text = data['query']
         top_k = data.get('top_k', 10)
         
-        result = search_service.semantic_search(query_text, top_k)
+        filters = data.get('filters')
+        
+        result = container.search_service().semantic_search(query_text, top_k, filters)
         
         if result["success"]:
             return jsonify(result)
         else:
-            return jsonify(result), 400 if "Query no puede estar vacío" in result["message"] else 500
+            invalid = any(message in result["message"] for message in ("Query no puede estar vacío", "Filtros no soportados", "Filtros no válidos"))
+            return jsonify(result), 400 if invalid else 500
         
     except Exception as e:
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
 
+@api.route("/embedding_cache/stats", methods=["GET"])
+def embedding_cache_stats():
+    """Contadores de la caché de embeddings"""
+    try:
+        result = container.search_service().embedding_cache_stats()
+        return jsonify(result) if result["success"] else (jsonify(result), 500)
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
 @api.route("/analyze_delays", methods=["POST"])
 def analyze_delays():
     """Analiza proyectos con atrasos y sus causas"""
@@ -150,8 +179,11 @@ def analyze_delays():
         project_name = data.get('project_name', '')
         assignee = data.get('assignee', '')
         top_k = data.get('top_k', 20)
+        filters = data.get('filters')
         
-        result = project_service.analyze_delays(project_name, assignee, top_k)
+        result = container.project_service().analyze_delays(project_name, assignee, top_k, filters)
+        if not result["success"] and ("Filtros no soportados" in result["message"] or "Filtros no válidos" in result["message"]):
+            return jsonify(result), 400
         return jsonify(result)
         
     except Exception as e:
@@ -165,8 +197,11 @@ def pending_tasks():
         project_name = data.get('project_name', '')
         assignee = data.get('assignee', '')
         top_k = data.get('top_k', 15)
+        filters = data.get('filters')
         
-        result = project_service.analyze_pending_tasks(project_name, assignee, top_k)
+        result = container.project_service().analyze_pending_tasks(project_name, assignee, top_k, filters)
+        if not result["success"] and ("Filtros no soportados" in result["message"] or "Filtros no válidos" in result["message"]):
+            return jsonify(result), 400
         return jsonify(result)
         
     except Exception as e:
@@ -182,7 +217,8 @@ def project_summary():
             return jsonify({"success": False, "message": "Se requiere 'project_name'"}), 400
         
         project_name = data['project_name'].strip()
-        result = project_service.generate_project_summary(project_name)
+        filters = data.get('filters')
+        result = container.project_service().generate_project_summary(project_name, filters)
         
         if result["success"]:
             return jsonify(result)
@@ -191,4 +227,75 @@ def project_summary():
             return jsonify(result), status_code
         
     except Exception as e:
-        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+@api.route("/projects/<path:project_name>/activities", methods=["GET"])
+def project_activities(project_name):
+    """Actividades de un proyecto desde el índice de ingesta (paginadas con offset y limit)"""
+    try:
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 50, type=int)
+        
+        result = container.project_service().get_project_activities(project_name, offset, limit)
+        
+        if result["success"]:
+            return jsonify(result)
+        else:
+            status_code = 400 if "no puede estar vacío" in result["message"] else 404 if "No se encontraron" in result["message"] else 500
+            return jsonify(result), status_code
+        
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+@api.route("/assignees/<path:assignee>/workload", methods=["GET"])
+def assignee_workload(assignee):
+    """Carga de trabajo de una persona desde el índice de ingesta (actividades paginadas con offset y limit)"""
+    try:
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 50, type=int)
+        
+        result = container.project_service().get_assignee_workload(assignee, offset, limit)
+        
+        if result["success"]:
+            return jsonify(result)
+        else:
+            status_code = 400 if "no puede estar vacío" in result["message"] else 404 if "No se encontraron" in result["message"] else 500
+            return jsonify(result), status_code
+        
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+@api.route("/dashboard", methods=["GET"])
+def dashboard():
+    """Métricas consolidadas del dashboard (cacheadas; responde 304 si el If-None-Match coincide)"""
+    try:
+        result = container.dashboard_service().get_dashboard()
+        
+        if not result["success"]:
+            return jsonify({"success": False, "message": f"Error: {result['message']}"}), 500
+        
+        response = jsonify(result["data"])
+        response.set_etag(result["etag"])
+        # El cliente siempre revalida, pero una respuesta sin cambios viaja sin cuerpo
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+@api.route("/dashboard/metrics", methods=["GET"])
+def dashboard_metrics():
+    """Métricas del dashboard de un corte filtrado (?project=&assignee=&file_source=&status=&date_from=&date_to=)"""
+    try:
+        # Un parámetro repetido (?project=A&project=B) filtra por cualquiera de sus valores
+        filters = {key: values if len(values) > 1 else values[0] for key, values in request.args.lists()}
+        
+        result = container.dashboard_service().get_filtered_metrics(filters)
+        
+        if result["success"]:
+            return jsonify(result)
+        else:
+            return jsonify(result), 400 if "Filtros no soportados" in result["message"] or "no válid" in result["message"] else 500
+        
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
@@ -0,0 +1,133 @@
+"""
+Servicio del dashboard
+Cachea la respuesta de métricas hasta que una carga o un borrado cambia los
+datos, y le asigna un ETag para que el cliente pueda revalidar con If-None-Match
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from Controllers.dataBaseVectorController import dataBaseVectorController
+from Models.IngestionRegistry import get_ingestion_registry
+from Models.MetricsEngine import normalize_metric_filters
+
+
+class DashboardService:
+    """
+    Métricas del dashboard con caché en el servidor
+
+    La entrada cacheada se invalida con invalidate() (cargas y borrados de este
+    proceso), cuando cambia la versión del registro de ingesta (cargas de otros
+    procesos) o al vencer DASHBOARD_CACHE_TTL segundos (datos cargados fuera del
+    registro).
+    """
+
+    def __init__(self, db_controller=None, registry=None, ttl_seconds: float = None, clock=time.monotonic):
+        self.db_controller = db_controller or dataBaseVectorController()
+        self.registry = registry or get_ingestion_registry()
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entry = None
+        self._generation = 0
+        self.stats = {"hits": 0, "misses": 0}
+
+    def invalidate(self):
+        """Descarta la respuesta cacheada (llamar tras cargar o eliminar datos)"""
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+    def _key(self):
+        return (self._generation, self.registry.version())
+
+    def get_dashboard(self) -> Dict[str, Any]:
+        """
+        Respuesta del dashboard, cacheada
+
+        Returns:
+            Diccionario con 'success', 'data' (cuerpo de /api/dashboard) y 'etag'
+        """
+        try:
+            key = self._key()
+            entry = self._entry
+            if entry is not None and entry["key"] == key and self._clock() < entry["expires"]:
+                self.stats["hits"] += 1
+                return entry["response"]
+
+            # Un solo cálculo aunque varios clientes consulten a la vez tras invalidar
+            with self._lock:
+                key = (self._generation, self.registry.version())
+                entry = self._entry
+                if entry is not None and entry["key"] == key and self._clock() < entry["expires"]:
+                    self.stats["hits"] += 1
+                    return entry["response"]
+
+                self.stats["misses"] += 1
+                dashboard_data = self.db_controller.obtener_metricas_dashboard()
+                if not dashboard_data["success"]:
+                    return {"success": False, "message": dashboard_data["message"]}
+
+                summary = {
+                    "total_vectors": dashboard_data["total_vectors"],
+                    "projects_analyzed": dashboard_data["sample_analyzed"]
+                }
+                # El ETag depende solo del contenido: recalcular sin cambios no invalida al cliente
+                fingerprint = json.dumps({"summary": summary, "metrics": dashboard_data["metrics"]},
+                                         sort_keys=True, default=str)
+                now = datetime.now()
+                response = {
+                    "success": True,
+                    "etag": hashlib.sha1(fingerprint.encode('utf-8')).hexdigest(),
+                    "data": {
+                        "success": True,
+                        "timestamp": now.isoformat(),
+                        "data": {
+                            "summary": {**summary, "last_updated": now.strftime("%Y-%m-%d %H:%M:%S")},
+                            "metrics": dashboard_data["metrics"]
+                        }
+                    }
+                }
+                self._entry = {"key": key, "expires": self._clock() + self.ttl_seconds, "response": response}
+                return response
+
+        except Exception as e:
+            return {"success": False, "message": f"Error obteniendo métricas del dashboard: {str(e)}"}
+
+    def get_filtered_metrics(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Métricas de un corte filtrado (project, assignee, file_source, status,
+        date_from, date_to, progress_min, progress_max), con la forma de /api/dashboard
+
+        Se calculan al vuelo sobre las columnas de métricas, sin caché de respuesta.
+        """
+        try:
+            filters = normalize_metric_filters(filters)
+            dashboard_data = self.db_controller.obtener_metricas_filtradas(filters)
+            if not dashboard_data["success"]:
+                return {"success": False, "message": dashboard_data["message"]}
+
+            now = datetime.now()
+            return {
+                "success": True,
+                "timestamp": now.isoformat(),
+                "data": {
+                    "summary": {
+                        "total_vectors": dashboard_data["total_vectors"],
+                        "projects_analyzed": dashboard_data["sample_analyzed"],
+                        "last_updated": now.strftime("%Y-%m-%d %H:%M:%S")
+                    },
+                    "filters": filters,
+                    "metrics": dashboard_data["metrics"]
+                }
+            }
+
+        except Exception as e:
+            return {"success": False, "message": f"Error obteniendo métricas filtradas: {str(e)}"}
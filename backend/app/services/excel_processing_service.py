@@ -4,13 +4,42 @@ Maneja la carga, validación y procesamiento de archivos Excel para análisis de
 """
 
 import os
+import hashlib
+import importlib.util
+import json
+import pickle
+import tempfile
 import pandas as pd
 import numpy as np
-import uuid
 import re
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 from werkzeug.utils import secure_filename
 
+# Rol de cada columna según su nombre: gana el primer rol cuyas palabras aparecen
+COLUMN_ROLES = [
+    ('assignee', ['asignado', 'assignee', 'responsable', 'encargado']),
+    ('project_name', ['proyecto', 'project', 'nombre_proyecto']),
+    ('activity_name', ['actividad', 'activity', 'tarea', 'task']),
+    ('progress', ['progreso', 'progress', 'avance', 'porcentaje', 'completado']),
+    ('notes', ['notas', 'notes', 'comentarios', 'observaciones']),
+    ('dates', ['fecha_inicio', 'fecha_fin', 'start_date', 'end_date', 'timeline'])
+]
+INVALID_VALUES = ['', 'nan', 'NaN', 'None', 'null']
+PERCENTAGE_PATTERN = r'(\d+(?:\.\d+)?)\s*%?'
+# Textos que pd.read_excel lee como celda vacía (na_values por defecto)
+SHEET_NA_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                   '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+# Motores de pd.read_excel y el paquete que necesita cada uno
+EXCEL_ENGINES = {'calamine': 'python_calamine', 'openpyxl': 'openpyxl', 'xlrd': 'xlrd'}
+PROJECT_TEXT_CONTEXT = "Información de seguimiento de proyecto. Análisis de avances, atrasos y gestión de tareas."
+
+
+@lru_cache(maxsize=None)
+def engine_installed(engine: str) -> bool:
+    """Si el paquete del motor de lectura está instalado"""
+    return importlib.util.find_spec(EXCEL_ENGINES[engine]) is not None
+
 
 class ExcelProcessingService:
     """Servicio especializado en procesamiento de archivos Excel"""
@@ -18,6 +47,7 @@ class ExcelProcessingService:
     def __init__(self):
         self.allowed_extensions = {'xlsx', 'xls'}
         self.upload_folder = 'uploads'
+        self._plans = {}
     
     def allowed_file(self, filename: str) -> bool:
         """Verifica si el archivo tiene una extensión permitida"""
@@ -53,6 +83,7 @@ class ExcelProcessingService:
         }
         
         columns = df.columns.tolist()
+        validation_result['column_plan'] = self.compile_column_plan(columns)
         
         # Campos esperados y sus variantes
         expected_fields = {
@@ -111,7 +142,7 @@ class ExcelProcessingService:
         if isinstance(value, (int, float)):
             return float(value)
         
-        numbers = re.findall(r'(\d+(?:\.\d+)?)\s*%?', str(value))
+        numbers = re.findall(PERCENTAGE_PATTERN, str(value))
         if numbers:
             return min(100, max(0, float(numbers[0])))
         return None
@@ -153,6 +184,157 @@ class ExcelProcessingService:
         
         return tasks
     
+    def compile_column_plan(self, columns: List[str]) -> Dict[str, List[str]]:
+        """
+        Resuelve una vez por libro qué columnas alimentan cada campo del proyecto
+        
+        Aplica las mismas reglas que antes se evaluaban celda a celda (primer rol
+        de COLUMN_ROLES cuyo nombre coincide); dentro de un rol las columnas quedan
+        en el orden del libro, así que la última con valor gana. 'required' son las
+        columnas de asignado, proyecto o actividad, que cuentan como faltantes si
+        están vacías.
+        """
+        plan = {role: [] for role, _ in COLUMN_ROLES if role != 'dates'}
+        plan.update({'timeline_start': [], 'timeline_end': [], 'required': []})
+        for col in columns:
+            col_lower = str(col).lower().strip()
+            role = next((role for role, keywords in COLUMN_ROLES
+                         if any(keyword in col_lower for keyword in keywords)), None)
+            if role == 'dates':
+                if 'inicio' in col_lower or 'start' in col_lower:
+                    plan['timeline_start'].append(col)
+                elif 'fin' in col_lower or 'end' in col_lower:
+                    plan['timeline_end'].append(col)
+            elif role is not None:
+                plan[role].append(col)
+                if role in ('assignee', 'project_name', 'activity_name'):
+                    plan['required'].append(col)
+        return plan
+    
+    @staticmethod
+    def _cell_strings(series: pd.Series) -> pd.Series:
+        """Valor de texto de cada celda ('' si está vacía), como str(valor).strip()"""
+        return series.astype(object).where(series.notna(), '').astype(str).str.strip()
+    
+    def _row_cells(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """
+        Texto de cada celda por columna, tal como lo ve la ruta fila a fila
+        
+        iterrows entrega cada fila con el tipo común del DataFrame (en una hoja
+        solo numérica un entero llega como float), así que se parte de los mismos
+        valores (df.to_numpy()) y no de cada columna con su tipo propio.
+        """
+        block = df.to_numpy()
+        return {col: self._cell_strings(pd.Series(block[:, position], index=df.index))
+                for position, col in enumerate(df.columns)}
+    
+    def extract_project_columns(self, df: pd.DataFrame, plan: Dict[str, List[str]],
+                                cells: Dict[str, pd.Series] = None) -> Dict[str, Any]:
+        """
+        Extrae la información estructurada de todas las filas, columna a columna
+        
+        Args:
+            df: DataFrame normalizado
+            plan: Plan de columnas de compile_column_plan
+            cells: Texto de las celdas (_row_cells), si ya se calculó
+        
+        Returns:
+            Diccionario campo -> array (o lista) con un valor por fila
+        """
+        size = len(df)
+        cells = cells if cells is not None else self._row_cells(df)
+        used = dict.fromkeys(col for role in plan.values() for col in role)
+        valid = {col: (cells[col].ne('') & ~cells[col].isin(INVALID_VALUES)).to_numpy() for col in used}
+        
+        # Por rol, el valor de la última columna con contenido
+        columns = {}
+        for role in ('assignee', 'project_name', 'activity_name', 'notes', 'timeline_start', 'timeline_end'):
+            result = np.full(size, None, dtype=object)
+            for col in plan[role]:
+                result = np.where(valid[col], cells[col].to_numpy(dtype=object), result)
+            columns[role] = result
+        
+        # Progreso: el último valor numérico válido; los no numéricos dejan advertencia.
+        # is_delayed se acumula: basta una columna de progreso por debajo de 50
+        progress = np.full(size, np.nan)
+        delayed = np.zeros(size, dtype=bool)
+        warnings = [[] for _ in range(size)]
+        for col in plan['progress']:
+            parsed = cells[col].str.extract(PERCENTAGE_PATTERN, expand=False).astype(float).clip(0, 100).to_numpy()
+            numeric = valid[col] & ~np.isnan(parsed)
+            progress = np.where(numeric, parsed, progress)
+            delayed |= numeric & (parsed < 50)
+            for position in np.flatnonzero(valid[col] & np.isnan(parsed)):
+                warnings[position].append(f'Valor de progreso no válido: {cells[col].iat[position]}')
+        has_progress = ~np.isnan(progress)
+        columns['progress'] = progress
+        columns['status'] = np.select(
+            [has_progress & (progress < 50), has_progress & (progress < 80), has_progress],
+            ['delayed', 'at_risk', 'on_track'], default='unknown'
+        ).astype(object)
+        columns['is_delayed'] = delayed
+        
+        missing = [[] for _ in range(size)]
+        for col in plan['required']:
+            for position in np.flatnonzero(~valid[col]):
+                missing[position].append(col)
+        columns['missing_fields'] = missing
+        
+        # Notas repetidas se analizan una sola vez
+        reasons, tasks = {}, {}
+        for notes in set(columns['notes'].tolist()) - {None}:
+            reasons[notes] = self.analyze_delays_in_notes(notes)
+            tasks[notes] = self.extract_pending_tasks(notes)
+        columns['delay_reasons'] = [list(reasons[notes]) if notes is not None else [] for notes in columns['notes']]
+        columns['pending_tasks'] = [list(tasks[notes]) if notes is not None else [] for notes in columns['notes']]
+        
+        # Calidad de datos según los campos críticos que faltan
+        critical = np.stack([columns[field] == None for field in ('project_name', 'assignee', 'activity_name')])  # noqa: E711
+        critical_count = critical.sum(axis=0)
+        columns['data_quality'] = np.select([critical_count >= 2, critical_count == 1], ['poor', 'partial'],
+                                            default='complete').astype(object)
+        names = np.array(['project_name', 'assignee', 'activity_name'])
+        no_progress = ~has_progress | (progress == 0)
+        for position in range(size):
+            if critical_count[position] >= 2:
+                warnings[position].append(f'Faltan campos críticos: {names[critical[:, position]].tolist()}')
+            elif critical_count[position] == 1:
+                warnings[position].append(f'Falta campo crítico: {names[critical[:, position]][0]}')
+            if no_progress[position]:
+                warnings[position].append('Sin información de progreso')
+        columns['warnings'] = warnings
+        return columns
+    
+    @staticmethod
+    def _progress_value(value: float):
+        """Como min(100, max(0, x)): en los extremos queda el entero (se muestra "0%" y no "0.0%")"""
+        if np.isnan(value):
+            return None
+        return 0 if value <= 0 else 100 if value >= 100 else float(value)
+    
+    def extract_project_records(self, df: pd.DataFrame, plan: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        """Lista con un diccionario por fila (mismo formato que extract_project_data)"""
+        columns = self.extract_project_columns(df, plan)
+        return [
+            {
+                'assignee': columns['assignee'][position],
+                'project_name': columns['project_name'][position],
+                'activity_name': columns['activity_name'][position],
+                'progress_percentage': self._progress_value(columns['progress'][position]),
+                'notes': columns['notes'][position],
+                'timeline_start': columns['timeline_start'][position],
+                'timeline_end': columns['timeline_end'][position],
+                'status': columns['status'][position],
+                'is_delayed': bool(columns['is_delayed'][position]),
+                'pending_tasks': columns['pending_tasks'][position],
+                'delay_reasons': columns['delay_reasons'][position],
+                'data_quality': columns['data_quality'][position],
+                'missing_fields': columns['missing_fields'][position],
+                'warnings': columns['warnings'][position]
+            }
+            for position in range(len(df))
+        ]
+    
     def extract_project_data(self, row: pd.Series, columns: List[str]) -> Dict[str, Any]:
         """Extrae información estructurada de proyectos de una fila del Excel"""
         project_data = {
@@ -172,55 +354,42 @@ class ExcelProcessingService:
             'warnings': []
         }
         
-        # Campos reconocidos automáticamente
-        assignee_fields = ['asignado', 'assignee', 'responsable', 'encargado']
-        project_fields = ['proyecto', 'project', 'nombre_proyecto']
-        activity_fields = ['actividad', 'activity', 'tarea', 'task']
-        progress_fields = ['progreso', 'progress', 'avance', 'porcentaje', 'completado']
-        notes_fields = ['notas', 'notes', 'comentarios', 'observaciones']
-        date_fields = ['fecha_inicio', 'fecha_fin', 'start_date', 'end_date', 'timeline']
-        
-        # Procesar cada columna
-        for col in columns:
-            col_lower = col.lower().strip()
+        plan = self._plans.get(tuple(columns))
+        if plan is None:
+            plan = self._plans[tuple(columns)] = self.compile_column_plan(columns)
+        values = {}
+        for col in dict.fromkeys(col for role in plan.values() for col in role):
             value = str(row[col]).strip() if pd.notna(row[col]) else ''
-            
-            # Validar que el valor no esté vacío
-            is_valid_value = value and value not in ['', 'nan', 'NaN', 'None', 'null']
-            
-            if is_valid_value:
-                if any(field in col_lower for field in assignee_fields):
-                    project_data['assignee'] = value
-                elif any(field in col_lower for field in project_fields):
-                    project_data['project_name'] = value
-                elif any(field in col_lower for field in activity_fields):
-                    project_data['activity_name'] = value
-                elif any(field in col_lower for field in progress_fields):
-                    progress = self.extract_percentage(value)
-                    if progress is not None:
-                        project_data['progress_percentage'] = progress
-                        if progress < 50:
-                            project_data['status'] = 'delayed'
-                            project_data['is_delayed'] = True
-                        elif progress < 80:
-                            project_data['status'] = 'at_risk'
-                        else:
-                            project_data['status'] = 'on_track'
-                    else:
-                        project_data['warnings'].append(f'Valor de progreso no válido: {value}')
-                elif any(field in col_lower for field in notes_fields):
-                    project_data['notes'] = value
-                    project_data['delay_reasons'] = self.analyze_delays_in_notes(value)
-                    project_data['pending_tasks'] = self.extract_pending_tasks(value)
-                elif any(field in col_lower for field in date_fields):
-                    if 'inicio' in col_lower or 'start' in col_lower:
-                        project_data['timeline_start'] = value
-                    elif 'fin' in col_lower or 'end' in col_lower:
-                        project_data['timeline_end'] = value
+            values[col] = value if value and value not in INVALID_VALUES else ''
+        
+        # Campos de texto: la última columna del rol con valor
+        for role in ('assignee', 'project_name', 'activity_name', 'notes', 'timeline_start', 'timeline_end'):
+            for col in plan[role]:
+                if values[col]:
+                    project_data[role] = values[col]
+        
+        for col in plan['progress']:
+            if not values[col]:
+                continue
+            progress = self.extract_percentage(values[col])
+            if progress is not None:
+                project_data['progress_percentage'] = progress
+                if progress < 50:
+                    project_data['status'] = 'delayed'
+                    project_data['is_delayed'] = True
+                elif progress < 80:
+                    project_data['status'] = 'at_risk'
+                else:
+                    project_data['status'] = 'on_track'
             else:
-                # Registrar campos vacíos importantes
-                if any(field in col_lower for field in assignee_fields + project_fields + activity_fields):
-                    project_data['missing_fields'].append(col)
+                project_data['warnings'].append(f'Valor de progreso no válido: {values[col]}')
+        
+        if project_data['notes']:
+            project_data['delay_reasons'] = self.analyze_delays_in_notes(project_data['notes'])
+            project_data['pending_tasks'] = self.extract_pending_tasks(project_data['notes'])
+        
+        # Registrar campos vacíos importantes
+        project_data['missing_fields'] = [col for col in plan['required'] if not values[col]]
         
         # Evaluar calidad de datos
         critical_fields = ['project_name', 'assignee', 'activity_name']
@@ -295,73 +464,206 @@ class ExcelProcessingService:
             for task in project_data['pending_tasks']:
                 parts.append(f"- {task}")
         
-        context = "Información de seguimiento de proyecto. Análisis de avances, atrasos y gestión de tareas."
-        return ". ".join(parts) + ". " + context
+        return ". ".join(parts) + ". " + PROJECT_TEXT_CONTEXT
+    
+    def create_project_texts(self, columns: Dict[str, Any]) -> List[str]:
+        """
+        Textos descriptivos de todas las filas, columna a columna
+        
+        Cada parte de create_project_text es un array de segmentos ("parte. " o
+        vacío); el texto de una fila es la concatenación de sus segmentos.
+        """
+        def segment(mask, values) -> np.ndarray:
+            return np.where(mask, np.asarray(values, dtype=object) + ". ", "")
+        
+        def labeled(field: str, label: str, missing: str) -> np.ndarray:
+            values = columns[field]
+            present = values != None  # noqa: E711
+            return np.where(present, label + np.where(present, values, '').astype(object) + ". ", missing + ". ")
+        
+        def listing(items: List[List[str]], title: str) -> np.ndarray:
+            return np.array([f"{title}. " + "".join(f"- {item}. " for item in group) if group else ""
+                             for group in items], dtype=object)
+        
+        progress = columns['progress']
+        has_progress = ~np.isnan(progress)
+        shown = np.array([str(self._progress_value(value)) if present else ''
+                          for value, present in zip(progress, has_progress)], dtype=object)
+        missing = [', '.join(group) for group in columns['missing_fields']]
+        
+        text = (
+            labeled('project_name', "Proyecto: ", "Proyecto: [No especificado]")
+            + labeled('activity_name', "Actividad: ", "Actividad: [No especificada]")
+            + labeled('assignee', "Asignado a: ", "Asignado a: [No asignado]")
+            + np.where(has_progress, "Progreso: " + shown + "%. ", "Progreso: [Sin información]. ")
+            + "Estado: " + columns['status'] + ". "
+            + segment(has_progress & columns['is_delayed'], np.full(len(progress), "PROYECTO CON ATRASO IDENTIFICADO", dtype=object))
+            + "Calidad de datos: " + columns['data_quality'] + ". "
+            + listing(columns['warnings'], "Advertencias:")
+            + segment(np.array([bool(group) for group in missing], dtype=bool), np.array(["Campos faltantes: " + group for group in missing], dtype=object))
+            + segment(columns['notes'] != None, np.array(["Notas: " + (notes or '') for notes in columns['notes']], dtype=object))  # noqa: E711
+            + listing(columns['delay_reasons'], "Razones de atraso:")
+            + listing(columns['pending_tasks'], "Tareas pendientes:")
+            + PROJECT_TEXT_CONTEXT
+        )
+        return text.tolist()
+    
+    def make_row_id(self, file_source: str, sheet: str, row_key: str) -> str:
+        """ID estable de una fila a partir de (archivo, hoja, clave de fila)"""
+        digest = hashlib.sha1(f"{file_source}\0{sheet}\0{row_key}".encode('utf-8')).hexdigest()[:24]
+        return f"row_{digest}"
+    
+    def content_fingerprint(self, text: str, metadata: Dict[str, Any]) -> str:
+        """
+        Huella del contenido de una fila
+        
+        No incluye la posición (row_index) ni la calidad global del archivo
+        (validation_score), así que insertar filas o corregir otras no marca
+        como modificadas las que no cambiaron.
+        """
+        content = {key: value for key, value in metadata.items()
+                   if key not in ('row_index', 'validation_score', 'content_hash', 'row_id')}
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(f"{text}\0{payload}".encode('utf-8')).hexdigest()
+    
+    def build_row_vectors(self, df_clean: pd.DataFrame, plan: Dict[str, List[str]], file_source: str,
+                          sheet: str, validation_score: float,
+                          occurrences: Dict[str, int] = None) -> List[Dict[str, Any]]:
+        """
+        Convierte todas las filas en datos para vectores, columna a columna
+        
+        Misma salida que recorrer las filas con extract_project_data y
+        create_project_text (ver benchmarks/excel_ingestion_benchmark.py): los campos,
+        el texto y la metadata se calculan por columna y solo el ID y la huella se
+        hacen por fila.
+        """
+        cells = self._row_cells(df_clean)
+        project = self.extract_project_columns(df_clean, plan, cells)
+        texts = self.create_project_texts(project)
+        size = len(df_clean)
+        
+        def text_or_empty(values) -> List[str]:
+            return [str(value) if value else '' for value in values]
+        
+        # Metadata: columnas del libro y campos extraídos, en el orden de siempre
+        keys = list(df_clean.columns) + [
+            'assignee', 'project_name', 'activity_name', 'progress_percentage', 'notes', 'status',
+            'is_delayed', 'data_quality', 'row_index', 'file_source', 'analysis_type', 'validation_score'
+        ]
+        progress = project['progress']
+        values = [cells[col].tolist() for col in df_clean.columns] + [
+            text_or_empty(project['assignee']),
+            text_or_empty(project['project_name']),
+            text_or_empty(project['activity_name']),
+            np.where(np.isnan(progress), 0.0, progress).tolist(),
+            text_or_empty(project['notes']),
+            text_or_empty(project['status']),
+            project['is_delayed'].tolist(),
+            text_or_empty(project['data_quality']),
+            [int(index) for index in df_clean.index],
+            [file_source] * size,
+            ['project_management'] * size,
+            [validation_score] * size
+        ]
+        
+        vectors = []
+        occurrences = {} if occurrences is None else occurrences
+        for position, row_values in enumerate(zip(*values)):
+            metadata = dict(zip(keys, row_values))
+            
+            # ID estable: proyecto + actividad (+ número de repetición); la posición solo si no hay nombres
+            if metadata['project_name'] or metadata['activity_name']:
+                natural_key = f"{metadata['project_name']}|{metadata['activity_name']}"
+                occurrences[natural_key] = occurrences.get(natural_key, 0) + 1
+                row_key = f"{natural_key}|{occurrences[natural_key]}"
+            else:
+                row_key = f"#{metadata['row_index']}"
+            row_id = self.make_row_id(file_source, sheet, row_key)
+            metadata['row_id'] = row_id
+            metadata['content_hash'] = self.content_fingerprint(texts[position], metadata)
+            
+            vectors.append({
+                'id': row_id,
+                'text': texts[position],
+                'metadata': metadata
+            })
+        return vectors
+    
+    def _validation_vector(self, validation: Dict[str, Any], file_source: str, sheet: str) -> Dict[str, Any]:
+        """Vector con el resultado de la validación del libro (va antes que las filas)"""
+        validation_info = {
+            'id': f"validation_{self.make_row_id(file_source, sheet, 'validation')}",
+            'text': f"Validación del archivo Excel: Calidad de datos {validation['data_quality_score']:.1f}%. "
+                   f"Advertencias: {'. '.join(validation['warnings'])}. "
+                   f"Recomendaciones: {'. '.join(validation['recommendations'])}.",
+            'metadata': {
+                'file_source': file_source,
+                'analysis_type': 'file_validation',
+                'data_quality_score': float(validation['data_quality_score']),
+                'warnings_count': len(validation['warnings']),
+                'recommendations_count': len(validation['recommendations']),
+                'row_index': -1
+            }
+        }
+        validation_info['metadata']['row_id'] = validation_info['id']
+        validation_info['metadata']['content_hash'] = self.content_fingerprint(validation_info['text'], validation_info['metadata'])
+        return validation_info
+    
+    def excel_engines(self, file_path: str) -> List[str]:
+        """
+        Motores a probar en orden para leer el libro (EXCEL_ENGINE=auto|calamine|openpyxl|xlrd)
+        
+        En modo auto se usa calamine (lector nativo en Rust) si python-calamine está
+        instalado y, si no está o falla, openpyxl para .xlsx o xlrd para .xls.
+        Un motor fijado por EXCEL_ENGINE se usa sin alternativas.
+        """
+        engine = os.getenv("EXCEL_ENGINE", "auto").lower()
+        if engine != 'auto':
+            if engine not in EXCEL_ENGINES:
+                raise ValueError(f"Motor de Excel no soportado: {engine}. Disponibles: auto, {', '.join(EXCEL_ENGINES)}")
+            return [engine]
+        fallback = 'xlrd' if file_path.lower().endswith('.xls') else 'openpyxl'
+        return (['calamine'] if engine_installed('calamine') else []) + [fallback]
+    
+    def read_first_sheet(self, file_path: str, engine: str = None) -> Tuple[str, pd.DataFrame, str]:
+        """
+        Lee la primera hoja completa
+        
+        Args:
+            file_path: Ruta del libro
+            engine: Motor de pd.read_excel; por defecto el primero de excel_engines que funcione
+        
+        Returns:
+            Tupla (nombre de la hoja, DataFrame, motor usado)
+        """
+        engines = [engine] if engine else self.excel_engines(file_path)
+        for position, name in enumerate(engines):
+            try:
+                with pd.ExcelFile(file_path, engine=name) as workbook:
+                    sheet = workbook.sheet_names[0]
+                    return sheet, workbook.parse(sheet), name
+            except Exception as e:
+                if position == len(engines) - 1 or isinstance(e, FileNotFoundError):
+                    raise
+                print(f"Motor {name} no pudo leer {os.path.basename(file_path)}, se usa {engines[position + 1]}: {str(e)}")
     
     def process_excel_to_vectors(self, file_path: str) -> List[Dict[str, Any]]:
         """Procesa un archivo Excel y convierte cada fila en datos para vectores"""
         try:
-            df = pd.read_excel(file_path)
+            sheet, df, _ = self.read_first_sheet(file_path)
+            file_source = str(os.path.basename(file_path))
             
             # Validar estructura del Excel
             validation = self.validate_excel_structure(df)
             
             df_clean = self.normalize_excel_data(df)
-            columns = df_clean.columns.tolist()
             vectors_data = []
             
             # Añadir información de validación al primer vector
-            validation_info = {
-                'id': f"validation_info_{uuid.uuid4().hex[:8]}",
-                'text': f"Validación del archivo Excel: Calidad de datos {validation['data_quality_score']:.1f}%. "
-                       f"Advertencias: {'. '.join(validation['warnings'])}. "
-                       f"Recomendaciones: {'. '.join(validation['recommendations'])}.",
-                'metadata': {
-                    'file_source': str(os.path.basename(file_path)),
-                    'analysis_type': 'file_validation',
-                    'data_quality_score': float(validation['data_quality_score']),
-                    'warnings_count': len(validation['warnings']),
-                    'recommendations_count': len(validation['recommendations']),
-                    'row_index': -1
-                }
-            }
-            vectors_data.append(validation_info)
+            vectors_data.append(self._validation_vector(validation, file_source, sheet))
             
-            # Procesar cada fila
-            for index, row in df_clean.iterrows():
-                project_data = self.extract_project_data(row, columns)
-                descriptive_text = self.create_project_text(row, columns, project_data)
-                
-                # Crear metadata completo (solo campos compatibles con Pinecone)
-                metadata = {}
-                for col in columns:
-                    metadata[col] = str(row[col]).strip() if pd.notna(row[col]) else ''
-                
-                # Agregar campos de project_data (solo los compatibles)
-                metadata['assignee'] = str(project_data.get('assignee', '')) if project_data.get('assignee') else ''
-                metadata['project_name'] = str(project_data.get('project_name', '')) if project_data.get('project_name') else ''
-                metadata['activity_name'] = str(project_data.get('activity_name', '')) if project_data.get('activity_name') else ''
-                metadata['progress_percentage'] = float(project_data.get('progress_percentage', 0)) if project_data.get('progress_percentage') is not None else 0.0
-                metadata['notes'] = str(project_data.get('notes', '')) if project_data.get('notes') else ''
-                metadata['status'] = str(project_data.get('status', '')) if project_data.get('status') else ''
-                metadata['is_delayed'] = bool(project_data.get('is_delayed', False))
-                metadata['data_quality'] = str(project_data.get('data_quality', '')) if project_data.get('data_quality') else ''
-                
-                metadata['row_index'] = int(index)
-                metadata['file_source'] = str(os.path.basename(file_path))
-                metadata['analysis_type'] = 'project_management'
-                metadata['validation_score'] = float(validation['data_quality_score'])
-                
-                # Generar ID más robusto
-                project_name = project_data.get('project_name', 'unknown')
-                if not project_name or project_name == 'unknown':
-                    project_name = f"row_{index}"
-                
-                vectors_data.append({
-                    'id': f"project_{project_name}_{index}_{uuid.uuid4().hex[:8]}",
-                    'text': descriptive_text,
-                    'metadata': metadata
-                })
+            vectors_data.extend(self.build_row_vectors(df_clean, validation['column_plan'], file_source, sheet,
+                                                       float(validation['data_quality_score'])))
             
             return vectors_data
             
@@ -382,3 +684,241 @@ class ExcelProcessingService:
                 error_details['suggestions'].append('Cerrar el archivo Excel si está abierto y volver a intentar')
             
             raise Exception(f"Error procesando archivo Excel: {error_details}")
+    
+    def use_streaming(self, file_path: str) -> bool:
+        """
+        Decide si el libro se lee por bloques (EXCEL_READER_MODE=auto|memory|stream)
+        
+        En modo auto se leen por bloques los .xlsx desde EXCEL_STREAM_MIN_BYTES; los
+        .xls siempre se cargan completos (openpyxl solo lee .xlsx). La lectura por
+        bloques usa openpyxl read_only aunque calamine esté instalado: calamine
+        carga la hoja entera en memoria.
+        """
+        if not file_path.lower().endswith('.xlsx'):
+            return False
+        mode = os.getenv("EXCEL_READER_MODE", "auto").lower()
+        if mode in ('stream', 'memory'):
+            return mode == 'stream'
+        return os.path.getsize(file_path) >= int(os.getenv("EXCEL_STREAM_MIN_BYTES", str(2 * 1024 * 1024)))
+    
+    @staticmethod
+    def _sheet_value(value):
+        """Valor de celda como lo entrega pd.read_excel (los float enteros pasan a int)"""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and value in SHEET_NA_VALUES:
+            return None
+        return value
+    
+    @staticmethod
+    def _header_names(cells: List[Any], width: int) -> List[Any]:
+        """Encabezados como pd.read_excel: 'Unnamed: i' si están vacíos y '.1', '.2'... si se repiten"""
+        names, seen = [], {}
+        for position in range(width):
+            value = cells[position] if position < len(cells) else None
+            name = f"Unnamed: {position}" if value is None else value
+            base = name
+            while name in seen:
+                seen[base] += 1
+                name = f"{base}.{seen[base]}"
+            seen.setdefault(name, 0)
+            names.append(name)
+        return names
+    
+    def iter_excel_frames(self, file_path: str, chunk_rows: int):
+        """
+        Lee la primera hoja por bloques de chunk_rows filas, con memoria constante
+        
+        Genera (hoja, DataFrame) con el mismo encabezado, índice (posición de la
+        fila de datos) y tipos por columna que pd.read_excel. Las filas
+        completamente vacías se omiten, como haría normalize_excel_data. El ancho es
+        el del encabezado (o el de las filas del primer bloque si es mayor); las
+        celdas más allá se ignoran.
+        
+        El tipo de una columna depende de toda la hoja (un solo hueco convierte los
+        enteros en float y la celda pasa de "10" a "10.0"; un solo texto deja como
+        texto los números escritos como texto), así que una primera pasada calcula
+        los tipos y la segunda los aplica a cada bloque. Los bloques de la primera
+        pasada se guardan en un archivo temporal para no parsear el XML dos veces.
+        """
+        with tempfile.TemporaryFile() as spool:
+            dtypes = self._sheet_dtypes(self._spool(self._iter_sheet_records(file_path, chunk_rows), spool))
+            spool.seek(0)
+            while True:
+                try:
+                    title, records, index, columns = pickle.load(spool)
+                except EOFError:
+                    break
+                yield title, self._stream_frame(records, index, columns, dtypes)
+    
+    @staticmethod
+    def _spool(chunks, spool):
+        """Reenvía los bloques y los va escribiendo en spool"""
+        for chunk in chunks:
+            pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            yield chunk
+    
+    def _iter_sheet_records(self, file_path: str, chunk_rows: int):
+        """Filas con datos de la primera hoja por bloques: (hoja, filas, posiciones, columnas)"""
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            header = [self._sheet_value(value) for value in next(rows, None) or []]
+            while header and header[-1] is None:
+                header.pop()
+            
+            columns, records, index = None, [], []
+            for position, row in enumerate(rows):
+                values = [self._sheet_value(value) for value in row]
+                if all(value is None for value in values):
+                    continue
+                records.append(values)
+                index.append(position)
+                if len(records) < chunk_rows:
+                    continue
+                if columns is None:
+                    columns = self._stream_columns(header, records)
+                yield sheet.title, self._pad_records(records, len(columns)), index, columns
+                records, index = [], []
+            
+            if records or columns is None:
+                if columns is None:
+                    columns = self._stream_columns(header, records)
+                yield sheet.title, self._pad_records(records, len(columns)), index, columns
+        finally:
+            workbook.close()
+    
+    def _stream_columns(self, header: List[Any], records: List[List[Any]]) -> List[Any]:
+        width = len(header)
+        for values in records:
+            while values and values[-1] is None:
+                values = values[:-1]
+            width = max(width, len(values))
+        return self._header_names(header, width)
+    
+    @staticmethod
+    def _pad_records(records: List[List[Any]], width: int) -> List[List[Any]]:
+        return [values[:width] + [None] * (width - len(values)) for values in records]
+    
+    @staticmethod
+    def _common_dtype(current, dtype):
+        """Tipo de la columna al unir dos bloques (None: sin valores todavía)"""
+        if current is None or current == dtype:
+            return dtype
+        # pd.read_excel convierte los booleanos mezclados con números (True -> 1)
+        if all(pd.api.types.is_numeric_dtype(item) for item in (current, dtype)):
+            return np.result_type(current, dtype)
+        if all(pd.api.types.is_datetime64_any_dtype(item) for item in (current, dtype)):
+            return current
+        return np.dtype(object)
+    
+    def _sheet_dtypes(self, chunks) -> Dict[Any, Tuple[Any, Any]]:
+        """
+        Primera pasada: {columna: (tipo en pd.read_excel, tipo después de normalize_excel_data)}
+        
+        Reproduce la inferencia de pd.read_excel sobre la columna completa a partir
+        de la de cada bloque: números (también los escritos como texto) si todos los
+        bloques son numéricos, texto si todas las celdas son texto y object si se
+        mezclan. Las celdas vacías, y las filas vacías entre filas con datos (pandas
+        las lee antes de que normalize_excel_data las quite), pasan los enteros y
+        booleanos a float.
+        """
+        dtypes, strings, missing, gaps, expected = {}, {}, {}, False, 0
+        for _, records, index, columns in chunks:
+            if index:
+                gaps = gaps or index[-1] - expected + 1 != len(index)
+                expected = index[-1] + 1
+            frame = self._stream_frame(records, index, columns)
+            for position, col in enumerate(columns):
+                series = frame.iloc[:, position]
+                nulls = series.isna()
+                missing[col] = missing.get(col, False) or bool(nulls.any())
+                strings[col] = strings.get(col, True) and all(
+                    isinstance(values[position], str) for values in records if values[position] is not None
+                )
+                if not nulls.all():
+                    # Tipo de los valores del bloque, sin lo que aportan sus huecos
+                    values = series[~nulls]
+                    dtype = values.infer_objects().dtype if values.dtype == object else values.dtype
+                    dtypes[col] = self._common_dtype(dtypes.get(col), dtype)
+        
+        text_dtype = pd.Series([''], dtype=str).dtype
+        result = {}
+        for col, has_missing in missing.items():
+            dtype = dtypes.get(col)
+            if dtype is None:
+                dtype = np.dtype(np.float64)
+            elif not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)):
+                dtype = text_dtype if strings[col] else np.dtype(object)
+            if (has_missing or gaps) and (pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype)):
+                dtype = np.dtype(np.float64)
+            # fillna('') de normalize_excel_data cambia el tipo de las columnas con huecos
+            normalized = pd.Series([None], dtype=dtype).fillna('').dtype if has_missing else dtype
+            result[col] = (dtype, normalized)
+        return result
+    
+    @staticmethod
+    def _stream_frame(records: List[List[Any]], index: List[int], columns: List[Any],
+                      dtypes: Dict[Any, Tuple[Any, Any]] = None) -> pd.DataFrame:
+        """
+        Bloque leído con el mismo TextParser que pd.read_excel
+        
+        Con dtypes (ver _sheet_dtypes) cada columna toma el tipo de la hoja completa;
+        las de texto se leen sin convertir, así que "10" sigue siendo "10".
+        """
+        from pandas.io.parsers import TextParser
+        
+        if not records:
+            return pd.DataFrame(columns=columns, index=pd.Index(index, dtype=np.int64))
+        raw = {}
+        if dtypes:
+            raw = {col: object for col in columns if not (
+                pd.api.types.is_numeric_dtype(dtypes[col][0]) or pd.api.types.is_datetime64_any_dtype(dtypes[col][0])
+            )}
+        frame = TextParser(records, names=columns, header=None, skip_blank_lines=False, dtype=raw or None).read()
+        frame.index = pd.Index(index, dtype=np.int64)
+        if dtypes:
+            for position, col in enumerate(columns):
+                series = frame.iloc[:, position]
+                for dtype in dtypes[col]:
+                    if series.dtype != dtype:
+                        series = series.astype(dtype)
+                frame.isetitem(position, series)
+        return frame
+    
+    def iter_excel_vectors(self, file_path: str, chunk_rows: int = None):
+        """
+        Procesa un libro por bloques y genera listas de datos para vectores
+        
+        La primera lista empieza con el vector de validación. Cada bloque pasa por
+        normalización, extracción y textos antes de leer el siguiente, así que la
+        memoria depende de chunk_rows (EXCEL_STREAM_CHUNK_ROWS) y no del tamaño del
+        libro. Los libros que no se leen por bloques (ver use_streaming) salen en
+        una sola lista, igual que process_excel_to_vectors.
+        """
+        if not self.use_streaming(file_path):
+            yield self.process_excel_to_vectors(file_path)
+            return
+        
+        chunk_rows = chunk_rows or int(os.getenv("EXCEL_STREAM_CHUNK_ROWS", "5000"))
+        file_source = str(os.path.basename(file_path))
+        try:
+            validation = None
+            # Los IDs de filas repetidas se numeran a lo largo de todo el libro
+            occurrences = {}
+            for sheet, df in self.iter_excel_frames(file_path, chunk_rows):
+                vectors_data = []
+                if validation is None:
+                    # La validación solo mira los nombres de columna
+                    validation = self.validate_excel_structure(df)
+                    vectors_data.append(self._validation_vector(validation, file_source, sheet))
+                vectors_data.extend(self.build_row_vectors(
+                    self.normalize_excel_data(df), validation['column_plan'], file_source, sheet,
+                    float(validation['data_quality_score']), occurrences
+                ))
+                yield vectors_data
+        except Exception as e:
+            raise Exception(f"Error procesando archivo Excel por bloques ({file_path}): {str(e)}")
@@ -3,25 +3,65 @@ Servicio de carga de archivos
 Maneja la subida, validación y procesamiento de archivos Excel
 """
 
+import itertools
 import os
+import threading
 from flask import request
 from werkzeug.utils import secure_filename
-from typing import Dict, Any
+from typing import Dict, Any, List
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from Models.databaseVectorModel import databaseVectormodel
+from Models.IngestionRegistry import get_ingestion_registry
 from .excel_processing_service import ExcelProcessingService
 
 
 class FileUploadService:
     """Servicio especializado en carga de archivos"""
     
-    def __init__(self):
-        self.db_model = databaseVectormodel()
-        self.excel_service = ExcelProcessingService()
+    def __init__(self, db_model=None, excel_service=None, registry=None):
+        self.db_model = db_model or databaseVectormodel()
+        self.excel_service = excel_service or ExcelProcessingService()
+        self.registry = registry or get_ingestion_registry()
         self.upload_folder = 'uploads'
     
+    def collect_superseded(self, file_source: str) -> int:
+        """
+        Elimina del índice las versiones reemplazadas de un archivo, por lotes
+        
+        Returns:
+            Número de vectores eliminados
+        """
+        batch_size = int(os.getenv("GC_BATCH_SIZE", "1000"))
+        pending = self.registry.pending_gc(file_source)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                self.db_model.delete_ids(batch)
+            except Exception as e:
+                print(f"Error eliminando generaciones anteriores de {file_source}: {str(e)}")
+                return start
+            self.registry.release(file_source, batch)
+        if pending:
+            self.db_model.checkpoint()
+        return len(pending)
+    
+    def discard_generation(self, file_source: str, vector_ids: List[str]):
+        """
+        Elimina los vectores de una carga interrumpida (requiere registry.lock)
+        
+        Si el índice tampoco acepta el borrado, quedan anotados en el registro y la
+        siguiente carga del archivo los pasa a pending_gc.
+        """
+        if not vector_ids:
+            return
+        try:
+            self.db_model.delete_ids(vector_ids)
+        except Exception as e:
+            print(f"Error eliminando la carga interrumpida de {file_source}: {str(e)}")
+            self.registry.abandon(file_source, vector_ids)
+    
     def upload_excel_file(self, file_request) -> Dict[str, Any]:
         """Sube y procesa archivos Excel para análisis de proyectos"""
         try:
@@ -59,8 +99,10 @@ class FileUploadService:
             file_path = os.path.join(upload_path, filename)
             file.save(file_path)
             
+            chunks = self.excel_service.iter_excel_vectors(file_path)
             try:
-                vectors_data = self.excel_service.process_excel_to_vectors(file_path)
+                # Libros grandes: cada bloque de filas se planifica y vectoriza antes de leer el siguiente
+                vectors_data = next(chunks, [])
                 
                 if not vectors_data:
                     return {
@@ -73,23 +115,54 @@ class FileUploadService:
                         ]
                     }
                 
-                upsert_result = self.db_model.upsert_vectors(vectors_data)
+                # Solo se vectorizan las filas nuevas o modificadas desde la última carga del archivo.
+                # La nueva generación queda oculta hasta que el registro la confirma.
+                file_source = vectors_data[0]['metadata']['file_source']
+                validation_vector = next((v for v in vectors_data if v['metadata'].get('analysis_type') == 'file_validation'), None)
+                rows_processed, vectors_created = 0, 0
+                with self.registry.lock(file_source):
+                    planner = self.registry.planner(file_source)
+                    written = []
+                    try:
+                        for chunk in itertools.chain([vectors_data], chunks):
+                            upsert = planner.add(chunk)
+                            # Un upsert fallido pudo escribir parte del bloque
+                            written.extend(v['id'] for v in upsert)
+                            upsert_result = self.db_model.upsert_vectors(upsert)
+                            
+                            if not upsert_result["success"]:
+                                self.discard_generation(file_source, written)
+                                return {
+                                    "success": False, 
+                                    "message": f"Error en base de datos: {upsert_result['message']}",
+                                    "recommendations": [
+                                        "Verificar conexión a la base de datos vectorial",
+                                        "Revisar configuración de Pinecone",
+                                        "Contactar al administrador del sistema"
+                                    ]
+                                }
+                            rows_processed += sum(1 for v in chunk if v['metadata'].get('analysis_type') != 'file_validation')
+                            vectors_created += upsert_result["vectors_count"]
+                        
+                        plan = planner.finish()
+                        self.db_model.update_metadata(plan["superseded"], {'valid_to': plan["generation"]})
+                    except Exception:
+                        self.discard_generation(file_source, written)
+                        raise
+                    self.registry.commit(file_source, plan)
                 
-                if not upsert_result["success"]:
-                    return {
-                        "success": False, 
-                        "message": f"Error en base de datos: {upsert_result['message']}",
-                        "recommendations": [
-                            "Verificar conexión a la base de datos vectorial",
-                            "Revisar configuración de Pinecone",
-                            "Contactar al administrador del sistema"
-                        ]
-                    }
+                # El índice ANN se guarda una vez por carga, no en cada bloque escrito
+                self.db_model.checkpoint()
+                
+                # Las versiones reemplazadas se eliminan en segundo plano
+                threading.Thread(target=self.collect_superseded, args=(file_source,), daemon=True).start()
                 
                 os.remove(file_path)
                 
+                # Los workers adjuntos al índice compartido cambian a la nueva generación
+                self.db_model.publish_shared_index()
+                
                 # Obtener estadísticas de calidad de datos
-                validation_vector = next((v for v in vectors_data if v['metadata'].get('analysis_type') == 'file_validation'), None)
                 quality_score = validation_vector['metadata'].get('data_quality_score', 0) if validation_vector else 0
                 warnings_count = validation_vector['metadata'].get('warnings_count', 0) if validation_vector else 0
                 recommendations_count = validation_vector['metadata'].get('recommendations_count', 0) if validation_vector else 0
@@ -99,8 +172,12 @@ class FileUploadService:
                     "message": "Archivo procesado exitosamente",
                     "data": {
                         "filename": filename,
-                        "rows_processed": len(vectors_data) - 1,  # -1 para excluir el vector de validación
-                        "vectors_created": upsert_result["vectors_count"],
+                        "rows_processed": rows_processed,
+                        "vectors_created": vectors_created,
+                        "rows_added": plan["counts"]["added"],
+                        "rows_changed": plan["counts"]["changed"],
+                        "rows_unchanged": plan["counts"]["unchanged"],
+                        "rows_removed": plan["counts"]["removed"],
                         "data_quality_score": quality_score,
                         "warnings_count": warnings_count,
                         "recommendations_count": recommendations_count
@@ -108,9 +185,12 @@ class FileUploadService:
                 }
                 
             except Exception as e:
+                chunks.close()
                 if os.path.exists(file_path):
                     os.remove(file_path)
                 raise e
+            finally:
+                chunks.close()
                 
         except Exception as e:
             error_message = str(e)
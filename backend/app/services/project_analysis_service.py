@@ -10,19 +10,111 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
 
 from Controllers.LmmController import lmmController
 from Models.databaseVectorModel import databaseVectormodel
+from Models.IngestionRegistry import get_ingestion_registry
+
+
+# Consultas base de los análisis (se vectorizan una sola vez al iniciar)
+DELAY_QUERY_PARTS = ["proyectos con atraso", "tareas atrasadas", "problemas identificados"]
+PENDING_QUERY_PARTS = ["tareas pendientes", "por hacer", "completar", "revisar"]
+CANNED_QUERIES = [" ".join(DELAY_QUERY_PARTS), " ".join(PENDING_QUERY_PARTS)]
 
 
 class ProjectAnalysisService:
     """Servicio especializado en análisis de proyectos"""
     
-    def __init__(self):
-        self.llm_controller = lmmController()
-        self.db_model = databaseVectormodel()
+    def __init__(self, llm_controller=None, db_model=None, registry=None):
+        self.llm_controller = llm_controller or lmmController()
+        self.db_model = db_model or databaseVectormodel()
+        self.registry = registry or get_ingestion_registry()
+    
+    def _resolve_names(self, field: str, value: str) -> List[str]:
+        """Valor exacto si está indexado; si no, los valores indexados que lo contienen"""
+        if self.registry.lookup(field, value, 0, 0)["total"]:
+            return [value]
+        return self.registry.values(field, contains=value)
+    
+    def _indexed_activities(self, field: str, value: str, offset: int = 0, limit: int = None) -> Dict[str, Any]:
+        """Actividades de un proyecto o persona desde el índice de ingesta (sin embeddings)"""
+        names = self._resolve_names(field, value)
+        ids = [vector_id for name in names for vector_id in self.registry.lookup(field, name)["ids"]]
+        end = None if limit is None else offset + limit
+        return {
+            "matched": names,
+            "total": len(ids),
+            "activities": self.db_model.fetch_records(ids[offset:end])
+        }
+    
+    def get_project_activities(self, project_name: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Todas las actividades de un proyecto, paginadas"""
+        try:
+            if not project_name or not project_name.strip():
+                return {"success": False, "message": "Nombre del proyecto no puede estar vacío"}
+            
+            page = self._indexed_activities("project_name", project_name.strip(), offset, limit)
+            if not page["total"]:
+                return {"success": False, "message": f"No se encontraron actividades para '{project_name}'"}
+            
+            return {
+                "success": True,
+                "project_name": project_name,
+                "projects_matched": page["matched"],
+                "total": page["total"],
+                "offset": offset,
+                "limit": limit,
+                "activities": page["activities"]
+            }
+            
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def get_assignee_workload(self, assignee: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Carga de trabajo exacta de una persona: totales por proyecto y estado, y sus actividades paginadas"""
+        try:
+            if not assignee or not assignee.strip():
+                return {"success": False, "message": "Nombre del asignado no puede estar vacío"}
+            
+            workload = self._indexed_activities("assignee", assignee.strip())
+            if not workload["total"]:
+                return {"success": False, "message": f"No se encontraron actividades para '{assignee}'"}
+            
+            by_project, by_status, total_progress = {}, {}, 0.0
+            for activity in workload["activities"]:
+                metadata = activity["metadata"]
+                project = metadata.get("project_name") or "N/A"
+                status = metadata.get("status") or "unknown"
+                by_project[project] = by_project.get(project, 0) + 1
+                by_status[status] = by_status.get(status, 0) + 1
+                total_progress += float(metadata.get("progress_percentage") or 0)
+            
+            return {
+                "success": True,
+                "assignee": assignee,
+                "assignees_matched": workload["matched"],
+                "total": workload["total"],
+                "by_project": by_project,
+                "by_status": by_status,
+                "average_progress": round(total_progress / len(workload["activities"]), 2) if workload["activities"] else 0,
+                "offset": offset,
+                "limit": limit,
+                "activities": workload["activities"][offset:offset + limit]
+            }
+            
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def precompute_canned_queries(self) -> int:
+        """Precalcula los embeddings de las consultas fijas del dashboard (se llama en el warmup)"""
+        try:
+            return self.db_model.precompute_query_embeddings(CANNED_QUERIES)
+        except Exception as e:
+            print(f"No se pudieron precalcular las consultas fijas: {str(e)}")
+            return 0
     
-    def analyze_delays(self, project_name: str = '', assignee: str = '', top_k: int = 20) -> Dict[str, Any]:
-        """Analiza proyectos con atrasos y sus causas"""
+    def analyze_delays(self, project_name: str = '', assignee: str = '', top_k: int = 20,
+                       filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Analiza proyectos con atrasos y sus causas (el filtro de atraso se aplica dentro de la búsqueda)"""
         try:
-            query_parts = ["proyectos con atraso", "tareas atrasadas", "problemas identificados"]
+            query_parts = list(DELAY_QUERY_PARTS)
             
             if project_name:
                 query_parts.append(f"proyecto {project_name}")
@@ -30,16 +122,14 @@ class ProjectAnalysisService:
                 query_parts.append(f"asignado a {assignee}")
             
             query_text = " ".join(query_parts)
-            search_result = self.db_model.search_similar_vectors(query_text, top_k)
+            # status 'delayed' siempre va con is_delayed=True (ExcelProcessingService)
+            search_filters = {**(filters or {}), "is_delayed": True}
+            search_result = self.db_model.search_similar_vectors(query_text, top_k, search_filters)
             
             if not search_result["success"]:
                 return {"success": False, "message": f"Error: {search_result['message']}"}
             
-            delayed_projects = []
-            for result in search_result["results"]:
-                metadata = result.get("metadata", {})
-                if metadata.get("is_delayed") or metadata.get("status") == "delayed":
-                    delayed_projects.append(result)
+            delayed_projects = search_result["results"]
             
             context_text = "Análisis de atrasos en proyectos:\n\n"
             for project in delayed_projects:
@@ -79,10 +169,11 @@ Análisis detallado y accionable."""
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
     
-    def analyze_pending_tasks(self, project_name: str = '', assignee: str = '', top_k: int = 15) -> Dict[str, Any]:
+    def analyze_pending_tasks(self, project_name: str = '', assignee: str = '', top_k: int = 15,
+                              filters: Dict[str, Any] = None) -> Dict[str, Any]:
         """Identifica y analiza tareas pendientes"""
         try:
-            query_parts = ["tareas pendientes", "por hacer", "completar", "revisar"]
+            query_parts = list(PENDING_QUERY_PARTS)
             
             if project_name:
                 query_parts.append(f"proyecto {project_name}")
@@ -90,7 +181,7 @@ Análisis detallado y accionable."""
                 query_parts.append(f"asignado a {assignee}")
             
             query_text = " ".join(query_parts)
-            search_result = self.db_model.search_similar_vectors(query_text, top_k)
+            search_result = self.db_model.search_similar_vectors(query_text, top_k, filters)
             
             if not search_result["success"]:
                 return {"success": False, "message": f"Error: {search_result['message']}"}
@@ -148,22 +239,35 @@ Recomendaciones específicas y accionables."""
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
     
-    def generate_project_summary(self, project_name: str) -> Dict[str, Any]:
+    def generate_project_summary(self, project_name: str, filters: Dict[str, Any] = None) -> Dict[str, Any]:
         """Resumen completo de un proyecto específico"""
         try:
             if not project_name or not project_name.strip():
                 return {"success": False, "message": "Nombre del proyecto no puede estar vacío"}
             
-            search_result = self.db_model.search_similar_vectors(f"proyecto {project_name}", 50)
+            # Todas las actividades del proyecto desde el índice de ingesta (exacto, sin embeddings)
+            project_activities = []
+            if not filters:
+                project_activities = self._indexed_activities("project_name", project_name)["activities"]
             
-            if not search_result["success"]:
-                return {"success": False, "message": f"Error: {search_result['message']}"}
+            if not project_activities:
+                # Cargas sin registro o con filtros extra: nombre exacto filtrado dentro de la búsqueda
+                search_result = self.db_model.search_similar_vectors(
+                    f"proyecto {project_name}", 50, {**(filters or {}), "project": project_name}
+                )
+                if not search_result["success"]:
+                    return {"success": False, "message": f"Error: {search_result['message']}"}
+                project_activities = search_result["results"]
             
-            project_activities = []
-            for result in search_result["results"]:
-                metadata = result.get("metadata", {})
-                if project_name.lower() in str(metadata.get("project_name", "")).lower():
-                    project_activities.append(result)
+            if not project_activities:
+                # Nombre parcial: coincidencia por subcadena sobre los resultados más cercanos
+                search_result = self.db_model.search_similar_vectors(f"proyecto {project_name}", 50, filters)
+                if not search_result["success"]:
+                    return {"success": False, "message": f"Error: {search_result['message']}"}
+                project_activities = [
+                    result for result in search_result["results"]
+                    if project_name.lower() in str(result.get("metadata", {}).get("project_name", "")).lower()
+                ]
             
             if not project_activities:
                 return {"success": False, "message": f"No se encontraron actividades para '{project_name}'"}
@@ -6,26 +6,29 @@ Maneja las búsquedas vectoriales y consultas al LLM
 from typing import Dict, Any
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from Controllers.LmmController import lmmController
 from Models.databaseVectorModel import databaseVectormodel
+from Models.EmbeddingCache import get_embedding_cache, get_query_cache
+from Models.EmbeddingBatcher import get_query_batcher
 
 
 class SearchService:
     """Servicio especializado en búsquedas semánticas"""
     
-    def __init__(self):
-        self.llm_controller = lmmController()
-        self.db_model = databaseVectormodel()
+    def __init__(self, llm_controller=None, db_model=None):
+        self.llm_controller = llm_controller or lmmController()
+        self.db_model = db_model or databaseVectormodel()
     
-    def semantic_search(self, query_text: str, top_k: int = 10) -> Dict[str, Any]:
-        """Búsqueda semántica en los datos vectorizados"""
+    def semantic_search(self, query_text: str, top_k: int = 10, filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Búsqueda semántica en los datos vectorizados (filters: ver Models.MetadataFilter)"""
         try:
             if not query_text or not query_text.strip():
                 return {"success": False, "message": "Query no puede estar vacío"}
             
-            search_result = self.db_model.search_similar_vectors(query_text.strip(), top_k)
+            search_result = self.db_model.search_similar_vectors(query_text.strip(), top_k, filters)
             
             if not search_result["success"]:
                 return {"success": False, "message": f"Error: {search_result['message']}"}
@@ -55,3 +58,32 @@ class SearchService:
             return {"success": True, "message": "Registros eliminados correctamente"}
         except Exception as e:
             return {"success": False, "message": f"Error eliminando registros: {str(e)}"}
+    
+    def embedding_cache_stats(self) -> Dict[str, Any]:
+        """Contadores de la caché de embeddings (aciertos, fallos, desalojos)"""
+        try:
+            return {
+                "success": True,
+                "cache": get_embedding_cache().stats(),
+                "query_cache": get_query_cache().stats(),
+                "query_batcher": get_query_batcher().stats()
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error obteniendo estadísticas de caché: {str(e)}"}
+    
+    def warmup(self) -> Dict[str, float]:
+        """Carga el proveedor de embeddings, el índice vectorial y el LLM; retorna tiempos"""
+        timings = {}
+        
+        started = time.perf_counter()
+        self.db_model.generate_embeddings_batch(["warmup"])
+        timings["embedding_provider"] = round(time.perf_counter() - started, 3)
+        
+        started = time.perf_counter()
+        self.db_model.get_index()
+        timings["vector_index"] = round(time.perf_counter() - started, 3)
+        
+        started = time.perf_counter()
+        self.llm_controller.model.model
+        timings["llm"] = round(time.perf_counter() - started, 3)
+        return timings
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Reporte de recall vs latencia de los índices ANN frente a la búsqueda exacta
+Usa vectores sintéticos agrupados (similares a filas de actividades de varios proyectos)
+Ejecutar: python benchmarks/ann_recall_benchmark.py --rows 100000 --queries 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.AnnIndex import HNSWIndex, IVFIndex
+
+
+def synthetic_vectors(rows: int, dimension: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=rows)
+    vectors = centers[assignment] + 0.6 * rng.standard_normal((rows, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors, queries, k):
+    results, started = [], time.perf_counter()
+    for query in queries:
+        scores = vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        results.append(set(top[np.argsort(-scores[top])].tolist()))
+    return results, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def evaluate(index, vectors, queries, truth, k):
+    found, started = 0, time.perf_counter()
+    for query, expected in zip(queries, truth):
+        rows, _ = index.search(query, k, vectors)
+        found += len(expected & set(rows.tolist()))
+    latency_ms = (time.perf_counter() - started) / len(queries) * 1000
+    return found / (len(queries) * k), latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dimension, clusters=max(16, args.rows // 500))
+    queries = synthetic_vectors(args.queries, args.dimension, clusters=max(16, args.rows // 500), seed=1)
+    rows = np.arange(args.rows)
+
+    truth, exact_ms = exact_top_k(vectors, queries, args.k)
+    print(f"{args.rows} vectores x {args.dimension} dims, recall@{args.k}, {args.queries} consultas")
+    print(f"{'índice':<22}{'recall':>8}{'ms/consulta':>14}")
+    print(f"{'exacto':<22}{1.0:>8.3f}{exact_ms:>14.3f}")
+
+    ivf = IVFIndex(args.dimension, nlist=args.nlist)
+    started = time.perf_counter()
+    ivf.train(vectors)
+    ivf.add(rows, vectors)
+    print(f"  (IVF construido en {time.perf_counter() - started:.1f}s)")
+    for nprobe in (1, 2, 4, 8, 16, 32):
+        ivf.nprobe = nprobe
+        recall, latency = evaluate(ivf, vectors, queries, truth, args.k)
+        print(f"{f'ivf nprobe={nprobe}':<22}{recall:>8.3f}{latency:>14.3f}")
+
+    try:
+        hnsw = HNSWIndex(args.dimension, initial_capacity=args.rows)
+    except ImportError:
+        print("hnswlib no está instalado; se omite HNSW")
+        return
+    started = time.perf_counter()
+    hnsw.add(rows, vectors)
+    print(f"  (HNSW construido en {time.perf_counter() - started:.1f}s)")
+    for ef in (16, 32, 64, 128, 256):
+        hnsw.set_ef(ef)
+        recall, latency = evaluate(hnsw, vectors, queries, truth, args.k)
+        print(f"{f'hnsw ef={ef}':<22}{recall:>8.3f}{latency:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
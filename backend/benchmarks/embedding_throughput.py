@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput de embeddings locales: HuggingFace vs ONNX int8
+Ejecutar: python benchmarks/embedding_throughput.py --rows 5000
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.excel_processing_service import ExcelProcessingService
+from Models.EmbeddingFactory import factoryEmbedding
+
+EXCEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "excel_files")
+
+
+def load_texts(rows: int):
+    """Textos descriptivos reales de los Excel de ejemplo, repetidos hasta 'rows'"""
+    service = ExcelProcessingService()
+    texts = []
+    for path in sorted(glob.glob(os.path.join(EXCEL_DIR, "SMA_Lector*.xlsx"))):
+        texts.extend(item['text'] for item in service.process_excel_to_vectors(path))
+    if not texts:
+        raise SystemExit("No se encontraron archivos SMA_Lector*.xlsx")
+    return [f"{texts[i % len(texts)]} #{i}" for i in range(rows)]
+
+
+def run(provider_name: str, texts, batch_size: int, model_name=None, dimension=None):
+    provider = factoryEmbedding().getEmbedding(provider_name, model_name, dimension)
+    provider.embed(texts[:batch_size])  # calentamiento
+
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        provider.embed(texts[start:start + batch_size])
+    elapsed = time.perf_counter() - started
+
+    rows_per_minute = len(texts) / elapsed * 60
+    print(f"{provider_name:>6}: {len(texts)} filas en {elapsed:.2f}s -> {rows_per_minute:,.0f} filas/min")
+    return rows_per_minute
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--providers", nargs="+", default=["local", "onnx"])
+    parser.add_argument("--model", default=None, help="Modelo (por defecto all-MiniLM-L6-v2)")
+    parser.add_argument("--dimension", type=int, default=None)
+    args = parser.parse_args()
+
+    texts = load_texts(args.rows)
+    results = {name: run(name, texts, args.batch_size, args.model, args.dimension) for name in args.providers}
+
+    if "local" in results and "onnx" in results:
+        print(f"Aceleración ONNX int8: {results['onnx'] / results['local']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los motores de lectura de Excel (calamine, openpyxl y el lector por bloques)
+Lee la primera hoja de los libros SMA_Lector*.xlsx de data/excel_files con cada motor
+instalado y comprueba que todos devuelven el mismo DataFrame que openpyxl.
+Con --rows los libros se amplían repitiendo sus filas hasta ese número antes de medir
+Ejecutar: python benchmarks/excel_engine_benchmark.py --repeat 20 --rows 50000
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.excel_processing_service import ExcelProcessingService, engine_installed
+
+EXCEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "excel_files")
+
+
+def workbooks(rows: int, directory: str):
+    """Rutas de los libros de ejemplo; con rows > 0, copias ampliadas hasta ese número de filas"""
+    paths = sorted(glob.glob(os.path.join(EXCEL_DIR, "SMA_Lector*.xlsx")))
+    if not paths:
+        raise SystemExit("No se encontraron libros SMA_Lector*.xlsx en data/excel_files")
+    if rows <= 0:
+        return paths
+    scaled = []
+    for path in paths:
+        df = pd.read_excel(path, engine="openpyxl")
+        if df.empty:
+            continue
+        target = os.path.join(directory, os.path.basename(path))
+        df = pd.concat([df] * -(-rows // len(df)), ignore_index=True).iloc[:rows]
+        df.to_excel(target, index=False)
+        scaled.append(target)
+    return scaled
+
+
+def timed(function, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="Lecturas por libro y motor")
+    parser.add_argument("--rows", type=int, default=0, help="Ampliar cada libro hasta este número de filas")
+    args = parser.parse_args()
+
+    service = ExcelProcessingService()
+    engines = [engine for engine in ("calamine", "openpyxl") if engine_installed(engine)]
+    if "calamine" not in engines:
+        print("python-calamine no está instalado: solo se mide openpyxl (pip install python-calamine)")
+    print(f"Motor elegido en modo auto para .xlsx: {service.excel_engines('libro.xlsx')[0]}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in workbooks(args.rows, tmp):
+            reference, _ = timed(lambda: service.read_first_sheet(path, engine="openpyxl")[1], 1)
+            size = os.path.getsize(path) / 1024
+            print(f"{os.path.basename(path)} ({len(reference)} filas x {len(reference.columns)} columnas, {size:,.0f} KB)")
+
+            results = {}
+            for engine in engines:
+                df, seconds = timed(lambda: service.read_first_sheet(path, engine=engine)[1], args.repeat)
+                if not df.equals(reference):
+                    raise SystemExit(f"{path}: {engine} no devuelve el mismo DataFrame que openpyxl")
+                results[engine] = seconds
+
+            # Lector por bloques de openpyxl (read_only), el de las cargas grandes
+            def stream():
+                return sum(len(chunk) for _, chunk in service.iter_excel_frames(path, 5000))
+            _, results["openpyxl read_only (bloques)"] = timed(stream, args.repeat)
+
+            baseline = results["openpyxl"]
+            for engine, seconds in results.items():
+                print(f"  {engine:>30}: {seconds * 1000:10.2f} ms/lectura "
+                      f"| {len(reference) / seconds:12,.0f} filas/s | {baseline / seconds:5.1f}x vs openpyxl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark del procesamiento de filas del Excel: ruta fila a fila (iterrows) vs vectorizada
+Escala los libros de data/excel_files hasta --rows filas y mide filas/s de
+normalización + validación + extracción, texto y metadata (sin lectura del archivo)
+Ejecutar: python benchmarks/excel_ingestion_benchmark.py --rows 100000
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.excel_processing_service import ExcelProcessingService
+
+EXCEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "excel_files")
+
+
+def scaled_frames(rows: int):
+    """Cada libro de ejemplo repetido hasta 'rows' filas, con nombres de proyecto distintos por bloque"""
+    frames = {}
+    for path in sorted(glob.glob(os.path.join(EXCEL_DIR, "*.xlsx"))):
+        df = pd.read_excel(path)
+        if df.empty:
+            continue
+        repeats = -(-rows // len(df))
+        blocks = []
+        for block in range(repeats):
+            copy = df.copy()
+            # El primer campo de texto cambia por bloque para que las claves de fila no se repitan
+            text_columns = [col for col in copy.columns if pd.api.types.is_string_dtype(copy[col])]
+            if text_columns:
+                copy[text_columns[0]] = copy[text_columns[0]].astype(str) + f" {block}"
+            blocks.append(copy)
+        frames[os.path.basename(path)] = pd.concat(blocks, ignore_index=True).iloc[:rows]
+    if not frames:
+        raise SystemExit("No se encontraron libros en data/excel_files")
+    return frames
+
+
+def build_row_vectors_rowwise(service: ExcelProcessingService, df_clean: pd.DataFrame, file_source: str,
+                              sheet: str, validation_score: float,
+                              occurrences: Dict[str, int] = None) -> List[Dict[str, Any]]:
+    """
+    Ruta fila a fila (iterrows) de referencia: misma salida que service.build_row_vectors
+
+    La usan este benchmark y las pruebas de equivalencia de tests/test_excel_processing.py
+    """
+    columns = df_clean.columns.tolist()
+    vectors = []
+    occurrences = {} if occurrences is None else occurrences
+    for index, row in df_clean.iterrows():
+        project_data = service.extract_project_data(row, columns)
+        descriptive_text = service.create_project_text(row, columns, project_data)
+
+        # Crear metadata completo (solo campos compatibles con Pinecone)
+        metadata = {}
+        for col in columns:
+            metadata[col] = str(row[col]).strip() if pd.notna(row[col]) else ''
+
+        # Agregar campos de project_data (solo los compatibles)
+        metadata['assignee'] = str(project_data.get('assignee', '')) if project_data.get('assignee') else ''
+        metadata['project_name'] = str(project_data.get('project_name', '')) if project_data.get('project_name') else ''
+        metadata['activity_name'] = str(project_data.get('activity_name', '')) if project_data.get('activity_name') else ''
+        metadata['progress_percentage'] = float(project_data.get('progress_percentage', 0)) if project_data.get('progress_percentage') is not None else 0.0
+        metadata['notes'] = str(project_data.get('notes', '')) if project_data.get('notes') else ''
+        metadata['status'] = str(project_data.get('status', '')) if project_data.get('status') else ''
+        metadata['is_delayed'] = bool(project_data.get('is_delayed', False))
+        metadata['data_quality'] = str(project_data.get('data_quality', '')) if project_data.get('data_quality') else ''
+
+        metadata['row_index'] = int(index)
+        metadata['file_source'] = file_source
+        metadata['analysis_type'] = 'project_management'
+        metadata['validation_score'] = validation_score
+
+        # ID estable: proyecto + actividad (+ número de repetición); la posición solo si no hay nombres
+        if metadata['project_name'] or metadata['activity_name']:
+            natural_key = f"{metadata['project_name']}|{metadata['activity_name']}"
+            occurrences[natural_key] = occurrences.get(natural_key, 0) + 1
+            row_key = f"{natural_key}|{occurrences[natural_key]}"
+        else:
+            row_key = f"#{index}"
+        row_id = service.make_row_id(file_source, sheet, row_key)
+        metadata['row_id'] = row_id
+        metadata['content_hash'] = service.content_fingerprint(descriptive_text, metadata)
+
+        vectors.append({
+            'id': row_id,
+            'text': descriptive_text,
+            'metadata': metadata
+        })
+    return vectors
+
+
+def run(service: ExcelProcessingService, df: pd.DataFrame, name: str, vectorized: bool):
+    started = time.perf_counter()
+    validation = service.validate_excel_structure(df)
+    df_clean = service.normalize_excel_data(df)
+    score = float(validation['data_quality_score'])
+    if vectorized:
+        vectors = service.build_row_vectors(df_clean, validation['column_plan'], name, "Hoja1", score)
+    else:
+        vectors = build_row_vectors_rowwise(service, df_clean, name, "Hoja1", score)
+    return vectors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--skip-rowwise", action="store_true", help="Medir solo la ruta vectorizada")
+    args = parser.parse_args()
+
+    service = ExcelProcessingService()
+    for name, df in scaled_frames(args.rows).items():
+        vectors, vectorized_seconds = run(service, df, name, vectorized=True)
+        line = f"{name:>26} ({len(df)} filas x {len(df.columns)} columnas): " \
+               f"vectorizada {len(df) / vectorized_seconds:,.0f} filas/s"
+        if not args.skip_rowwise:
+            reference, rowwise_seconds = run(service, df, name, vectorized=False)
+            if reference != vectors:
+                raise SystemExit(f"{name}: la ruta vectorizada no produce la misma salida")
+            line += f" | fila a fila {len(df) / rowwise_seconds:,.0f} filas/s" \
+                    f" | aceleración {rowwise_seconds / vectorized_seconds:.1f}x (salida idéntica)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
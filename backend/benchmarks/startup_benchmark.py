@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque del backend: tiempo de importación por módulo
+Usa 'python -X importtime' en un proceso limpio para no contar módulos ya cargados
+Ejecutar: python benchmarks/startup_benchmark.py --module main --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PACKAGES = ("app", "Config", "Controllers", "Models", "main")
+
+
+def measure_imports(module: str):
+    """Importa el módulo en un subproceso y retorna (tiempo total, filas de importtime)"""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    wall_seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise SystemExit(f"No se pudo importar {module}:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return wall_seconds, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="main", help="Módulo a importar (por defecto main)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    wall_seconds, rows = measure_imports(args.module)
+
+    print(f"Importar '{args.module}': {wall_seconds * 1000:.0f} ms (proceso completo)")
+    print(f"\nTop {args.top} módulos por tiempo acumulado:")
+    for row in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"  {row['cumulative_ms']:9.1f} ms  {row['module']}")
+
+    print("\nMódulos del proyecto:")
+    for row in rows:
+        if row["module"].split(".")[0] in PROJECT_PACKAGES:
+            print(f"  {row['cumulative_ms']:9.1f} ms  (propio {row['self_ms']:.1f} ms)  {row['module']}")
+
+
+if __name__ == "__main__":
+    main()
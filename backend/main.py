@@ -2,9 +2,10 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import sys
 import os
+import threading
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.routes.Routes import api
+from app.routes.Routes import api, warmup_services
 
 app = Flask(__name__)
 
@@ -28,8 +29,21 @@ def internal_error(e):
 
 app.register_blueprint(api, url_prefix='/api')
 
+def start_background_warmup():
+    """Carga modelos y consultas fijas sin bloquear el arranque del servidor"""
+    def run():
+        try:
+            result = warmup_services()
+            print(f"Warmup completado: {result['timings_seconds']}")
+        except Exception as e:
+            print(f"Warmup falló (se cargará en el primer uso): {str(e)}")
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
 def main():
     print("SMA Backend iniciando en http://127.0.0.1:5000")
+    # Con debug=True el proceso que atiende peticiones es el hijo del reloader
+    if os.getenv("WARMUP_ON_START", "true").lower() == "true" and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_warmup()
     app.run(host="127.0.0.1", port=5000, debug=True)
 
 if __name__ == "__main__":
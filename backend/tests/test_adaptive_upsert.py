@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Pruebas del upsert adaptativo por tamaño de lote
+Ejecutar: python tests/test_adaptive_upsert.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.AdaptiveUpsert import AdaptiveUpserter, summarize_batches
+
+
+def records(count, note_length):
+    return [{'id': f'fila_{i}', 'values': [0.1] * 8, 'metadata': {'notes': 'x' * note_length}}
+            for i in range(count)]
+
+
+def test_batches_respect_byte_limit():
+    upserter = AdaptiveUpserter(lambda batch: None, max_request_bytes=5000, max_batch_items=1000)
+    batches = list(upserter.batches(records(20, 1000)))
+    assert sum(len(batch) for batch in batches) == 20
+    assert all(sum(upserter.estimate_bytes(r) for r in batch) <= 5000 for batch in batches)
+    assert len(batches) > 1
+
+
+def test_rejected_batches_are_split_and_retried():
+    sent, delays = [], []
+
+    def upsert(batch):
+        if len(batch) > 2:
+            raise Exception("Request size exceeds limit")
+        sent.append(len(batch))
+
+    upserter = AdaptiveUpserter(upsert, max_request_bytes=10 ** 9, max_retries=3, sleep=delays.append)
+    reports = upserter.upsert_all(records(8, 10))
+
+    assert sum(sent) == 8 and max(sent) <= 2
+    assert len(delays) == 3  # 8 -> 4+4 -> 2+2+2+2
+    assert all(report["attempt"] == 3 for report in reports)
+    assert summarize_batches(reports)["batches"] == 4
+
+
+def test_persistent_failure_raises():
+    def upsert(batch):
+        raise Exception("servicio no disponible")
+
+    upserter = AdaptiveUpserter(upsert, max_retries=2, sleep=lambda seconds: None)
+    try:
+        upserter.upsert_all(records(1, 10))
+    except Exception as e:
+        assert "3 intentos" in str(e)
+    else:
+        raise AssertionError("se esperaba el error")
+
+
+def test_buffer_packs_small_chunks_into_full_batches():
+    sent = []
+    upserter = AdaptiveUpserter(lambda batch: sent.append(len(batch)), max_request_bytes=10 ** 9, max_batch_items=250)
+    buffer = upserter.buffer()
+    rows = records(1000, 10)
+
+    reports = []
+    for start in range(0, 900, 100):
+        reports += buffer.add(rows[start:start + 100])
+    assert sent == [250, 250, 250]
+    reports += buffer.add(rows[900:]) + buffer.flush()
+
+    assert sent == [250, 250, 250, 250]
+    assert summarize_batches(reports)["batches"] == 4
+    assert buffer.flush() == []
+
+
+def test_buffer_cuts_batches_by_bytes():
+    sent = []
+    upserter = AdaptiveUpserter(lambda batch: sent.append(batch), max_request_bytes=5000, max_batch_items=1000)
+    buffer = upserter.buffer()
+    rows = records(20, 1000)
+    for start in range(0, 20, 3):
+        buffer.add(rows[start:start + 3])
+    buffer.flush()
+
+    assert [r['id'] for batch in sent for r in batch] == [r['id'] for r in rows]
+    assert all(sum(upserter.estimate_bytes(r) for r in batch) <= 5000 for batch in sent)
+    assert len(sent) == len(list(upserter.batches(rows)))
+
+
+def main():
+    tests = [
+        test_batches_respect_byte_limit,
+        test_rejected_batches_are_split_and_retried,
+        test_persistent_failure_raises,
+        test_buffer_packs_small_chunks_into_full_batches,
+        test_buffer_cuts_batches_by_bytes
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los índices ANN (IVF y HNSW): inserción incremental, borrado,
+reemplazo, persistencia y reutilización del índice guardado junto a los segmentos
+Ejecutar: python tests/test_ann_index.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+os.environ["EMBEDDING_PROVEEDOR"] = "fake"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["INGEST_STATE_DIR"] = tempfile.mkdtemp()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.AnnIndex import HNSWIndex, IVFIndex
+from Models.LocalVectorStore import LocalVectorStore
+
+DIMENSION = 16
+
+
+def unit_vectors(count: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_indexes():
+    ivf = IVFIndex(DIMENSION, nlist=4, nprobe=4)
+    return [ivf, HNSWIndex(DIMENSION, initial_capacity=8)]
+
+
+def check_incremental_updates(index):
+    vectors = np.zeros((200, DIMENSION), dtype=np.float32)
+    vectors[:100] = unit_vectors(100, seed=1)
+    if not index.is_trained:
+        index.train(vectors[:100])
+
+    # Inserción en dos tandas (HNSW crece por encima de su capacidad inicial)
+    index.add(np.arange(50), vectors[:50])
+    index.add(np.arange(50, 100), vectors[50:100])
+    rows, scores = index.search(vectors[70], 1, vectors)
+    assert rows[0] == 70 and abs(scores[0] - 1.0) < 1e-4
+
+    # Borrado: la fila no vuelve a aparecer
+    index.remove(np.array([70]))
+    rows, _ = index.search(vectors[70], 10, vectors)
+    assert 70 not in rows.tolist() and len(rows) == 10
+
+    # Reemplazo: la misma fila con otro vector (también una fila borrada que vuelve)
+    replacement = unit_vectors(2, seed=2)
+    vectors[[10, 70]] = replacement
+    index.add(np.array([10, 70]), replacement)
+    for row in (10, 70):
+        rows, _ = index.search(vectors[row], 1, vectors)
+        assert rows[0] == row
+    rows, _ = index.search(vectors[10], 100, vectors)
+    assert sorted(rows.tolist()) == list(range(100))
+    return vectors
+
+
+def test_indexes_support_incremental_insert_delete_and_replace():
+    for index in build_indexes():
+        check_incremental_updates(index)
+
+
+def test_indexes_round_trip_through_disk():
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, fresh in zip(build_indexes(), build_indexes()):
+            vectors = check_incremental_updates(index)
+            index.remove(np.array([5]))
+            path = os.path.join(tmp, f"{index.kind}.bin")
+            index.save(path)
+            fresh.load(path)
+            for query in unit_vectors(5, seed=3):
+                expected, _ = index.search(query, 5, vectors)
+                found, _ = fresh.search(query, 5, vectors)
+                assert found.tolist() == expected.tolist() and 5 not in found.tolist()
+
+
+def test_store_reuses_the_persisted_index_until_segments_change():
+    os.environ["IVF_NLIST"] = "2"
+    os.environ["IVF_NPROBE"] = "2"
+    original_train = IVFIndex.train
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            store = LocalVectorStore(directory=tmp, ann_index="ivf")
+            store.upsert_vectors([
+                {'id': f'fila_{i}', 'text': f'Proyecto {name} actividad {i}', 'metadata': {'project_name': name}}
+                for i, name in enumerate(['Alfa', 'Beta', 'Gamma', 'Delta'] * 20)
+            ])
+            store.delete_ids(['fila_0'])
+            # Las escrituras no guardan el índice: lo guarda el checkpoint de la carga
+            assert not any(name.startswith("ann_ivf_") for name in os.listdir(tmp))
+            store.checkpoint()
+            assert any(name.startswith("ann_ivf_") for name in os.listdir(tmp))
+
+            # Mismo manifiesto: el índice se carga sin volver a entrenar
+            def fail(*args, **kwargs):
+                raise AssertionError("El índice ANN se reentrenó al arrancar")
+            IVFIndex.train = fail
+            restarted = LocalVectorStore(directory=tmp, ann_index="ivf")
+            assert restarted.ann_index.is_trained
+            ids = [r['id'] for r in restarted.search_similar_vectors("proyecto beta actividad 1", top_k=11)["results"]]
+            assert ids[0] == 'fila_1' and 'fila_0' not in ids and len(ids) == 11
+
+            # Segmentos modificados por otro proceso sin guardar el índice: se reconstruye
+            IVFIndex.train = original_train
+            restarted.storage.delete([restarted.storage.id_to_row['fila_1']])
+            rebuilt = LocalVectorStore(directory=tmp, ann_index="ivf")
+            ids = [r['id'] for r in rebuilt.search_similar_vectors("proyecto beta actividad 1", top_k=11)["results"]]
+            assert 'fila_1' not in ids and len(ids) == 11
+        finally:
+            IVFIndex.train = original_train
+
+
+def test_ivf_retrains_when_rows_grow():
+    os.environ["IVF_NLIST"] = "2"
+    os.environ["IVF_NPROBE"] = "1"
+    os.environ["IVF_RETRAIN_GROWTH"] = "2"
+    try:
+        store = LocalVectorStore(ann_index="ivf")
+        rows = [{'id': f'fila_{i}', 'text': f'Proyecto {i % 7} actividad {i}', 'metadata': {}} for i in range(200)]
+        store.upsert_vectors(rows[:80])
+        assert store.ann_index.is_trained and store.ann_index.trained_size == 80
+        first = store.ann_index.centroids.copy()
+
+        # Al duplicarse las filas los centroides se recalculan y todas las filas se reasignan
+        store.upsert_vectors(rows[80:155])
+        assert store.ann_index.trained_size == 80
+        store.upsert_vectors(rows[155:])
+        assert store.ann_index.trained_size == 200 and not np.allclose(store.ann_index.centroids, first)
+        assert int((store.ann_index._row_list >= 0).sum()) == 200
+        ids = [r['id'] for r in store.search_similar_vectors("Proyecto 3 actividad 10", top_k=200)["results"]]
+        assert sorted(ids) == sorted(row['id'] for row in rows)
+    finally:
+        del os.environ["IVF_RETRAIN_GROWTH"]
+
+
+def test_index_is_saved_once_per_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(directory=tmp, ann_index="hnsw")
+        saves = []
+        save = store.ann_index.save
+        store.ann_index.save = lambda path: saves.append(path) or save(path)
+        for start in range(0, 50, 10):
+            store.upsert_vectors([{'id': f'fila_{i}', 'text': f'Actividad {i}', 'metadata': {}}
+                                  for i in range(start, start + 10)])
+        store.update_metadata(['fila_1'], {'valid_to': 2})
+        store.delete_ids(['fila_2'])
+        assert saves == []
+
+        store.checkpoint()
+        store.checkpoint()
+        assert len(saves) == 1
+        restarted = LocalVectorStore(directory=tmp, ann_index="hnsw")
+        ids = [r['id'] for r in restarted.search_similar_vectors("Actividad 7", top_k=49)["results"]]
+        assert ids[0] == 'fila_7' and len(ids) == 49 and 'fila_2' not in ids
+
+
+def main():
+    tests = [
+        test_indexes_support_incremental_insert_delete_and_replace,
+        test_indexes_round_trip_through_disk,
+        test_store_reuses_the_persisted_index_until_segments_change,
+        test_ivf_retrains_when_rows_grow,
+        test_index_is_saved_once_per_checkpoint
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Pruebas de /api/dashboard (caché en el servidor y ETag) y de las métricas filtradas
+Ejecutar: python tests/test_dashboard_endpoint.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+os.environ["EMBEDDING_PROVEEDOR"] = "fake"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Controllers.dataBaseVectorController import dataBaseVectorController
+from Models.DashboardAggregates import classify_status, to_metrics
+from Models.IngestionRegistry import IngestionRegistry
+from Models.LocalVectorStore import LocalVectorStore
+from Models.MetricsEngine import ColumnarMetrics
+from app.container import container
+from app.routes.Routes import api
+from app.services.dashboard_service import DashboardService
+from app.services.excel_processing_service import ExcelProcessingService
+from app.services.file_upload_service import FileUploadService
+from test_incremental_ingestion import SAMPLE, FakeRequest
+
+
+class CountingController(dataBaseVectorController):
+    def __init__(self, model):
+        super().__init__(model)
+        self.calls = 0
+
+    def obtener_metricas_dashboard(self):
+        self.calls += 1
+        return super().obtener_metricas_dashboard()
+
+
+def test_dashboard_is_cached_and_revalidated_with_etag():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        store = LocalVectorStore(registry=registry)
+        upload = FileUploadService(store, ExcelProcessingService(), registry)
+        controller = CountingController(store)
+        container._instances["dashboard_service"] = DashboardService(controller, registry)
+        app = Flask(__name__)
+        app.register_blueprint(api, url_prefix="/api")
+        client = app.test_client()
+        try:
+            workbook = os.path.join(tmp, "proyectos.xlsx")
+            df = pd.read_excel(SAMPLE)
+            df.to_excel(workbook, index=False)
+            upload.upload_excel_file(FakeRequest(workbook))
+
+            first = client.get("/api/dashboard")
+            assert first.status_code == 200 and first.headers["ETag"]
+            body = first.get_json()
+            assert body["success"] and body["data"]["summary"]["total_vectors"] == len(df) + 1
+            assert "total_projects" in body["data"]["metrics"]
+
+            # Sin cambios: 304 sin cuerpo y sin volver a calcular
+            etag = first.headers["ETag"]
+            again = client.get("/api/dashboard", headers={"If-None-Match": etag})
+            assert again.status_code == 304 and again.data == b""
+            assert client.get("/api/dashboard").get_json() == body
+            assert controller.calls == 1
+
+            # Una carga cambia la versión del registro e invalida la caché
+            df = df.drop(index=0)
+            df.to_excel(workbook, index=False)
+            upload.upload_excel_file(FakeRequest(workbook))
+            changed = client.get("/api/dashboard", headers={"If-None-Match": etag})
+            assert changed.status_code == 200 and changed.headers["ETag"] != etag
+            assert changed.get_json()["data"]["summary"]["total_vectors"] == len(df) + 1
+            assert controller.calls == 2
+        finally:
+            container._instances.pop("dashboard_service", None)
+
+
+def test_dashboard_cache_expires_and_invalidates():
+    now = [0.0]
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        controller = CountingController(LocalVectorStore(registry=registry))
+        service = DashboardService(controller, registry, ttl_seconds=10, clock=lambda: now[0])
+
+        first = service.get_dashboard()
+        service.get_dashboard()
+        assert controller.calls == 1
+
+        service.invalidate()
+        assert service.get_dashboard()["etag"] == first["etag"]
+        assert controller.calls == 2
+
+        now[0] = 11
+        service.get_dashboard()
+        assert controller.calls == 3
+
+
+def test_filtered_metrics_match_a_scan_of_the_slice():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        store = LocalVectorStore(registry=registry)
+        FileUploadService(store, ExcelProcessingService(), registry).upload_excel_file(FakeRequest(SAMPLE))
+        container._instances["dashboard_service"] = DashboardService(dataBaseVectorController(store), registry)
+        app = Flask(__name__)
+        app.register_blueprint(api, url_prefix="/api")
+        client = app.test_client()
+        try:
+            engine = registry.metrics_engine()
+            assert engine.compute() == to_metrics(registry.dashboard_aggregates())
+
+            rows = [store.storage.metadata(row) for row in np.flatnonzero(store._visible_mask())]
+            df = pd.read_excel(SAMPLE)
+            project = df['proyecto'].iloc[0]
+            expected = store._calculate_project_metrics([m for m in rows if m.get('project_name') == project])
+            assert engine.compute({"project": project}) == expected
+
+            # Ventana de fechas: filas cuyo intervalo inicio-fin la toca
+            window = {"date_from": "2025-09-10", "date_to": "2025-09-15"}
+            touching = ((df['fecha_fin'] >= window["date_from"]) & (df['fecha_inicio'] <= window["date_to"])).sum()
+            assert engine.compute(window)["total_projects"] == touching
+
+            response = client.get("/api/dashboard/metrics", query_string={"project": project})
+            body = response.get_json()
+            assert response.status_code == 200 and body["data"]["metrics"] == expected
+            assert body["data"]["summary"]["total_vectors"] == int((df['proyecto'] == project).sum())
+
+            both = client.get("/api/dashboard/metrics?assignee=%s&assignee=%s" % tuple(df['asignado'].iloc[:2]))
+            assert both.get_json()["data"]["filters"]["assignee"] == list(df['asignado'].iloc[:2])
+            assert client.get("/api/dashboard/metrics?color=rojo").status_code == 400
+            assert client.get("/api/dashboard/metrics?date_from=ayer").status_code == 400
+        finally:
+            container._instances.pop("dashboard_service", None)
+
+
+def test_metrics_engine_scales_to_large_slices():
+    rng = np.random.default_rng(0)
+    size = 100_000
+    progress = np.where(rng.random(size) < 0.1, np.nan, rng.random(size) * 100)
+    values = [None if np.isnan(value) else float(value) for value in progress]
+    entries = [{"progress": value, "status": classify_status(value),
+                "project_name": f"Proyecto {index % 200}", "assignee": f"Persona {index % 50}",
+                "file_source": f"libro_{index % 5}.xlsx"} for index, value in enumerate(values)]
+    engine = ColumnarMetrics.from_entries(entries)
+
+    metrics = engine.compute({"project": "Proyecto 7", "status": ["delayed", "at_risk"]})
+    selected = [e for e in entries if e["project_name"] == "Proyecto 7" and e["status"] in ("delayed", "at_risk")]
+    assert metrics["total_projects"] == len(selected)
+    assert metrics["average_progress"] == round(np.mean([e["progress"] for e in selected]), 2)
+    assert sum(engine.compute()["progress_histogram"]) == int((~np.isnan(progress)).sum())
+
+    started = time.perf_counter()
+    for _ in range(20):
+        engine.compute({"project": "Proyecto 7"})
+    elapsed = (time.perf_counter() - started) / 20
+    print(f"Corte por proyecto sobre {size} filas: {elapsed * 1000:.3f} ms")
+    assert elapsed < 0.05
+
+
+def main():
+    tests = [
+        test_dashboard_is_cached_and_revalidated_with_etag,
+        test_dashboard_cache_expires_and_invalidates,
+        test_filtered_metrics_match_a_scan_of_the_slice,
+        test_metrics_engine_scales_to_large_slices
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
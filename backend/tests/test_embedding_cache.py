@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché de embeddings (memoria + SQLite)
+Ejecutar: python tests/test_embedding_cache.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.EmbeddingCache import EmbeddingCache, QueryEmbeddingCache
+
+
+def test_lru_eviction_and_counters():
+    cache = EmbeddingCache(max_entries=2)
+    keys = [cache.make_key("modelo", "retrieval_document", f"texto {i}") for i in range(3)]
+    cache.put_many({key: np.ones(4, dtype=np.float32) * i for i, key in enumerate(keys)})
+
+    found = cache.get_many(keys)
+    stats = cache.stats()
+
+    assert keys[0] not in found
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "embeddings.sqlite")
+        key = EmbeddingCache.make_key("modelo", "retrieval_query", "proyectos con atraso")
+        vector = np.arange(8, dtype=np.float32)
+
+        EmbeddingCache(db_path=db_path).put_many({key: vector})
+        restarted = EmbeddingCache(db_path=db_path)
+        found = restarted.get_many([key])
+
+        assert np.array_equal(found[key], vector)
+        assert restarted.stats()["disk_hits"] == 1
+
+
+def test_key_depends_on_model_and_task():
+    base = EmbeddingCache.make_key("modelo", "retrieval_document", "texto")
+    assert base != EmbeddingCache.make_key("otro", "retrieval_document", "texto")
+    assert base != EmbeddingCache.make_key("modelo", "retrieval_query", "texto")
+
+
+def test_query_cache_ttl_and_pinned():
+    cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=-1)
+    cache.put("consulta libre", [0.1, 0.2])
+    cache.put("tareas pendientes por hacer completar revisar", [0.3, 0.4], pinned=True)
+
+    assert cache.get("consulta libre") is None
+    assert cache.stats()["expired"] == 1
+    assert cache.get("tareas pendientes por hacer completar revisar") == [0.3, 0.4]
+    assert cache.stats()["pinned"] == 1
+
+
+def main():
+    tests = [
+        test_lru_eviction_and_counters,
+        test_disk_tier_survives_restart,
+        test_key_depends_on_model_and_task,
+        test_query_cache_ttl_and_pinned
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
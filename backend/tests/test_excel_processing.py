@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la extracción de filas del Excel (plan de columnas y ruta vectorizada)
+Ejecutar: python tests/test_excel_processing.py
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.excel_processing_service import ExcelProcessingService, engine_installed
+from benchmarks.excel_ingestion_benchmark import build_row_vectors_rowwise
+
+EXCEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                         "data", "excel_files")
+
+
+def tricky_frame() -> pd.DataFrame:
+    """Encabezados ambiguos, varias columnas por rol y valores vacíos o no numéricos"""
+    return pd.DataFrame({
+        "Proyecto": ["A", "B", None, "nan"],
+        "Responsable": ["x", None, "y", "z"],
+        "Tarea": ["t1", "t2", "t3", None],
+        "Avance": ["45%", "abc", None, "80"],
+        "porcentaje_real": [0.3, None, 120, np.nan],
+        "Notas": ["Atrasado por problema con proveedor", "", None, "ok"],
+        "Observaciones": [None, "Bloqueado esperando accesos del cliente", None, None],
+        "fecha_inicio": ["2025-01-01", None, "2025-02-01", "2025-03-01"],
+        "end_date": ["2025-01-10", "2025-02-10", None, "x"],
+        "otro": [1, 2, 3, None],
+    })
+
+
+def test_column_plan_is_resolved_once_per_workbook():
+    service = ExcelProcessingService()
+    plan = service.compile_column_plan(tricky_frame().columns.tolist())
+    assert plan['project_name'] == ["Proyecto"] and plan['assignee'] == ["Responsable"]
+    assert plan['progress'] == ["Avance", "porcentaje_real"]
+    assert plan['notes'] == ["Notas", "Observaciones"]
+    assert (plan['timeline_start'], plan['timeline_end']) == (["fecha_inicio"], ["end_date"])
+    assert plan['required'] == ["Proyecto", "Responsable", "Tarea"]
+    assert service.validate_excel_structure(tricky_frame())['column_plan'] == plan
+
+
+def test_records_follow_the_per_row_rules():
+    service = ExcelProcessingService()
+    df = service.normalize_excel_data(tricky_frame())
+    records = service.extract_project_records(df, service.compile_column_plan(df.columns.tolist()))
+
+    # La última columna de progreso con número gana; la no numérica deja advertencia
+    assert records[0]['progress_percentage'] == 0.3 and records[0]['status'] == 'delayed'
+    assert records[1]['progress_percentage'] is None
+    assert records[1]['warnings'][0] == 'Valor de progreso no válido: abc'
+    assert records[2]['progress_percentage'] == 100 and records[2]['status'] == 'on_track'
+    assert records[3]['progress_percentage'] == 80.0
+
+    # Notas: la última columna con valor, con sus razones de atraso
+    assert records[1]['notes'] == "Bloqueado esperando accesos del cliente"
+    assert records[1]['delay_reasons'] == ["Bloqueado esperando accesos del cliente"]
+
+    assert records[1]['missing_fields'] == ["Responsable"] and records[1]['data_quality'] == 'partial'
+    assert records[3]['missing_fields'] == ["Proyecto", "Tarea"] and records[3]['data_quality'] == 'poor'
+    assert (records[0]['timeline_start'], records[0]['timeline_end']) == ("2025-01-01", "2025-01-10")
+
+    for (_, row), record in zip(df.iterrows(), records):
+        assert service.extract_project_data(row, df.columns.tolist()) == record
+
+
+def test_vectorized_rows_match_the_rowwise_path():
+    service = ExcelProcessingService()
+    samples = glob.glob(os.path.join(EXCEL_DIR, "*.xlsx"))
+    assert samples
+    frames = [service.read_first_sheet(path)[1] for path in samples]
+
+    # Hojas con celdas vacías o no numéricas y hojas solo numéricas (iterrows convierte a float)
+    frames.append(tricky_frame())
+    frames.append(pd.DataFrame({"proyecto": [101, 102, None], "progreso": [45, 100, 0], "dias": [3, 4, 5]}))
+    # Varias columnas de progreso: una sola por debajo de 50 marca el atraso aunque la última sea mayor
+    delayed = pd.DataFrame({"proyecto": ["A", "B", "C"], "actividad": ["t1", "t2", "t3"],
+                            "avance": ["30%", "90", "60"], "progreso_final": [90, 30, 70]})
+    frames.append(delayed)
+    for df in frames:
+        df_clean = service.normalize_excel_data(df)
+        validation = service.validate_excel_structure(df)
+        score = validation['data_quality_score']
+        vectors = service.build_row_vectors(df_clean, validation['column_plan'], "libro.xlsx", "Hoja1", score)
+        assert vectors == build_row_vectors_rowwise(service, df_clean, "libro.xlsx", "Hoja1", score)
+
+    assert [v['metadata']['is_delayed'] for v in vectors] == [True, True, False]
+    assert [v['metadata']['status'] for v in vectors] == ['on_track', 'delayed', 'at_risk']
+    assert "PROYECTO CON ATRASO IDENTIFICADO" in vectors[0]['text']
+
+
+def typed_frame() -> pd.DataFrame:
+    """Columnas cuyo tipo depende de filas lejanas: enteros con un hueco, booleanos, fechas y tipos mezclados"""
+    size = 12
+    df = pd.DataFrame({
+        "proyecto": [f"Proyecto {i % 3}" for i in range(size)],
+        "actividad": [f"Tarea {i}" for i in range(size)],
+        "progreso": [10 * i for i in range(size)],
+        "horas": [float(i) for i in range(size)],
+        "dias": list(range(size)),
+        "aprobado": [i % 2 == 0 for i in range(size)],
+        "fecha_inicio": pd.date_range("2025-01-01", periods=size, freq="D"),
+        "codigo": [i if i % 4 else f"C-{i}" for i in range(size)],
+        "lote": [i for i in range(size)],
+    })
+    df = df.astype({"progreso": object, "dias": object, "aprobado": object, "fecha_inicio": object})
+    # Un solo hueco al final: en memoria la columna entera pasa a float / object
+    df.loc[size - 1, ["progreso", "aprobado", "fecha_inicio"]] = None
+    df.loc[size - 2, "dias"] = None
+    df.loc[1, "horas"] = 2.5
+    return df
+
+
+def test_streamed_workbook_matches_the_in_memory_read():
+    service = ExcelProcessingService()
+    previous = os.environ.get("EXCEL_READER_MODE")
+    os.environ["EXCEL_READER_MODE"] = "stream"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Encabezado vacío en SMA_Lector.xlsx, textos 'nan' y celdas vacías en el libro de prueba
+            tricky = os.path.join(tmp, "tricky.xlsx")
+            tricky_frame().to_excel(tricky, index=False)
+            typed = os.path.join(tmp, "typed.xlsx")
+            typed_frame().to_excel(typed, index=False)
+            # Fila vacía entre datos: en memoria aporta un hueco a todas las columnas
+            gap = os.path.join(tmp, "gap.xlsx")
+            typed_frame().drop(columns=["progreso", "dias", "aprobado", "fecha_inicio"]).to_excel(gap, index=False)
+            from openpyxl import load_workbook
+            workbook = load_workbook(gap)
+            workbook.worksheets[0].insert_rows(5)
+            workbook.save(gap)
+            for path in glob.glob(os.path.join(EXCEL_DIR, "*.xlsx")) + [tricky, typed, gap]:
+                expected = service.process_excel_to_vectors(path)
+                chunks = list(service.iter_excel_vectors(path, chunk_rows=1000))
+                assert len(chunks) == 1 and chunks[0] == expected
+
+                # Bloques pequeños: mismo texto, metadata y huella en cada fila (IDs numerados en todo el libro)
+                chunks = list(service.iter_excel_vectors(path, chunk_rows=3))
+                streamed = [vector for chunk in chunks for vector in chunk]
+                assert len(chunks) == max(1, -(-(len(expected) - 1) // 3))
+                assert len(streamed) == len(expected)
+                for vector, reference in zip(streamed, expected):
+                    assert vector == reference, (os.path.basename(path), vector, reference)
+
+        os.environ["EXCEL_READER_MODE"] = "memory"
+        sample = glob.glob(os.path.join(EXCEL_DIR, "*.xlsx"))[0]
+        assert len(list(service.iter_excel_vectors(sample, chunk_rows=3))) == 1
+    finally:
+        if previous is None:
+            os.environ.pop("EXCEL_READER_MODE", None)
+        else:
+            os.environ["EXCEL_READER_MODE"] = previous
+
+
+def test_reader_engine_is_chosen_automatically_with_fallback():
+    service = ExcelProcessingService()
+    previous = os.environ.pop("EXCEL_ENGINE", None)
+    try:
+        native = ["calamine"] if engine_installed("calamine") else []
+        assert service.excel_engines("libro.xlsx") == native + ["openpyxl"]
+        assert service.excel_engines("LIBRO.XLS")[-1] == "xlrd"
+
+        sample = glob.glob(os.path.join(EXCEL_DIR, "*.xlsx"))[0]
+        _, reference, engine = service.read_first_sheet(sample)
+        assert engine == service.excel_engines(sample)[0]
+        for name in native + ["openpyxl"]:
+            assert service.read_first_sheet(sample, engine=name)[1].equals(reference)
+
+        # Si un motor falla se prueba el siguiente
+        class FailingFirst(ExcelProcessingService):
+            def excel_engines(self, file_path):
+                return ["no_existe", "openpyxl"]
+        _, df, used = FailingFirst().read_first_sheet(sample)
+        assert used == "openpyxl" and df.equals(reference)
+
+        os.environ["EXCEL_ENGINE"] = "openpyxl"
+        assert service.excel_engines(sample) == ["openpyxl"]
+        os.environ["EXCEL_ENGINE"] = "otro"
+        try:
+            service.excel_engines(sample)
+            assert False, "Motor no soportado aceptado"
+        except ValueError as e:
+            assert "Motor de Excel no soportado" in str(e)
+    finally:
+        if previous is None:
+            os.environ.pop("EXCEL_ENGINE", None)
+        else:
+            os.environ["EXCEL_ENGINE"] = previous
+
+
+def main():
+    tests = [
+        test_column_plan_is_resolved_once_per_workbook,
+        test_records_follow_the_per_row_rules,
+        test_vectorized_rows_match_the_rowwise_path,
+        test_streamed_workbook_matches_the_in_memory_read,
+        test_reader_engine_is_chosen_automatically_with_fallback
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
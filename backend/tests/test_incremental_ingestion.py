@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la re-ingesta incremental (IDs estables y huellas por fila)
+Ejecutar: python tests/test_incremental_ingestion.py
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+os.environ["EMBEDDING_PROVEEDOR"] = "fake"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.IngestionRegistry import IngestionRegistry
+from Models.LocalVectorStore import LocalVectorStore
+from Models.databaseVectorModel import databaseVectormodel
+from app.services.excel_processing_service import ExcelProcessingService
+from app.services.file_upload_service import FileUploadService
+from app.services.project_analysis_service import ProjectAnalysisService
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                      "data", "excel_files", "SMA_Lector_Pruebas.xlsx")
+
+
+class FakeFile:
+    def __init__(self, path):
+        self.path = path
+        self.filename = os.path.basename(path)
+
+    def save(self, destination):
+        shutil.copy(self.path, destination)
+
+
+class FakeRequest:
+    def __init__(self, path):
+        self.files = {'file': FakeFile(path)}
+
+
+def test_ids_are_stable_across_reads():
+    service = ExcelProcessingService()
+    first = [v['id'] for v in service.process_excel_to_vectors(SAMPLE)]
+    second = [v['id'] for v in service.process_excel_to_vectors(SAMPLE)]
+    assert first == second
+    assert len(set(first)) == len(first)
+
+
+def test_reupload_only_touches_changed_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        store = LocalVectorStore(registry=registry)
+        upload = FileUploadService(store, ExcelProcessingService(), registry)
+        workbook = os.path.join(tmp, "proyectos.xlsx")
+        df = pd.read_excel(SAMPLE)
+        df.to_excel(workbook, index=False)
+
+        first = upload.upload_excel_file(FakeRequest(workbook))["data"]
+        assert first["rows_added"] == len(df) and first["rows_unchanged"] == 0
+        total = store.total_vectors
+
+        again = upload.upload_excel_file(FakeRequest(workbook))["data"]
+        assert again["rows_unchanged"] == len(df) and again["vectors_created"] == 0
+
+        # Una fila modificada, una eliminada y una nueva
+        df.loc[1, 'notas'] = 'Bloqueado por falta de accesos'
+        df = df.drop(index=2)
+        new_row = df.iloc[[0]].assign(proyecto='Portal Nuevo', actividad='Kickoff', notas='Inicio')
+        df = pd.concat([df, new_row])
+        df.to_excel(workbook, index=False)
+
+        changed = upload.upload_excel_file(FakeRequest(workbook))["data"]
+        assert (changed["rows_added"], changed["rows_changed"], changed["rows_removed"]) == (1, 1, 1)
+        assert changed["rows_unchanged"] == len(df) - 2
+
+        # Las versiones reemplazadas se eliminan en segundo plano
+        upload.collect_superseded("proyectos.xlsx")
+        assert registry.pending_gc("proyectos.xlsx") == []
+        assert store.total_vectors == total
+
+
+def test_new_generation_is_invisible_until_commit():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        store = LocalVectorStore(registry=registry)
+        upload = FileUploadService(store, ExcelProcessingService(), registry)
+        upload.upload_excel_file(FakeRequest(SAMPLE))
+
+        vectors_data = ExcelProcessingService().process_excel_to_vectors(SAMPLE)
+        target = next(v for v in vectors_data if v['metadata']['analysis_type'] == 'project_management')
+        target['text'] = 'Migración a la nube completamente reescrita'
+        target['metadata']['content_hash'] = 'modificada'
+
+        # Ingesta a medio camino: la versión nueva está escrita pero no confirmada
+        plan = registry.plan("SMA_Lector_Pruebas.xlsx", vectors_data)
+        store.upsert_vectors(plan["upsert"])
+        store.update_metadata(plan["superseded"], {'valid_to': plan["generation"]})
+        ids = [r['id'] for r in store.search_similar_vectors(target['text'], top_k=50)["results"]]
+        assert f"{target['id']}@1" in ids and f"{target['id']}@2" not in ids
+
+        registry.commit("SMA_Lector_Pruebas.xlsx", plan)
+        ids = [r['id'] for r in store.search_similar_vectors(target['text'], top_k=50)["results"]]
+        assert f"{target['id']}@2" in ids and f"{target['id']}@1" not in ids
+
+
+def test_hidden_generation_is_filtered_inside_the_ann_index():
+    os.environ["IVF_NLIST"] = "2"
+    os.environ["IVF_NPROBE"] = "1"
+    rows = [{'id': f'fila_{i}', 'text': f'Proyecto {i % 5} actividad {i}',
+             'metadata': {'content_hash': f'h{i}', 'file_source': 'plan.xlsx',
+                          'analysis_type': 'project_management'}} for i in range(100)]
+    for kind in ("ivf", "hnsw"):
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = IngestionRegistry(os.path.join(tmp, "state"))
+            store = LocalVectorStore(registry=registry, ann_index=kind)
+            plan = registry.plan('plan.xlsx', [dict(row, metadata=dict(row['metadata'])) for row in rows])
+            store.upsert_vectors(plan["upsert"])
+            registry.commit('plan.xlsx', plan)
+
+            # Carga sin confirmar que reescribe 40 filas
+            changed = [dict(row, metadata={**row['metadata'], 'content_hash': 'nueva'}) if i < 40
+                       else dict(row, metadata=dict(row['metadata'])) for i, row in enumerate(rows)]
+            pending = registry.plan('plan.xlsx', changed)
+            store.upsert_vectors(pending["upsert"])
+            store.update_metadata(pending["superseded"], {'valid_to': pending["generation"]})
+
+            # La visibilidad se mantiene por fila: las búsquedas no recorren columnas de metadata
+            def fail(*args, **kwargs):
+                raise AssertionError("La búsqueda recorrió una columna completa")
+            store.storage.column = fail
+            masks = []
+            search = store.ann_index.search
+            store.ann_index.search = lambda *args, **kwargs: masks.append(kwargs.get('mask')) or search(*args, **kwargs)
+
+            results = store.search_similar_vectors("proyecto 3 actividad", top_k=60)["results"]
+            assert len(results) == 60 and all(r['id'].endswith('@1') for r in results)
+            assert masks and masks[-1] is not None and int(masks[-1].sum()) == 100
+
+            registry.commit('plan.xlsx', pending)
+            results = store.search_similar_vectors("proyecto 3 actividad", top_k=100)["results"]
+            assert len(results) == 100
+            assert sum(r['id'].endswith('@2') for r in results) == 40
+
+
+class FakeLlm:
+    def promptValidate(self, prompt):
+        return "análisis"
+
+
+def test_project_and_assignee_lookups_are_exact_without_embeddings():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        store = LocalVectorStore(registry=registry)
+        FileUploadService(store, ExcelProcessingService(), registry).upload_excel_file(FakeRequest(SAMPLE))
+        df = pd.read_excel(SAMPLE)
+
+        def no_embeddings(query_text):
+            raise AssertionError("no debería vectorizar consultas")
+        store.embed_query = no_embeddings
+
+        service = ProjectAnalysisService(FakeLlm(), store, registry)
+        project = df['proyecto'].iloc[0]
+        expected = int((df['proyecto'] == project).sum())
+
+        summary = service.generate_project_summary(project)
+        assert summary["metrics"]["total_activities"] == expected
+
+        first = service.get_project_activities(project, offset=0, limit=2)
+        rest = service.get_project_activities(project, offset=2, limit=50)
+        assert first["total"] == expected and len(first["activities"]) == min(2, expected)
+        ids = [a['id'] for a in first["activities"] + rest["activities"]]
+        assert len(set(ids)) == expected
+
+        # Nombre parcial: se resuelve contra los nombres indexados
+        assert service.get_project_activities(project.split()[0].lower())["total"] >= expected
+
+        assignee = df['asignado'].iloc[0]
+        workload = service.get_assignee_workload(assignee)
+        assert workload["total"] == int((df['asignado'] == assignee).sum())
+        assert sum(workload["by_status"].values()) == workload["total"]
+
+
+def test_dashboard_aggregates_match_a_full_scan():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = IngestionRegistry(os.path.join(tmp, "state"))
+        store = LocalVectorStore(registry=registry)
+        upload = FileUploadService(store, ExcelProcessingService(), registry)
+        workbook = os.path.join(tmp, "proyectos.xlsx")
+        df = pd.read_excel(SAMPLE)
+        df.to_excel(workbook, index=False)
+
+        def full_scan():
+            rows = np.flatnonzero(store._visible_mask())
+            return store._calculate_project_metrics([store.storage.metadata(row) for row in rows])
+
+        upload.upload_excel_file(FakeRequest(workbook))
+        dashboard = store.get_dashboard_metrics()
+        expected = full_scan()
+        assert {key: dashboard["metrics"][key] for key in expected} == expected
+        assert sum(dashboard["metrics"]["progress_histogram"]) == expected["projects_analyzed"]
+
+        # Cambios incrementales: los agregados se corrigen solo con las filas modificadas
+        df.loc[0, 'progreso'] = 0.55
+        df = df.drop(index=3)
+        df.to_excel(workbook, index=False)
+        upload.upload_excel_file(FakeRequest(workbook))
+        dashboard = store.get_dashboard_metrics()
+        expected = full_scan()
+        assert {key: dashboard["metrics"][key] for key in expected} == expected
+        assert dashboard["total_vectors"] == len(df) + 1
+        by_project = dashboard["metrics"]["by_project"]
+        assert sum(group["activities"] for group in by_project.values()) == len(df)
+
+
+def test_streamed_upload_commits_one_generation():
+    previous = {name: os.environ.get(name) for name in ("EXCEL_READER_MODE", "EXCEL_STREAM_CHUNK_ROWS")}
+    try:
+        results = {}
+        for mode in ("memory", "stream"):
+            os.environ["EXCEL_READER_MODE"] = mode
+            os.environ["EXCEL_STREAM_CHUNK_ROWS"] = "4"
+            with tempfile.TemporaryDirectory() as tmp:
+                registry = IngestionRegistry(os.path.join(tmp, "state"))
+                store = LocalVectorStore(registry=registry)
+                upload = FileUploadService(store, ExcelProcessingService(), registry)
+                first = upload.upload_excel_file(FakeRequest(SAMPLE))["data"]
+                again = upload.upload_excel_file(FakeRequest(SAMPLE))["data"]
+                state = registry.load(os.path.basename(SAMPLE))
+                results[mode] = (first, again, state["generation"], state["rows"], state["aggregates"])
+
+        memory, stream = results["memory"], results["stream"]
+        assert stream[0]["rows_processed"] == len(pd.read_excel(SAMPLE).dropna(how='all'))
+        assert stream[1]["vectors_created"] == 0 and stream[2] == 2
+        assert stream[3:] == memory[3:]
+        for key in ("rows_processed", "vectors_created", "rows_added", "data_quality_score"):
+            assert stream[0][key] == memory[0][key]
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def test_interrupted_upload_leaves_no_hidden_rows():
+    previous = {name: os.environ.get(name) for name in ("EXCEL_READER_MODE", "EXCEL_STREAM_CHUNK_ROWS")}
+    os.environ["EXCEL_READER_MODE"] = "stream"
+    os.environ["EXCEL_STREAM_CHUNK_ROWS"] = "4"
+    try:
+        for delete_works in (True, False):
+            with tempfile.TemporaryDirectory() as tmp:
+                registry = IngestionRegistry(os.path.join(tmp, "state"))
+                store = LocalVectorStore(registry=registry)
+                upload = FileUploadService(store, ExcelProcessingService(), registry)
+                workbook = os.path.join(tmp, "proyectos.xlsx")
+                df = pd.read_excel(SAMPLE)
+                df.to_excel(workbook, index=False)
+                upload.upload_excel_file(FakeRequest(workbook))
+                total, visible = store.total_vectors, int(store._visible_mask().sum())
+
+                # Todas las filas cambian y el segundo bloque falla: el primero ya quedó escrito
+                df['notas'] = 'Revisión general'
+                df.to_excel(workbook, index=False)
+                upsert, delete = store.upsert_vectors, store.delete_ids
+                calls = []
+
+                def failing_upsert(vectors_data):
+                    calls.append(len(vectors_data))
+                    if len(calls) == 2:
+                        upsert(vectors_data[:1])
+                        return {"success": False, "message": "índice no disponible"}
+                    return upsert(vectors_data)
+
+                def failing_delete(ids):
+                    raise RuntimeError("índice no disponible")
+
+                store.upsert_vectors = failing_upsert
+                if not delete_works:
+                    store.delete_ids = failing_delete
+                assert not upload.upload_excel_file(FakeRequest(workbook))["success"]
+                store.upsert_vectors, store.delete_ids = upsert, delete
+
+                state = registry.load("proyectos.xlsx")
+                assert state["generation"] == 1
+                if delete_works:
+                    assert store.total_vectors == total and state["abandoned"] == []
+                    continue
+                assert len(state["abandoned"]) == sum(calls)
+
+                # La siguiente carga (el libro original) confirma la generación 2 sin los vectores huérfanos
+                df = pd.read_excel(SAMPLE)
+                df.to_excel(workbook, index=False)
+                result = upload.upload_excel_file(FakeRequest(workbook))["data"]
+                assert result["rows_unchanged"] == len(df) and result["vectors_created"] == 0
+                assert int(store._visible_mask().sum()) == visible
+                # Pasan a pending_gc con las versiones reemplazadas
+                upload.collect_superseded("proyectos.xlsx")
+                assert store.total_vectors == total and registry.load("proyectos.xlsx")["abandoned"] == []
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        # Una carga fallida deja el archivo subido en app/uploads
+        uploaded = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "uploads", "proyectos.xlsx")
+        if os.path.exists(uploaded):
+            os.remove(uploaded)
+
+
+def _count_under_lock(directory, count):
+    registry = IngestionRegistry(directory)
+    for _ in range(count):
+        with registry.lock("proyectos.xlsx"):
+            state = registry.load("proyectos.xlsx")
+            state["generation"] += 1
+            registry.save("proyectos.xlsx", state)
+
+
+def test_registry_lock_excludes_other_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_count_under_lock, args=(tmp, 50)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+        assert all(process.exitcode == 0 for process in processes)
+        assert IngestionRegistry(tmp).load("proyectos.xlsx")["generation"] == 200
+
+
+class FakePineconeIndex:
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.vectors = {}
+        self.requests = []
+
+    def describe_index_stats(self):
+        return {"dimension": self.dimension}
+
+    def fetch(self, ids):
+        self.requests.append(("fetch", len(ids)))
+        return {"vectors": {i: dict(self.vectors[i]) for i in ids if i in self.vectors}}
+
+    def upsert(self, vectors):
+        self.requests.append(("upsert", len(vectors)))
+        for vector in vectors:
+            self.vectors[vector['id']] = vector
+
+    def update(self, **kwargs):
+        raise AssertionError("update_metadata no debería enviar una petición por ID")
+
+
+class FakePinecone:
+    def __init__(self, index):
+        self.index = index
+
+    def Index(self, name, pool_threads=None):
+        return self.index
+
+
+def test_pinecone_metadata_updates_are_batched():
+    with tempfile.TemporaryDirectory() as tmp:
+        model = databaseVectormodel(registry=IngestionRegistry(tmp))
+        index = FakePineconeIndex(model.embedding_dimension)
+        model._pinecone = FakePinecone(index)
+        for i in range(2500):
+            index.vectors[f"fila_{i}@1"] = {'id': f"fila_{i}@1", 'values': [0.5] * 4,
+                                             'metadata': {'valid_from': 1, 'valid_to': 99, 'text': f"fila {i}"}}
+
+        ids = [f"fila_{i}@1" for i in range(2500)] + ["no_existe@1"]
+        assert model.update_metadata(ids, {'valid_to': 2}) == 2500
+        assert [kind for kind, _ in index.requests].count("fetch") == 3
+        assert len(index.requests) < 10
+        vector = index.vectors["fila_7@1"]
+        assert vector['metadata'] == {'valid_from': 1, 'valid_to': 2, 'text': "fila 7"}
+        assert vector['values'] == [0.5] * 4 and "no_existe@1" not in index.vectors
+
+
+def test_pinecone_upserts_are_not_capped_by_the_embedding_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        model = databaseVectormodel(registry=IngestionRegistry(tmp))
+        index = FakePineconeIndex(model.embedding_dimension)
+        model._pinecone = FakePinecone(index)
+        rows = [{'id': f"fila_{i}@1", 'text': f"fila {i}", 'metadata': {'valid_from': 1}} for i in range(450)]
+
+        result = model.upsert_vectors(rows)
+        sizes = [size for kind, size in index.requests if kind == "upsert"]
+        assert result["success"] and result["vectors_count"] == 450
+        assert sum(sizes) == 450 and len(index.vectors) == 450
+        assert max(sizes) > model.EMBEDDING_BATCH_SIZE
+        assert result["batches"]["batches"] == len(sizes)
+
+
+def main():
+    tests = [
+        test_ids_are_stable_across_reads,
+        test_reupload_only_touches_changed_rows,
+        test_new_generation_is_invisible_until_commit,
+        test_hidden_generation_is_filtered_inside_the_ann_index,
+        test_project_and_assignee_lookups_are_exact_without_embeddings,
+        test_dashboard_aggregates_match_a_full_scan,
+        test_streamed_upload_commits_one_generation,
+        test_interrupted_upload_leaves_no_hidden_rows,
+        test_registry_lock_excludes_other_processes,
+        test_pinecone_metadata_updates_are_batched,
+        test_pinecone_upserts_are_not_capped_by_the_embedding_batch
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Pruebas del backend vectorial local (sin Pinecone ni red)
+Ejecutar: python tests/test_local_vector_store.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ["EMBEDDING_PROVEEDOR"] = "fake"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["INGEST_STATE_DIR"] = tempfile.mkdtemp()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.LocalVectorStore import LocalVectorStore
+
+
+def build_store():
+    store = LocalVectorStore(initial_capacity=2)
+    store.upsert_vectors([
+        {'id': 'a', 'text': 'Proyecto Alfa actividad diseño atrasada',
+         'metadata': {'project_name': 'Alfa', 'progress_percentage': 30.0, 'status': 'delayed'}},
+        {'id': 'b', 'text': 'Proyecto Beta actividad pruebas completada',
+         'metadata': {'project_name': 'Beta', 'progress_percentage': 90.0, 'status': 'on_track'}},
+        {'id': 'c', 'text': 'Proyecto Gamma reunión de seguimiento',
+         'metadata': {'project_name': 'Gamma', 'progress_percentage': 60.0, 'status': 'at_risk'}},
+    ])
+    return store
+
+
+def test_search_returns_nearest_first():
+    result = build_store().search_similar_vectors("proyecto alfa atrasada", top_k=2)
+    assert result["success"]
+    assert [r['id'] for r in result["results"]][0] == 'a'
+    assert result["total_found"] == 2
+
+
+def test_upsert_overwrites_and_delete_hides():
+    store = build_store()
+    store.upsert_vectors([{'id': 'a', 'text': 'Proyecto Alfa terminado', 'metadata': {'project_name': 'Alfa'}}])
+    assert store.total_vectors == 3
+
+    store.delete_ids(['b'])
+    ids = [r['id'] for r in store.search_similar_vectors("proyecto beta", top_k=10)["results"]]
+    assert 'b' not in ids and len(ids) == 2
+
+
+def test_dashboard_uses_all_rows():
+    metrics = build_store().get_dashboard_metrics()
+    assert metrics["total_vectors"] == 3
+    assert metrics["metrics"]["projects_delayed"] == 1
+    assert metrics["metrics"]["projects_on_track"] == 1
+
+
+def test_ivf_index_trains_and_respects_deletes():
+    os.environ["IVF_NLIST"] = "2"
+    os.environ["IVF_NPROBE"] = "2"
+    store = LocalVectorStore(ann_index="ivf")
+    # IVF necesita al menos 39 filas por lista para entrenarse
+    store.upsert_vectors([
+        {'id': f'fila_{i}', 'text': f'Proyecto {name} actividad {i}', 'metadata': {'project_name': name}}
+        for i, name in enumerate(['Alfa', 'Beta', 'Gamma', 'Delta'] * 19)
+    ])
+    assert not store.ann_index.is_trained
+    store.upsert_vectors([{'id': 'fila_76', 'text': 'Proyecto Alfa actividad 76', 'metadata': {'project_name': 'Alfa'}},
+                          {'id': 'fila_77', 'text': 'Proyecto Beta actividad 77', 'metadata': {'project_name': 'Beta'}}])
+    assert store.ann_index.is_trained
+
+    store.delete_ids(['fila_0'])
+    ids = [r['id'] for r in store.search_similar_vectors("proyecto alfa actividad 0", top_k=77)["results"]]
+    assert 'fila_0' not in ids and len(ids) == 77
+
+
+def test_segments_are_shared_and_compacted():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LOCAL_SEGMENT_ROWS"] = "2"
+        writer = LocalVectorStore(directory=tmp)
+        writer.upsert_vectors([
+            {'id': f'fila_{i}', 'text': f'Proyecto {name} actividad', 'metadata': {'project_name': name}}
+            for i, name in enumerate(['Alfa', 'Beta', 'Gamma', 'Delta'])
+        ])
+
+        # Otro proceso/worker mapea los mismos segmentos
+        reader = LocalVectorStore(directory=tmp)
+        assert reader.total_vectors == 4
+
+        writer.delete_ids(['fila_0'])
+        writer.compact()
+        assert sorted(os.listdir(tmp)).count('segment_000000.f32') == 0
+
+        results = reader.search_similar_vectors("proyecto beta actividad", top_k=10)["results"]
+        assert sorted(r['id'] for r in results) == ['fila_1', 'fila_2', 'fila_3']
+        assert results[0]['metadata']['project_name'] == 'Beta'
+        beta = reader.search_similar_vectors("proyecto", top_k=10, filters={"project": "Beta"})["results"]
+        assert [r['id'] for r in beta] == ['fila_1']
+        del os.environ["LOCAL_SEGMENT_ROWS"]
+
+
+def test_segment_writes_append_to_logs():
+    from Models.VectorStorage import SegmentedStorage
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentedStorage(tmp, 4, segment_rows=8)
+        reader = SegmentedStorage(tmp, 4, segment_rows=8)
+        vectors = np.eye(4, dtype=np.float32)
+        writer.write(['a', 'b', 'c'], vectors[:3], [{'text': 'uno'}, {'text': 'dos'}, {'text': 'tres'}])
+        log = open(os.path.join(tmp, 'segment_000000.meta'), 'rb').read()
+
+        # Una escritura solo agrega al log; el lector aplica las filas y tombstones nuevos
+        writer.write(['b'], vectors[3:], [{'text': 'dos v2'}])
+        assert open(os.path.join(tmp, 'segment_000000.meta'), 'rb').read().startswith(log)
+        assert not any(name.endswith('.json') and name.startswith('segment_') for name in os.listdir(tmp))
+        assert reader.refresh() == ([0, 2, 3], [1])
+        writer.delete([writer.id_to_row['c']])
+        assert reader.refresh() == ([], [2])
+        assert reader.id_to_row == {'a': 0, 'b': 3} and reader.metadata(3) == {'text': 'dos v2'}
+
+        # Bytes de una escritura interrumpida (sin manifiesto) se descartan en la siguiente
+        for suffix in ('f32', 'idx', 'meta'):
+            with open(os.path.join(tmp, f'segment_000000.{suffix}'), 'ab') as f:
+                f.write(b'\x07' * 24)
+        writer.write(['d'], vectors[:1], [{'text': 'cuatro'}])
+        restarted = SegmentedStorage(tmp, 4, segment_rows=8)
+        assert restarted.id_to_row == {'a': 0, 'b': 3, 'd': 4}
+        assert restarted.metadata(4) == {'text': 'cuatro'} and np.allclose(restarted.vectors[4], vectors[0])
+
+
+def test_segment_sidecars_are_migrated():
+    import json
+    from Models.VectorStorage import SegmentedStorage
+    with tempfile.TemporaryDirectory() as tmp:
+        np.eye(4, dtype=np.float32)[:3].tofile(os.path.join(tmp, 'segment_000000.f32'))
+        with open(os.path.join(tmp, 'segment_000000.meta.json'), 'w') as f:
+            json.dump({"ids": ['a', 'b', 'c'], "columns": {"text": ['uno', None, 'tres']}}, f)
+        with open(os.path.join(tmp, 'tombstones.json'), 'w') as f:
+            json.dump([2], f)
+        with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+            json.dump({"dimension": 4, "segment_rows": 8, "version": 3, "epoch": 0, "segments": {"0": 3}}, f)
+
+        storage = SegmentedStorage(tmp, 4)
+        assert storage.id_to_row == {'a': 0, 'b': 1} and storage.segment_rows == 8
+        assert storage.metadata(0) == {'text': 'uno'} and storage.metadata(1) == {}
+        assert not os.path.exists(os.path.join(tmp, 'segment_000000.meta.json'))
+
+
+def test_writer_indexes_follow_compaction():
+    os.environ["IVF_NLIST"] = "1"
+    os.environ["IVF_NPROBE"] = "1"
+    os.environ["LOCAL_SEGMENT_ROWS"] = "2"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            names = ['Alfa', 'Beta', 'Gamma', 'Delta', 'Beta', 'Epsilon']
+            writer = LocalVectorStore(directory=tmp, ann_index="ivf")
+            writer.upsert_vectors([
+                {'id': f'fila_{i}', 'text': f'Proyecto {name} actividad {i}', 'metadata': {'project_name': name}}
+                for i, name in enumerate(names)
+            ] + [
+                {'id': f'relleno_{i}', 'text': f'Registro de relleno {i}', 'metadata': {'project_name': 'Relleno'}}
+                for i in range(34)
+            ])
+            assert writer.ann_index.is_trained
+
+            # El compactador en segundo plano del store mueve fila_1 (Beta) a otro segmento
+            writer.delete_ids(['fila_0'])
+            for _ in range(100):
+                if 'segment_000000.f32' not in os.listdir(tmp):
+                    break
+                time.sleep(0.02)
+            assert 'segment_000000.f32' not in os.listdir(tmp)
+
+            beta = writer.search_similar_vectors("proyecto beta", top_k=10, filters={"project": "Beta"})["results"]
+            assert sorted(r['id'] for r in beta) == ['fila_1', 'fila_4']
+            assert all(r['metadata']['project_name'] == 'Beta' for r in beta)
+            ann = writer.search_similar_vectors("proyecto beta actividad 1", top_k=40)["results"]
+            assert sorted(r['id'] for r in ann if r['id'].startswith('fila_')) == [f'fila_{i}' for i in range(1, 6)]
+            assert ann[0]['id'] == 'fila_1' and len(ann) == 39
+
+            # Compactación explícita tras borrar en otro segmento
+            writer.delete_ids(['fila_2', 'fila_3'])
+            assert writer.compact() >= 0
+            beta = writer.search_similar_vectors("proyecto beta", top_k=10, filters={"project": "Beta"})["results"]
+            assert sorted(r['id'] for r in beta) == ['fila_1', 'fila_4']
+            ann = writer.search_similar_vectors("proyecto epsilon", top_k=40)["results"]
+            assert sorted(r['id'] for r in ann if r['id'].startswith('fila_')) == ['fila_1', 'fila_4', 'fila_5']
+            assert ann[0]['id'] == 'fila_5' and len(ann) == 37
+    finally:
+        del os.environ["LOCAL_SEGMENT_ROWS"]
+
+
+def test_shared_memory_generations_swap():
+    from Models.SharedVectorIndex import SharedIndexReader
+
+    namespace = f"sma_test_{os.getpid()}"
+    os.environ["SHARED_VECTOR_INDEX"] = namespace
+    try:
+        store = build_store()
+        assert store.publish_shared_index() == 1
+
+        # Un worker se adjunta en solo lectura a la generación publicada
+        reader = SharedIndexReader(namespace)
+        assert reader.refresh() and reader.generation == 1
+        assert not reader.vectors.flags.writeable
+        assert len(reader.vectors) == 3
+
+        store.upsert_vectors([{'id': 'd', 'text': 'Proyecto Delta', 'metadata': {'project_name': 'Delta'}}])
+        assert store.publish_shared_index() == 2
+        assert reader.refresh() and reader.generation == 2 and len(reader.vectors) == 4
+
+        # La búsqueda del modelo usa la vista compartida de forma transparente
+        results = store.search_similar_vectors("proyecto delta", top_k=1)["results"]
+        assert results[0]['id'] == 'd' and results[0]['metadata']['project_name'] == 'Delta'
+        results = store.search_similar_vectors("proyecto delta", top_k=5, filters={"project": "Beta"})["results"]
+        assert [r['id'] for r in results] == ['b']
+    finally:
+        del os.environ["SHARED_VECTOR_INDEX"]
+        from multiprocessing import shared_memory
+        for name in (f"{namespace}_ctl", f"{namespace}_vec_2", f"{namespace}_meta_2"):
+            try:
+                shared_memory.SharedMemory(name=name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _publish_from_process(namespace, count, barrier):
+    from Models.SharedVectorIndex import SharedIndexPublisher
+
+    publisher = SharedIndexPublisher(namespace)
+    barrier.wait()
+    for _ in range(count):
+        publisher.publish(['x'], np.ones((1, 4), dtype=np.float32), {})
+
+
+def test_shared_memory_publishers_in_several_processes():
+    import multiprocessing
+    from multiprocessing import shared_memory
+    from Models.SharedVectorIndex import SharedIndexReader
+
+    namespace = f"sma_test_procs_{os.getpid()}"
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(4)
+    try:
+        # Cuatro workers publican a la vez tras sus cargas: generaciones consecutivas, sin colisiones
+        processes = [context.Process(target=_publish_from_process, args=(namespace, 5, barrier)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        assert all(process.exitcode == 0 for process in processes)
+
+        reader = SharedIndexReader(namespace)
+        assert reader.refresh() and reader.generation == 20
+        old_blocks = reader._blocks
+        _publish_from_process(namespace, 1, context.Barrier(1))
+        assert reader.refresh() and reader.generation == 21
+
+        # El mapeo de la generación anterior se cierra en lugar de acumularse
+        assert all(block.buf is None for block in old_blocks) and not reader._retired
+    finally:
+        for name in (f"{namespace}_ctl", f"{namespace}_vec_21", f"{namespace}_meta_21"):
+            try:
+                shared_memory.SharedMemory(name=name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def test_filters_are_pushed_into_the_search():
+    store = build_store()
+    store.upsert_vectors([{'id': 'd', 'text': 'Proyecto Alfa pruebas de carga',
+                           'metadata': {'project_name': 'Alfa', 'progress_percentage': 80.0,
+                                        'status': 'on_track', 'is_delayed': False}}])
+
+    # La fila más parecida es de Beta, pero el filtro restringe los candidatos
+    results = store.search_similar_vectors("proyecto beta pruebas completada", top_k=5,
+                                           filters={"project": "Alfa"})["results"]
+    assert sorted(r['id'] for r in results) == ['a', 'd']
+
+    results = store.search_similar_vectors("proyecto", top_k=5,
+                                           filters={"project": ["Alfa", "Gamma"], "progress_min": 50})["results"]
+    assert sorted(r['id'] for r in results) == ['c', 'd']
+
+    # Una actualización mueve la fila a otro valor del índice invertido
+    store.upsert_vectors([{'id': 'a', 'text': 'Proyecto Alfa', 'metadata': {'project_name': 'Omega'}}])
+    results = store.search_similar_vectors("proyecto", top_k=5, filters={"project": "Alfa"})["results"]
+    assert [r['id'] for r in results] == ['d']
+
+    result = store.search_similar_vectors("proyecto", filters={"prioridad": "alta"})
+    assert not result["success"] and "Filtros no soportados" in result["message"]
+
+
+def test_filters_translate_to_pinecone():
+    from Models.MetadataFilter import normalize_filters, to_pinecone_filter
+
+    filters = normalize_filters({"project": "Alfa", "is_delayed": "true", "status": ["delayed", "at_risk"],
+                                 "progress_max": 40})
+    assert to_pinecone_filter(filters) == {"$and": [
+        {"project_name": {"$eq": "Alfa"}},
+        {"status": {"$in": ["delayed", "at_risk"]}},
+        {"is_delayed": {"$eq": True}},
+        {"progress_percentage": {"$lte": 40.0}}
+    ]}
+
+
+class FakeLlm:
+    def promptValidate(self, prompt):
+        return "análisis"
+
+
+def test_routes_reject_invalid_filters():
+    from flask import Flask
+    from app.container import container
+    from app.routes.Routes import api
+    from app.services.project_analysis_service import ProjectAnalysisService
+    from app.services.search_service import SearchService
+
+    store = build_store()
+    container._instances["search_service"] = SearchService(FakeLlm(), store)
+    container._instances["project_service"] = ProjectAnalysisService(FakeLlm(), store, store.registry)
+    app = Flask(__name__)
+    app.register_blueprint(api, url_prefix="/api")
+    client = app.test_client()
+    try:
+        for filters in ({"progress_min": "abc"}, {"progress_max": [10]}, {"progress_min": "nan"}, {"color": "rojo"}):
+            response = client.post("/api/search", json={"query": "proyecto alfa", "filters": filters})
+            body = response.get_json()
+            assert response.status_code == 400 and not body["success"], (filters, response.status_code)
+            assert "Filtros no válidos" in body["message"] or "Filtros no soportados" in body["message"]
+        for route in ("/api/analyze_delays", "/api/pending_tasks"):
+            assert client.post(route, json={"filters": {"progress_max": "mucho"}}).status_code == 400
+        assert client.get("/api/dashboard/metrics?progress_min=abc").status_code == 400
+
+        response = client.post("/api/search", json={"query": "proyecto alfa", "filters": {"progress_max": "40"}})
+        assert response.status_code == 200 and [r['id'] for r in response.get_json()["results"]] == ['a']
+    finally:
+        container._instances.pop("search_service", None)
+        container._instances.pop("project_service", None)
+
+
+def test_shared_metadata_is_read_through_views():
+    from Models.SharedVectorIndex import SharedIndexPublisher, SharedIndexReader
+
+    namespace = f"sma_meta_{os.getpid()}"
+    try:
+        columns = {
+            'text': [f'Actividad número {i}' for i in range(6)],
+            'project_name': ['Alfa', 'Beta', None, 'Alfa', 'Beta', 'Alfa'],
+            'is_delayed': [True, False, True, 1, None, False],
+            'progress_percentage': [10, 20.5, None, 10, 30, 10],
+            'tags': [['a'], None, ['b', 'c'], [], None, ['a']],
+        }
+        SharedIndexPublisher(namespace).publish([f'fila_{i}' for i in range(6)], np.eye(6, dtype=np.float32), columns)
+        reader = SharedIndexReader(namespace)
+        assert reader.refresh() and reader.rows == 6
+
+        # Los campos filtrables se comparten como códigos; el texto como bytes por fila
+        assert reader._columns['project_name']['kind'] == 'codes'
+        assert reader._columns['progress_percentage']['kind'] == 'codes'
+        assert reader._columns['text']['kind'] == 'bytes'
+        assert not reader._columns['project_name']['codes'].flags.owndata
+        for row in range(6):
+            expected = {key: values[row] for key, values in columns.items() if values[row] is not None}
+            assert reader.id_at(row) == f'fila_{row}' and reader.metadata(row) == expected
+            assert [type(value) for value in reader.metadata(row).values()] == [type(value) for value in expected.values()]
+        assert reader.column('project_name').tolist() == columns['project_name']
+        assert reader.column('desconocido').tolist() == [None] * 6
+
+        results = reader.search(np.eye(6, dtype=np.float32)[3], 1)
+        assert results == [{'id': 'fila_3', 'score': 1.0, 'metadata': {
+            'text': 'Actividad número 3', 'project_name': 'Alfa', 'is_delayed': 1,
+            'progress_percentage': 10, 'tags': []}}]
+    finally:
+        from multiprocessing import shared_memory
+        for name in (f"{namespace}_ctl", f"{namespace}_vec_1", f"{namespace}_meta_1"):
+            try:
+                shared_memory.SharedMemory(name=name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def test_clearing_the_store_empties_the_shared_index():
+    from flask import Flask
+    from app.container import container
+    from app.routes.Routes import api
+    from app.services.dashboard_service import DashboardService
+    from app.services.search_service import SearchService
+
+    namespace = f"sma_clear_{os.getpid()}"
+    os.environ["SHARED_VECTOR_INDEX"] = namespace
+    store = build_store()
+    container._instances["search_service"] = SearchService(FakeLlm(), store)
+    container._instances["dashboard_service"] = DashboardService(store, store.registry)
+    app = Flask(__name__)
+    app.register_blueprint(api, url_prefix="/api")
+    client = app.test_client()
+    try:
+        assert store.publish_shared_index() == 1
+        response = client.post("/api/search", json={"query": "proyecto alfa"})
+        assert response.get_json()["total_found"] == 3
+
+        assert client.get("/api/eliminar").get_json()["success"]
+        response = client.post("/api/search", json={"query": "proyecto alfa"})
+        assert response.status_code == 200 and response.get_json()["results"] == []
+        response = client.post("/api/search", json={"query": "proyecto", "filters": {"project": "Alfa"}})
+        assert response.get_json()["results"] == []
+    finally:
+        del os.environ["SHARED_VECTOR_INDEX"]
+        container._instances.pop("search_service", None)
+        container._instances.pop("dashboard_service", None)
+        from multiprocessing import shared_memory
+        for name in (f"{namespace}_ctl", f"{namespace}_vec_2", f"{namespace}_meta_2"):
+            try:
+                shared_memory.SharedMemory(name=name).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def main():
+    tests = [
+        test_search_returns_nearest_first,
+        test_upsert_overwrites_and_delete_hides,
+        test_dashboard_uses_all_rows,
+        test_ivf_index_trains_and_respects_deletes,
+        test_segments_are_shared_and_compacted,
+        test_segment_writes_append_to_logs,
+        test_segment_sidecars_are_migrated,
+        test_writer_indexes_follow_compaction,
+        test_shared_memory_generations_swap,
+        test_shared_memory_publishers_in_several_processes,
+        test_filters_are_pushed_into_the_search,
+        test_filters_translate_to_pinecone,
+        test_routes_reject_invalid_filters,
+        test_shared_metadata_is_read_through_views,
+        test_clearing_the_store_empties_the_shared_index
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Pruebas del micro-batching de embeddings de consultas
+Ejecutar: python tests/test_query_batcher.py
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.EmbeddingBatcher import MicroBatchEmbedder
+
+
+class RecordingEmbedder:
+    """Función de embeddings por lotes que registra cada llamada"""
+
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text) + self.offset, 1.0] for text in texts], dtype=np.float32)
+
+
+class BadRow:
+    def __array__(self, *args, **kwargs):
+        raise ValueError("fila inválida")
+
+
+def test_concurrent_queries_share_one_batch():
+    embedder = RecordingEmbedder()
+    batcher = MicroBatchEmbedder(embedder, max_batch_size=8, max_wait_ms=200)
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def query(text):
+        barrier.wait()
+        results[text] = batcher.embed(text, timeout=5)
+
+    threads = [threading.Thread(target=query, args=("x" * size,)) for size in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(results["x" * size] == [float(size), 1.0] for size in range(1, 9))
+    assert sum(len(call) for call in embedder.calls) == 8 and len(embedder.calls) < 8
+    assert batcher.stats()["average_batch_size"] > 1
+
+
+def test_errors_reach_every_query_and_the_worker_survives():
+    state = {"mode": "error"}
+
+    def flaky(texts):
+        if state["mode"] == "error":
+            raise RuntimeError("proveedor caído")
+        if state["mode"] == "short":
+            return np.ones((len(texts) - 1, 2), dtype=np.float32)
+        if state["mode"] == "bad_row":
+            return [np.ones(2)] * (len(texts) - 1) + [BadRow()]
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+    batcher = MicroBatchEmbedder(flaky, max_batch_size=4, max_wait_ms=50)
+    for mode, message in (("error", "proveedor caído"), ("short", "Se esperaban"), ("bad_row", "fila inválida")):
+        state["mode"] = mode
+        futures = [batcher.submit(f"consulta {i}") for i in range(3)]
+        for future in futures:
+            error = future.exception(timeout=5)
+            assert error is not None and message in str(error)
+
+    # Un Future cancelado no impide entregar los demás resultados
+    state["mode"] = "ok"
+    cancelled = batcher.submit("cancelada")
+    cancelled.cancel()
+    assert batcher.embed("siguiente", timeout=5) == [1.0, 1.0]
+    assert batcher._worker.is_alive() and batcher.stats()["errors"] >= 3
+
+
+def test_queries_are_grouped_by_embedding_function():
+    first, second = RecordingEmbedder(), RecordingEmbedder(offset=100)
+    batcher = MicroBatchEmbedder(max_batch_size=8, max_wait_ms=100)
+    futures = [batcher.submit("abc", first), batcher.submit("abc", second), batcher.submit("de", first)]
+    assert [future.result(timeout=5)[0] for future in futures] == [3.0, 103.0, 2.0]
+    assert sorted(text for call in first.calls for text in call) == ["abc", "de"]
+    assert second.calls == [["abc"]]
+
+
+def main():
+    tests = [
+        test_concurrent_queries_share_one_batch,
+        test_errors_reach_every_query_and_the_worker_survives,
+        test_queries_are_grouped_by_embedding_function
+    ]
+    for test in tests:
+        test()
+        print(f"OK: {test.__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
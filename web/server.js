@@ -373,7 +373,20 @@ app.get('/api/dashboard', async (req, res) => {
   try {
     const backendURL = process.env.BACKEND_URL || 'http://localhost:5000';
     
-    const response = await axios.get(`${backendURL}/api/dashboard`);
+    // Reenviar la revalidación para que el backend responda 304 sin recalcular
+    const ifNoneMatch = req.headers['if-none-match'];
+    const response = await axios.get(`${backendURL}/api/dashboard`, {
+      headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {},
+      validateStatus: status => status === 200 || status === 304
+    });
+    
+    if (response.headers.etag) {
+      res.set('ETag', response.headers.etag);
+    }
+    res.set('Cache-Control', 'no-cache');
+    if (response.status === 304) {
+      return res.status(304).end();
+    }
     res.json(response.data);
   } catch (error) {
     console.error('❌ Error en dashboard:', error.message);